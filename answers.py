@@ -0,0 +1,201 @@
+from datetime import timedelta
+
+from match_records import FINISHED, LIVE
+
+# What an answer says
+MATCH = 'match'
+NO_MATCH = 'no_match'
+UNCLEAR = 'unclear'
+STANDINGS = 'standings'
+INFO = 'info'
+CALENDAR = 'calendar'
+
+# Template keys every language must define
+TEMPLATE_KEYS = ('finished', 'live', 'scheduled', 'scheduled_at', 'no_match_all', 'no_match_live',
+                 'no_match_finished', 'no_match_scheduled', 'unclear', 'standings', 'standings_live',
+                 'standings_row', 'no_match_standings', 'info_coach', 'info_captain', 'info_squad',
+                 'info_team', 'info_player', 'player_number', 'player_club', 'info_stadium', 'info_winner',
+                 'info_winner_no_final', 'info_titles', 'info_one_title', 'info_no_titles', 'no_match_info', 'position_goalkeeper',
+                 'position_defender', 'position_midfielder', 'position_forward', 'kickoff', 'calendar_row',
+                 'no_match_calendar', 'no_match_calendar_window', 'no_match_calendar_at')
+
+
+# Typed result of one query: what kind of answer it is, the question type
+# it was classified as, the teams it was about and the Match records found
+# (the first one is the answer), for standings questions the group tables
+# (standings.GroupTable) and for info questions the knowledge.Entry facts,
+# with the question type saying what was asked (coach, player, stadium...).
+# `kickoffs` maps match ids to kickoff datetimes from the fixture calendar,
+# and `window` is the [start, end) a calendar question asked about.
+# Rendering to text is a separate step, so API clients can take the fields
+# as they are and render them locally.
+class Answer:
+    __slots__ = ('kind', 'question_type', 'teams', 'matches', 'lang', 'competition', 'tables', 'facts',
+                 'kickoffs', 'window')
+
+    def __init__(self, kind, question_type, teams=(), matches=(), lang='en', competition=None, tables=(),
+                 facts=(), kickoffs=None, window=None):
+        self.kind = kind
+        self.question_type = question_type
+        self.teams = list(teams)
+        self.matches = matches
+        self.lang = lang
+        self.competition = competition
+        self.tables = tables
+        self.facts = facts
+        self.kickoffs = kickoffs or {}
+        self.window = window
+
+    def to_json(self):
+        return {
+            'kind': self.kind,
+            'intent': self.question_type,
+            'teams': self.teams,
+            'lang': self.lang,
+            'competition': self.competition,
+            'matches': [dict(id=match.match_id, stage=match.stage, **match.to_json(),
+                             kickoff=_isoformat(self.kickoffs.get(match.match_id)))
+                        for match in self.matches],
+            'window': [moment.isoformat() for moment in self.window] if self.window else None,
+            'standings': [table.to_json() for table in self.tables],
+            'facts': [entry.to_json() for entry in self.facts],
+        }
+
+    def __repr__(self):
+        return f"Answer({self.kind!r}, {self.question_type!r}, {self.teams!r}, {len(self.matches)} matches)"
+
+
+def _isoformat(moment):
+    return moment.isoformat() if moment is not None else None
+
+
+# Answers to text through per-language templates, each compiled once into a
+# bound str.format. Team names go through the language's `team_names`
+# callable (e.g. Translator.team_name for French), so a French answer is
+# built directly in French instead of rendered in English and re-translated.
+#
+#   templates   lang -> {key: template}, keys as in TEMPLATE_KEYS; fields are
+#               {team1} {team2} {score1} {score2} {time} or {teams}; a
+#               standings table is {group} {rows}, each row rendered from
+#               standings_row with the Standing's fields; `kickoff`
+#               formats a kickoff datetime ({kickoff:%d/%m/%Y %H:%M})
+#   group_names lang -> callable translating a group name ("Group A")
+class AnswerRenderer:
+    def __init__(self, templates, team_names=None, default_lang='en', group_names=None):
+        self.default_lang = default_lang
+        self._formats = {}
+        for lang, table in templates.items():
+            missing = set(TEMPLATE_KEYS) - set(table)
+            if missing:
+                raise ValueError(f"{lang} templates are missing {', '.join(sorted(missing))}")
+            self._formats[lang] = {key: template.format for key, template in table.items()}
+        self._team_names = dict(team_names or {})
+        self._group_names = dict(group_names or {})
+
+    def _team(self, lang):
+        return self._team_names.get(lang) or (lambda team: team)
+
+    def render_table(self, table, lang='en'):
+        formats = self._formats.get(lang) or self._formats[self.default_lang]
+        team = self._team(lang)
+        row_format = formats['standings_row']
+        rows = ', '.join(row_format(rank=row.rank, team=team(row.team), played=row.played, wins=row.wins,
+                                    draws=row.draws, losses=row.losses, gf=row.gf, ga=row.ga, gd=row.gd,
+                                    points=row.points)
+                         for row in table.rows)
+        group = (self._group_names.get(lang) or (lambda name: name))(table.name)
+        return formats['standings_live' if table.provisional else 'standings'](group=group, rows=rows)
+
+    # A scheduled match shows its `kickoff` when the calendar has one
+    def render_match(self, match, lang='en', kickoff=None):
+        formats = self._formats.get(lang) or self._formats[self.default_lang]
+        team = self._team(lang)
+        time = match.time
+        if match.status is FINISHED:
+            key = 'finished'
+        elif match.status is LIVE:
+            key = 'live'
+        elif kickoff is not None:
+            key, time = 'scheduled_at', formats['kickoff'](kickoff=kickoff)
+        else:
+            key = 'scheduled_at' if match.time != "Not started" else 'scheduled'
+        return formats[key](team1=team(match.team1), team2=team(match.team2), score1=match.score1,
+                            score2=match.score2, time=time)
+
+    # Calendar answer: one line per match, prefixed with its kickoff
+    def render_calendar(self, answer, lang='en'):
+        formats = self._formats.get(lang) or self._formats[self.default_lang]
+        return '\n'.join(formats['calendar_row'](kickoff=answer.kickoffs.get(match.match_id),
+                                                  match=self.render_match(match, lang))
+                         for match in answer.matches)
+
+    # "No matches on <day>", "... between <start> and <end>" or "... at <time>"
+    def render_empty_window(self, window, lang='en'):
+        formats = self._formats.get(lang) or self._formats[self.default_lang]
+        start, end = window
+        if end - start <= timedelta(minutes=1):
+            key = 'no_match_calendar_at'
+        elif end - start == timedelta(days=1) and not start.hour and not start.minute:
+            key = 'no_match_calendar'
+        else:
+            key = 'no_match_calendar_window'
+        return formats[key](start=start, end=end)
+
+    # One knowledge.Entry, as an answer to an `aspect` question
+    def render_fact(self, aspect, entry, lang='en'):
+        formats = self._formats.get(lang) or self._formats[self.default_lang]
+        team = self._team(lang)
+        fields = entry.fields
+        if entry.kind == 'team':
+            name = team(fields['name'])
+            if aspect in ('coach', 'captain'):
+                return formats['info_' + aspect](team=name, **{aspect: fields.get(aspect) or '?'})
+            if aspect == 'squad':
+                return formats['info_squad'](team=name, players=', '.join(fields.get('squad', ())))
+            return formats['info_team'](team=name, world_ranking=fields.get('worldRanking', '?'),
+                                        african_ranking=fields.get('africanRanking', '?'),
+                                        participations=fields.get('participations', '?'),
+                                        championships=fields.get('championships', '?'))
+        if entry.kind == 'player':
+            details = []
+            # Players only listed by line ("goalkeepers") have no position
+            position = fields.get('position') or (fields.get('line') or '')[:-1]
+            if position:
+                template = formats.get('position_' + position.lower())
+                details.append(template() if template else position)
+            if fields.get('number') is not None:
+                details.append(formats['player_number'](number=fields['number']))
+            if fields.get('club'):
+                details.append(formats['player_club'](club=fields['club']))
+            return formats['info_player'](name=fields['name'], team=team(fields['team']), details=', '.join(details))
+        if entry.kind == 'stadium':
+            return formats['info_stadium'](**fields)
+        if entry.kind == 'titles':
+            if not fields['years']:
+                return formats['info_no_titles'](team=team(fields['team']))
+            key = 'info_one_title' if len(fields['years']) == 1 else 'info_titles'
+            return formats[key](team=team(fields['team']), count=len(fields['years']),
+                                years=', '.join(map(str, fields['years'])))
+        key = 'info_winner' if fields.get('runner_up') else 'info_winner_no_final'
+        return formats[key](year=fields['year'], champion=team(fields['champion']),
+                            runner_up=team(fields['runner_up'] or ''), host=team(fields['host'] or '?'),
+                            final_score=fields.get('final_score') or '')
+
+    def render(self, answer, lang=None):
+        lang = lang or answer.lang
+        if answer.kind == MATCH:
+            match = answer.matches[0]
+            return self.render_match(match, lang, answer.kickoffs.get(match.match_id))
+        if answer.kind == CALENDAR:
+            return self.render_calendar(answer, lang)
+        if answer.kind == STANDINGS:
+            return '\n'.join(self.render_table(table, lang) for table in answer.tables)
+        if answer.kind == INFO:
+            return '\n'.join(self.render_fact(answer.question_type, entry, lang) for entry in answer.facts)
+        formats = self._formats.get(lang) or self._formats[self.default_lang]
+        if answer.kind == NO_MATCH and answer.window:
+            return self.render_empty_window(answer.window, lang)
+        if answer.kind == NO_MATCH:
+            team = self._team(lang)
+            return formats['no_match_' + answer.question_type](teams=' vs '.join(team(t) for t in answer.teams))
+        return formats['unclear']()
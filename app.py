@@ -1,13 +1,34 @@
-from flask import Flask, request, jsonify, session
-import json
+from flask import Flask, request, jsonify, session, g
+import hmac
+import logging
 import os
 import re
-import spacy
-from fuzzywuzzy import fuzz, process
+import threading
+import time
 from flask_cors import CORS
-from flask_session import Session
 import uuid
-from langdetect import detect, LangDetectException
+from datetime import datetime, timedelta, timezone
+from match_store import MatchStore, start_compactor
+from shards import ShardRegistry, UnknownCompetition
+from match_index import build_match_index, patch_match_index, iter_matches
+from match_records import SCHEDULED, parse_changes
+from standings import build_standings, update_standings
+from knowledge import KnowledgeBuilder, Entry, YEAR_PATTERN
+from schedule import build_calendar, parse_window
+from live_feed import match_delta
+from wal import WriteAheadLog
+from team_resolver import TeamResolver
+from response_cache import create_response_cache
+from language import create_detector
+from translator import Translator
+from intent import IntentMatcher, QueryIntent
+from answers import Answer, AnswerRenderer, MATCH, NO_MATCH, UNCLEAR, STANDINGS, INFO, CALENDAR
+from session_store import create_conversation_store, start_gc_thread
+from query_pool import QueryPool, PoolBusy
+import metrics
+from metrics import span
+
+logger = logging.getLogger(__name__)
 
 # Dictionnaire de traduction français-anglais pour les termes clés
 fr_to_en_keywords = {
@@ -39,6 +60,27 @@ fr_to_en_keywords = {
     'à quelle date': 'when',
     'à quelle heure': 'when',
     
+    # Jours et heures (voir schedule.parse_window)
+    'aujourd\'hui': 'today',
+    'ce soir': 'tonight',
+    'demain': 'tomorrow',
+    'hier': 'yesterday',
+    'entre': 'between',
+    'après': 'after',
+    'avant': 'before',
+    'janvier': 'january',
+    'février': 'february',
+    'mars': 'march',
+    'avril': 'april',
+    'mai': 'may',
+    'juin': 'june',
+    'juillet': 'july',
+    'août': 'august',
+    'septembre': 'september',
+    'octobre': 'october',
+    'novembre': 'november',
+    'décembre': 'december',
+    
     # Indicateurs de match terminé
     'résultat': 'result',
     'gagné': 'won',
@@ -55,6 +97,39 @@ fr_to_en_keywords = {
     'qui a gagné': 'who won',
     'quel a été': 'what was',
     
+    # Classements
+    'classement': 'standings',
+    'groupe': 'group',
+    'première place': 'top of the group',
+    'premier du groupe': 'top of the group',
+    
+    # Équipes, joueurs, stades et palmarès
+    'sélectionneur': 'coach',
+    'entraîneur': 'coach',
+    'capitaine': 'captain',
+    'effectif': 'squad',
+    'joueur': 'player',
+    'joueurs': 'players',
+    'gardien': 'goalkeeper',
+    'gardiens': 'goalkeepers',
+    'défenseur': 'defender',
+    'défenseurs': 'defenders',
+    'milieu': 'midfielder',
+    'milieux': 'midfielders',
+    'attaquant': 'forward',
+    'attaquants': 'forwards',
+    'numéro': 'number',
+    'stade': 'stadium',
+    'stades': 'stadiums',
+    'capacité': 'capacity',
+    'vainqueur': 'winner',
+    'vainqueurs': 'winners',
+    'palmarès': 'titles',
+    'titres': 'titles',
+    'a remporté la can': 'won afcon',
+    'remporté la can': 'won afcon',
+    'coupe d\'afrique': 'afcon',
+    
     # Équipes et pays
     'maroc': 'morocco',
     'mali': 'mali',
@@ -113,125 +188,269 @@ en_to_fr_responses = {
     'Sorry, there was an error processing your request. Please try again.': 'Désolé, une erreur s\'est produite lors du traitement de votre demande. Veuillez réessayer.'
 }
 
+# Answer templates per language (see answers.py). French answers are built
+# from these directly; en_to_fr_responses is only needed for free text.
+answer_templates = {
+    'en': {
+        'finished': "{team1} {score1} - {score2} {team2} | Status: Finished",
+        'live': "{team1} {score1} - {score2} {team2} | Status: Live - {time}",
+        'scheduled': "{team1} vs {team2} | Status: Scheduled",
+        'scheduled_at': "{team1} vs {team2} | Status: Scheduled for {time}",
+        'no_match_all': "No matches found for {teams}.",
+        'no_match_live': "No live matches found for {teams}.",
+        'no_match_finished': "No finished matches found for {teams}.",
+        'no_match_scheduled': "No scheduled matches found for {teams}.",
+        'unclear': "Please specify the teams you are referring to, e.g., 'Morocco vs Mali.'",
+        'standings': "{group} standings: {rows}",
+        'standings_live': "{group} standings (live): {rows}",
+        'standings_row': "{rank}. {team} {points} pts (GD {gd:+d})",
+        'no_match_standings': "No group standings found for {teams}.",
+        'info_coach': "{team}'s coach is {coach}.",
+        'info_captain': "{team}'s captain is {captain}.",
+        'info_squad': "{team} squad: {players}",
+        'info_team': "{team}: FIFA ranking {world_ranking}, African ranking {african_ranking}, "
+                     "{participations} AFCON appearances, {championships} titles.",
+        'info_player': "{name} ({team}): {details}",
+        'player_number': "number {number}",
+        'player_club': "club: {club}",
+        'position_goalkeeper': "goalkeeper",
+        'position_defender': "defender",
+        'position_midfielder': "midfielder",
+        'position_forward': "forward",
+        'info_stadium': "{name} ({city}): {capacity} seats",
+        'info_winner': "AFCON {year}: {champion} beat {runner_up} {final_score} in the final, hosted by {host}.",
+        'info_winner_no_final': "AFCON {year}: won by {champion}, hosted by {host}.",
+        'info_titles': "{team} won AFCON {count} times: {years}.",
+        'info_one_title': "{team} won AFCON once: {years}.",
+        'info_no_titles': "{team} has never won AFCON.",
+        'no_match_info': "I couldn't find that in the tournament data.",
+        'kickoff': "{kickoff:%d/%m/%Y %H:%M}",
+        'calendar_row': "{kickoff:%d/%m %H:%M} {match}",
+        'no_match_calendar': "No matches on {start:%d/%m/%Y}.",
+        'no_match_calendar_window': "No matches on {start:%d/%m/%Y} between {start:%H:%M} and {end:%H:%M}.",
+        'no_match_calendar_at': "No matches on {start:%d/%m/%Y} at {start:%H:%M}.",
+    },
+    'fr': {
+        'finished': "{team1} {score1} - {score2} {team2} | Statut : Terminé",
+        'live': "{team1} {score1} - {score2} {team2} | Statut : En direct - {time}",
+        'scheduled': "{team1} vs {team2} | Statut : Programmé",
+        'scheduled_at': "{team1} vs {team2} | Statut : Programmé pour {time}",
+        'no_match_all': "Aucun match trouvé pour {teams}.",
+        'no_match_live': "Aucun match en direct trouvé pour {teams}.",
+        'no_match_finished': "Aucun match terminé trouvé pour {teams}.",
+        'no_match_scheduled': "Aucun match programmé trouvé pour {teams}.",
+        'unclear': "Veuillez préciser les équipes auxquelles vous faites référence, par exemple, 'Maroc vs Mali'.",
+        'standings': "Classement du {group} : {rows}",
+        'standings_live': "Classement du {group} (en direct) : {rows}",
+        'standings_row': "{rank}. {team} {points} pts (diff. {gd:+d})",
+        'no_match_standings': "Aucun classement de groupe trouvé pour {teams}.",
+        'info_coach': "Le sélectionneur de {team} est {coach}.",
+        'info_captain': "Le capitaine de {team} est {captain}.",
+        'info_squad': "Effectif de {team} : {players}",
+        'info_team': "{team} : classement FIFA {world_ranking}, classement africain {african_ranking}, "
+                     "{participations} participations à la CAN, {championships} titres.",
+        'info_player': "{name} ({team}) : {details}",
+        'player_number': "numéro {number}",
+        'player_club': "club : {club}",
+        'position_goalkeeper': "gardien",
+        'position_defender': "défenseur",
+        'position_midfielder': "milieu",
+        'position_forward': "attaquant",
+        'info_stadium': "{name} ({city}) : {capacity} places",
+        'info_winner': "CAN {year} : {champion} a battu {runner_up} {final_score} en finale, pays hôte : {host}.",
+        'info_winner_no_final': "CAN {year} : remportée par {champion}, pays hôte : {host}.",
+        'info_titles': "{team} a remporté la CAN {count} fois : {years}.",
+        'info_one_title': "{team} a remporté la CAN une fois : {years}.",
+        'info_no_titles': "{team} n'a jamais remporté la CAN.",
+        'no_match_info': "Je n'ai pas trouvé cette information dans les données du tournoi.",
+        'kickoff': "{kickoff:le %d/%m/%Y à %H:%M}",
+        'calendar_row': "{kickoff:%d/%m %H:%M} {match}",
+        'no_match_calendar': "Aucun match le {start:%d/%m/%Y}.",
+        'no_match_calendar_window': "Aucun match le {start:%d/%m/%Y} entre {start:%H:%M} et {end:%H:%M}.",
+        'no_match_calendar_at': "Aucun match le {start:%d/%m/%Y} à {start:%H:%M}.",
+    },
+}
+
+# Common misspellings and abbreviations of country names
+country_aliases = {
+    "ivory": "Ivory Coast",
+    "cote": "Ivory Coast",
+    "drc": "DR Congo",
+    "congo dr": "DR Congo",
+    "sa": "South Africa",
+    "rsa": "South Africa",
+    "eq guinea": "Equatorial Guinea",
+    "burkina": "Burkina Faso",
+    "bf": "Burkina Faso"
+}
+
+# FR/EN detector: 'fast' (vocabulary classifier, langdetect only when unsure),
+# 'keywords' (never loads langdetect) or 'langdetect'
+language_detector = create_detector(os.environ.get('LANGUAGE_DETECTOR', 'fast'), fr_to_en_keywords)
+
+# Teams to match against if the data file has no fixtures
+fallback_teams = [
+    "Morocco", "Mali", "Comoros", "Zambia", "Egypt", "Angola", 
+    "South Africa", "Zimbabwe", "Nigeria", "Tanzania", "Tunisia", 
+    "Uganda", "Algeria", "Burkina Faso", "DR Congo", "Ivory Coast", 
+    "Equatorial Guinea", "Ghana", "Mozambique", "Senegal", "Gambia", 
+    "Cameroon", "Guinea", "Gabon", "Sudan", "Benin", "Botswana", "Mauritania"
+]
+
+# Both translation directions, compiled once
+# "Maroc" -> "Morocco", for data written with French team names
+def english_team_name(name):
+    english = fr_to_en_keywords.get(name.lower())
+    if english is None:
+        return None
+    return next((team for team in fallback_teams if team.lower() == english), english.title())
+
+translator = Translator(fr_to_en_keywords, en_to_fr_responses, fallback_teams)
+renderer = AnswerRenderer(answer_templates, team_names={'fr': translator.team_name},
+                          group_names={'fr': lambda name: re.sub(r'^Group\b', 'Groupe', name)})
+
 app = Flask(__name__)
 # Use environment variables for configuration
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key')
-app.config['SESSION_TYPE'] = 'filesystem'
 app.config['SESSION_PERMANENT'] = True
-app.config['SESSION_USE_SIGNER'] = True
 
-# Create session directory if it doesn't exist
-session_dir = os.path.join(os.getcwd(), 'flask_session')
-if not os.path.exists(session_dir):
-    os.makedirs(session_dir)
-app.config['SESSION_FILE_DIR'] = session_dir
+# The Flask session is a signed cookie holding only the session id; the
+# conversation itself goes to a server-side store (sqlite, redis or memory)
+app.config['SESSION_BACKEND'] = os.environ.get('SESSION_BACKEND', 'sqlite')
+app.config['SESSION_DB_PATH'] = os.environ.get('SESSION_DB_PATH', 'sessions.db')
+app.config['SESSION_REDIS_URL'] = os.environ.get('SESSION_REDIS_URL', 'redis://localhost:6379/0')
+app.config['SESSION_TTL'] = int(os.environ.get('SESSION_TTL', '86400'))
+app.config['SESSION_GC_INTERVAL'] = int(os.environ.get('SESSION_GC_INTERVAL', '600'))
+app.config['CONVERSATION_MAX_MESSAGES'] = int(os.environ.get('CONVERSATION_MAX_MESSAGES', '100'))
+app.permanent_session_lifetime = app.config['SESSION_TTL']
+
+# Opened by create_app
+conversations = None
 
-Session(app)
 CORS(app, supports_credentials=True)  # Enable CORS with credentials support
 
+# Build the team name resolver for a data snapshot, reusing the team list of
+# its match index
+def build_team_resolver(data, views=None):
+    index = views.get('index') if views else None
+    teams = index.teams if index else list(dict.fromkeys(
+        team for _, _, match in iter_matches(data) for team in (match['team1'], match['team2'])
+    ))
+    return TeamResolver(teams or fallback_teams, aliases=country_aliases, translations=fr_to_en_keywords)
+
+# Match updates (PATCH /api/matches) are logged to DB_WAL_PATH and folded
+# back into DB_PATH every DB_COMPACT_INTERVAL seconds. The write API is off
+# unless MATCH_API_TOKEN is set; clients send it as a Bearer token.
+app.config['DB_PATH'] = os.environ.get('DB_PATH', 'db.json')
+app.config['DB_WAL_PATH'] = os.environ.get('DB_WAL_PATH', app.config['DB_PATH'] + '.wal')
+app.config['DB_WAL_FSYNC'] = os.environ.get('DB_WAL_FSYNC', 'true').lower() == 'true'
+app.config['DB_COMPACT_INTERVAL'] = float(os.environ.get('DB_COMPACT_INTERVAL', '30'))
+app.config['MATCH_API_TOKEN'] = os.environ.get('MATCH_API_TOKEN', '')
+app.config['MATCH_UPDATE_MAX'] = int(os.environ.get('MATCH_UPDATE_MAX', '500'))
+
+# Other competitions (past editions...) are data files in DATA_DIR, loaded on
+# first use; at most SHARD_CACHE_SIZE of them stay in memory besides the
+# default one (DB_PATH), which is known as DEFAULT_COMPETITION
+app.config['DATA_DIR'] = os.environ.get('DATA_DIR', '')
+app.config['DEFAULT_COMPETITION'] = os.environ.get('DEFAULT_COMPETITION', 'afcon-2025')
+app.config['SHARD_CACHE_SIZE'] = int(os.environ.get('SHARD_CACHE_SIZE', '4'))
+
+# In-memory copy of one competition's data file, re-read only when the file
+# changes on disk, with its own indexes, resolver and update log. The match
+# index and resolver are built with each snapshot; the standings, reference
+# data index and calendar on the first question that needs them.
+def create_store(path, wal_path=None):
+    return MatchStore(
+        path,
+        poll_interval=float(os.environ.get('DB_POLL_INTERVAL', '1.0')),
+        builders={'index': build_match_index, 'resolver': build_team_resolver},
+        lazy_builders={'standings': build_standings, 'knowledge': KnowledgeBuilder(english_team_name),
+                       'calendar': build_calendar},
+        wal=WriteAheadLog(wal_path or path + '.wal', fsync=app.config['DB_WAL_FSYNC']),
+        updaters={'index': patch_match_index, 'standings': update_standings}
+    )
+
+# The default competition's store and the shard registry, set up by create_app
+store = None
+shards = None
+
 # Load data from db.json
 def load_data():
-    try:
-        # Try both potential paths to find the db.json file
-        paths = [
-            'db.json'
-        ]
-        
-        for path in paths:
-            if os.path.exists(path):
-                with open(path, 'r', encoding='utf-8') as file:
-                    data = json.load(file)
-                    return data
-        
-        print("Warning: db.json not found in any expected location")
-        return None
-    except Exception as e:
-        print(f"Error loading data: {e}")
+    snapshot = store.snapshot()
+    return snapshot.data if snapshot else None
+
+# Cache of final responses, invalidated whenever the data snapshot changes.
+# RESPONSE_CACHE_URL points several workers at one shared Redis-compatible server.
+app.config['RESPONSE_CACHE_SIZE'] = int(os.environ.get('RESPONSE_CACHE_SIZE', '10000'))
+app.config['RESPONSE_CACHE_TTL'] = float(os.environ.get('RESPONSE_CACHE_TTL', '60'))
+app.config['RESPONSE_CACHE_URL'] = os.environ.get('RESPONSE_CACHE_URL')
+response_cache = None
+
+_fallback_resolver = None
+
+# Resolver for a snapshot, falling back to the static team list without data
+def get_resolver(snapshot=None):
+    if snapshot and 'resolver' in snapshot.views:
+        return snapshot.views['resolver']
+    global _fallback_resolver
+    if _fallback_resolver is None:
+        _fallback_resolver = build_team_resolver(None)
+    return _fallback_resolver
+
+# spaCy is only used as a last resort for team extraction, so it is loaded on
+# first use with just the components we read (tagger + attribute_ruler for
+# POS, ner for entities). SPACY_ENABLED=false runs in pure dictionary mode.
+app.config['SPACY_ENABLED'] = os.environ.get('SPACY_ENABLED', 'true').lower() == 'true'
+app.config['SPACY_MODEL'] = os.environ.get('SPACY_MODEL', 'en_core_web_sm')
+app.config['SPACY_BATCH_SIZE'] = int(os.environ.get('SPACY_BATCH_SIZE', '64'))
+app.config['BATCH_MAX_MESSAGES'] = int(os.environ.get('BATCH_MAX_MESSAGES', '100'))
+
+_nlp = None
+_nlp_lock = threading.Lock()
+
+def get_nlp():
+    global _nlp
+    if not app.config['SPACY_ENABLED']:
         return None
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                import spacy
+                try:
+                    _nlp = spacy.load(app.config['SPACY_MODEL'], exclude=['parser', 'lemmatizer', 'senter'])
+                except OSError as e:
+                    logger.warning("Error loading spaCy model: %s", e)
+                    # Create a simple fallback model for basic tokenization
+                    _nlp = spacy.blank("en")
+                    logger.warning("Using fallback spaCy model for basic tokenization")
+    return _nlp
 
-# Initialize spaCy - with error handling for Docker environment
-try:
-    nlp = spacy.load('en_core_web_sm')
-except OSError:
-    try:
-        # If the model isn't installed, download it
-        import subprocess
-        subprocess.run(["python", "-m", "spacy", "download", "en_core_web_sm"])
-        nlp = spacy.load('en_core_web_sm')
-    except Exception as e:
-        print(f"Error loading spaCy model: {e}")
-        # Create a simple fallback model for basic tokenization
-        nlp = spacy.blank("en")
-        print("Using fallback spaCy model for basic tokenization")
+# Pattern for "Team1 vs Team2", "Team1 against Team2" and similar
+vs_pattern = re.compile(r'([\w\s]+)\s+(?:vs|against|versus|and|v\.?|-|playing|match(?:ed)? (?:with|against))\s+([\w\s]+)', re.IGNORECASE)
 
-# Function to extract team names from user query
-def extract_teams(query):
-    doc = nlp(query)
-    
-    # Get all data for team name matching
-    data = load_data()
-    all_teams = set()
-    
-    # Extract all team names from the live data
-    if data and 'live' in data:
-        for group in data['live']:
-            for match in group['mlsf']:
-                all_teams.add(match['team1'])
-                all_teams.add(match['team2'])
-    
-    # Also add teams from knockout stage if available
-    if data and 'knockout_stage' in data:
-        for stage in ['round_of_16', 'quarter_finals', 'semi_finals', 'final']:
-            if stage in data['knockout_stage']:
-                for match in data['knockout_stage'][stage]:
-                    all_teams.add(match['team1'])
-                    all_teams.add(match['team2'])
-    
-    all_teams = list(all_teams)
-    
-    # If no teams found in data, use a fallback list of common teams
-    if not all_teams:
-        all_teams = [
-            "Morocco", "Mali", "Comoros", "Zambia", "Egypt", "Angola", 
-            "South Africa", "Zimbabwe", "Nigeria", "Tanzania", "Tunisia", 
-            "Uganda", "Algeria", "Burkina Faso", "DR Congo", "Ivory Coast", 
-            "Equatorial Guinea", "Ghana", "Mozambique", "Senegal", "Gambia", 
-            "Cameroon", "Guinea", "Gabon", "Sudan", "Benin", "Botswana", "Mauritania"
-        ]
-    
+# Cheap team extraction stages: the vs pattern, then names/aliases written out
+# in the query. Returns None when NLP is needed to go further.
+def extract_teams_fast(query, resolver):
     # Check for common patterns like "Team1 vs Team2" or "Team1 against Team2"
-    vs_pattern = re.compile(r'([\w\s]+)\s+(?:vs|against|versus|and|v\.?|-|playing|match(?:ed)? (?:with|against))\s+([\w\s]+)', re.IGNORECASE)
     vs_match = vs_pattern.search(query)
     if vs_match:
-        team1_text = vs_match.group(1).strip()
-        team2_text = vs_match.group(2).strip()
+        # Find best matches for both teams (lower threshold for better matching with typos)
+        with span('fuzzy_match'):
+            team1_match, team2_match = resolver.resolve_many(
+                [vs_match.group(1).strip(), vs_match.group(2).strip()], threshold=65)
         
-        # Find best matches for both teams
-        team1_match, score1 = process.extractOne(team1_text, all_teams, scorer=fuzz.token_sort_ratio)
-        team2_match, score2 = process.extractOne(team2_text, all_teams, scorer=fuzz.token_sort_ratio)
-        
-        if score1 > 65 and score2 > 65:  # Lower threshold for better matching with typos
+        if team1_match and team2_match:
             return [team1_match, team2_match]
     
-    # Handle common misspellings and abbreviations of country names
-    country_aliases = {
-        "ivory": "Ivory Coast",
-        "cote": "Ivory Coast",
-        "drc": "DR Congo",
-        "congo dr": "DR Congo",
-        "sa": "South Africa",
-        "rsa": "South Africa",
-        "eq guinea": "Equatorial Guinea",
-        "burkina": "Burkina Faso",
-        "bf": "Burkina Faso"
-    }
-    
-    # Check for country aliases in the query
-    for alias, full_name in country_aliases.items():
-        if re.search(r'\b' + re.escape(alias) + r'\b', query.lower()):
-            if full_name in all_teams:
-                return [full_name]
+    # Check for team names, French names and aliases written out in the query
+    mentioned = resolver.find_mentions(query)
+    if mentioned:
+        return mentioned
     
+    return None
+
+# Function to collect candidate team names from a spaCy doc
+def team_candidates(doc):
     # Extract potential team names from the query using NER
     potential_teams = []
     for ent in doc.ents:
@@ -250,282 +469,830 @@ def extract_teams(query):
                doc[i].pos_ == "PROPN" and doc[i+1].pos_ == "PROPN":
                 potential_teams.append(doc[i].text + " " + doc[i+1].text)
     
+    return potential_teams
+
+# Function to extract team names from several queries at once. Queries the
+# cheap stages can't settle go through nlp.pipe together, and all of their
+# candidates are fuzzy-matched in one resolver call.
+def extract_teams_batch(queries, resolver):
+    results = [extract_teams_fast(query, resolver) for query in queries]
+    pending = [i for i, teams in enumerate(results) if teams is None]
+    
+    nlp = get_nlp() if pending else None
+    if nlp is None:
+        return [teams or [] for teams in results]
+    
+    with span('nlp'):
+        docs = nlp.pipe((queries[i] for i in pending), batch_size=app.config['SPACY_BATCH_SIZE'])
+        candidates = [team_candidates(doc) for doc in docs]
+    
     # Use fuzzy matching to find the best matches for team names
-    teams = []
-    for team in potential_teams:
-        best_match, score = process.extractOne(team, all_teams, scorer=fuzz.token_sort_ratio)
-        if score > 65:  # Lower threshold for better matching with typos
-            if best_match not in teams:  # Avoid duplicates
+    with span('fuzzy_match'):
+        resolved = iter(resolver.resolve_many([c for group in candidates for c in group], threshold=65))
+    for i, group in zip(pending, candidates):
+        teams = []
+        for best_match in (next(resolved) for _ in group):
+            if best_match and best_match not in teams:  # Avoid duplicates
                 teams.append(best_match)
+        results[i] = teams
     
-    return teams
+    return results
+
+# Function to extract team names from user query
+def extract_teams(query, snapshot=None):
+    # Resolver built once per data snapshot
+    if snapshot is None:
+        snapshot = store.snapshot()
+    return extract_teams_batch([query], get_resolver(snapshot))[0]
+
+# What an info question asks about, by cue phrase; the question names the
+# team, player, stadium or year. 'team' (the team's profile) by default.
+knowledge_cues = {
+    'winner': ['champion', 'champions', 'winner', 'winners', 'won afcon', 'won the afcon', 'win afcon',
+               'title', 'titles', 'trophy', 'runner up', 'runners up', 'host', 'hosted', 'hosts'],
+    'coach': ['coach', 'coaches', 'head coach', 'manager', 'trainer'],
+    'captain': ['captain', 'skipper'],
+    'squad': ['squad', 'roster', 'players', 'lineup', 'line up'],
+    'stadium': ['stadium', 'stadiums', 'venue', 'venues', 'capacity', 'arena'],
+    'player': ['player', 'club', 'plays for', 'shirt number', 'number', 'keeper', 'striker', 'strikers',
+               'goalkeeper', 'goalkeepers', 'defender', 'defenders', 'midfielder', 'midfielders', 'forward',
+               'forwards'],
+    'team': ['world ranking', 'fifa ranking', 'african ranking', 'participations', 'appearances', 'formation'],
+}
+knowledge_matcher = IntentMatcher(knowledge_cues, default='team')
+# Cue words are not searched for in the index, except positions, which
+# narrow a player search down ("Morocco goalkeepers")
+knowledge_cue_words = frozenset(word for phrases in knowledge_cues.values() for phrase in phrases
+                                for word in phrase.split()) - {
+    'goalkeeper', 'goalkeepers', 'defender', 'defenders', 'midfielder', 'midfielders', 'forward', 'forwards',
+    'keeper', 'striker', 'strikers'}
+# Most facts in one answer
+KNOWLEDGE_MAX_FACTS = 10
+
+# Cue phrases per question type, in precedence order: a standings cue beats
+# the others, then an info cue (see knowledge_cues), then a live cue beats a
+# scheduled one, which beats a finished one. Matched on whole words, longest
+# phrase first (see intent.py).
+intent_cues = {
+    'standings': ['standings', 'standing', 'table', 'tables', 'group table', 'ranking', 'rankings', 'rank',
+                  'ranked', 'points', 'position', 'top of the group', 'bottom of the group',
+                  'leading the group', 'leads the group'],
+    'info': [phrase for phrases in knowledge_cues.values() for phrase in phrases],
+    'live': ['live', 'going', 'going on', 'happening', 'now', 'right now', 'current', 'currently',
+             'ongoing', 'in progress', 'winning', 'leading', 'losing', 'playing right now', 'playing now',
+             'what is the score', "what's the score", 'whats the score', 'current score'],
+    'scheduled': ['when', 'will', 'schedule', 'scheduled', 'upcoming', 'soon', 'next', 'date',
+                  'playing', 'kick off', 'kickoff'],
+    'finished': ['result', 'results', 'won', 'win', 'wins', 'lost', 'lose', 'beat', 'score', 'final score',
+                 'was', 'did', 'perform', 'performed', 'final'],
+}
+
+# Phrases after which a question names the teams: "score of/for/between ..."
+score_subject_cues = ['score of', 'score for', 'score between']
+
+intent_matcher = IntentMatcher(intent_cues, score_subject_cues)
 
 # Function to determine the type of question (finished, live, scheduled)
 def determine_question_type(query):
-    query = query.lower()
-    
-    # Check for live match indicators
-    live_indicators = ['live', 'going', 'happening', 'now', 'current', 'playing right now', 'what is the score', 'what\'s the score']
-    for indicator in live_indicators:
-        if indicator in query:
-            return 'live'
-    
-    # Check for scheduled match indicators
-    scheduled_indicators = ['when', 'will', 'schedule', 'upcoming', 'soon', 'next', 'date', 'playing']
-    for indicator in scheduled_indicators:
-        if indicator in query:
-            return 'scheduled'
-    
-    # Default to finished matches
-    finished_indicators = ['result', 'won', 'win', 'lost', 'score', 'was', 'did', 'perform', 'final']
-    for indicator in finished_indicators:
-        if indicator in query:
-            return 'finished'
-    
-    # If no clear indicators, default to checking all types
-    return 'all'
+    return intent_matcher.match(query).question_type
 
 # Function to find match information based on teams and status
-def find_match(team1, team2=None, status_type='all'):
-    data = load_data()
-    if not data or 'live' not in data:
+def find_match(team1, team2=None, status_type='all', snapshot=None):
+    if snapshot is None:
+        snapshot = store.snapshot()
+    if not snapshot or 'index' not in snapshot.views:
         return None
     
-    matches = []
-    
-    for group in data['live']:
-        for match in group['mlsf']:
-            # If both teams are specified, check for exact match
-            if team2:
-                teams_match = ((match['team1'] == team1 and match['team2'] == team2) or 
-                              (match['team1'] == team2 and match['team2'] == team1))
-            # If only one team is specified, check if it's in the match
-            else:
-                teams_match = (match['team1'] == team1 or match['team2'] == team1)
-            
-            # Check if status matches the requested type
-            status_match = (status_type == 'all' or 
-                          (status_type == 'live' and match['status'] == 'live') or 
-                          (status_type == 'finished' and match['status'] == 'finished') or 
-                          (status_type == 'scheduled' and match['status'] == 'scheduled'))
-            
-            if teams_match and status_match:
-                matches.append(match)
-    
-    return matches
-
-# Function to format match response
-def format_match_response(match):
-    team1 = match['team1']
-    team2 = match['team2']
-    score1 = match['score1']
-    score2 = match['score2']
-    status = match['status']
-    time = match['time']
-    
-    if status == 'finished':
-        return f"{team1} {score1} - {score2} {team2} | Status: Finished"
-    elif status == 'live':
-        return f"{team1} {score1} - {score2} {team2} | Status: Live - {time}"
-    else:  # scheduled
-        return f"{team1} vs {team2} | Status: Scheduled for {time}" if time != "Not started" else f"{team1} vs {team2} | Status: Scheduled"
+    # Team pairs are indexed unordered, so one lookup covers both orders
+    return snapshot.views['index'].lookup(team1, team2, status_type)
+
+# Function to format match response, with its kickoff if it is scheduled
+def format_match_response(match, snapshot=None):
+    return renderer.render_match(match, 'en', kickoffs_of([match], snapshot).get(match.match_id))
 
 # Function to handle unclear questions
 def handle_unclear_question():
-    return "Please specify the teams you are referring to, e.g., 'Morocco vs Mali.'"
+    return renderer.render(Answer(UNCLEAR, 'all'))
 
-# Function to detect language and translate query if needed
-def detect_language(text):
-    try:
-        lang = detect(text)
-        return lang
-    except LangDetectException:
-        # Default to English if detection fails
-        return 'en'
+# Function to detect language and translate query if needed. `default` (a
+# conversation's language) settles texts with no clear signal.
+def detect_language(text, default=None):
+    return language_detector.detect(text, default)
 
 # Function to translate French query to English for processing
 def translate_query_fr_to_en(query):
-    # Convert query to lowercase for better matching
-    query_lower = query.lower()
-    
-    # Replace French terms with English equivalents
-    for fr_term, en_term in fr_to_en_keywords.items():
-        query_lower = re.sub(r'\b' + re.escape(fr_term) + r'\b', en_term, query_lower, flags=re.IGNORECASE)
-    
-    return query_lower
+    return translator.translate_query(query)
 
 # Function to translate English response to French
 def translate_response_en_to_fr(response):
-    # First check for exact matches in our dictionary
-    for en_phrase, fr_phrase in en_to_fr_responses.items():
-        if en_phrase in response:
-            response = response.replace(en_phrase, fr_phrase)
-    
-    # Handle team names and scores in format like "Morocco 2 - 1 Egypt | Status: Finished"
-    match_pattern = re.compile(r'([A-Za-z\s]+) (\d+) - (\d+) ([A-Za-z\s]+) \| Status: (.+)')
-    match = match_pattern.search(response)
-    if match:
-        team1 = match.group(1).strip()
-        score1 = match.group(2)
-        score2 = match.group(3)
-        team2 = match.group(4).strip()
-        status = match.group(5)
-        
-        # Translate team names if they exist in our dictionary
-        for en_team, fr_team in {v: k for k, v in fr_to_en_keywords.items() if v in ['morocco', 'egypt', 'algeria', 'tunisia', 'senegal', 'ivory coast', 'cameroon', 'ghana', 'nigeria', 'south africa', 'dr congo', 'mali', 'burkina faso', 'guinea', 'zambia', 'uganda', 'tanzania', 'comoros', 'angola', 'zimbabwe', 'equatorial guinea', 'gambia', 'gabon', 'sudan', 'mozambique']}.items():
-            if team1.lower() == en_team:
-                team1 = fr_team.title()
-            if team2.lower() == en_team:
-                team2 = fr_team.title()
-        
-        # Translate status
-        status_fr = status
-        for en_status, fr_status in en_to_fr_responses.items():
-            if status in en_status:
-                status_fr = fr_status
-                break
-        
-        response = f"{team1} {score1} - {score2} {team2} | {status_fr}"
-    
-    # Handle scheduled matches format like "Morocco vs Egypt | Status: Scheduled for 2023-01-01"
-    scheduled_pattern = re.compile(r'([A-Za-z\s]+) vs ([A-Za-z\s]+) \| Status: (.+)')
-    match = scheduled_pattern.search(response)
-    if match:
-        team1 = match.group(1).strip()
-        team2 = match.group(2).strip()
-        status = match.group(3)
-        
-        # Translate team names
-        for en_team, fr_team in {v: k for k, v in fr_to_en_keywords.items() if v in ['morocco', 'egypt', 'algeria', 'tunisia', 'senegal', 'ivory coast', 'cameroon', 'ghana', 'nigeria', 'south africa', 'dr congo', 'mali', 'burkina faso', 'guinea', 'zambia', 'uganda', 'tanzania', 'comoros', 'angola', 'zimbabwe', 'equatorial guinea', 'gambia', 'gabon', 'sudan', 'mozambique']}.items():
-            if team1.lower() == en_team:
-                team1 = fr_team.title()
-            if team2.lower() == en_team:
-                team2 = fr_team.title()
-        
-        # Translate status
-        status_fr = status
-        for en_status, fr_status in en_to_fr_responses.items():
-            if status.startswith(en_status):
-                status_fr = status.replace(en_status, fr_status)
-                break
-        
-        response = f"{team1} vs {team2} | {status_fr}"
-    
-    # Handle "No matches found" responses
-    no_matches_pattern = re.compile(r'No (.*?) matches found for (.+)\.')
-    match = no_matches_pattern.search(response)
-    if match:
-        match_type = match.group(1)
-        teams = match.group(2)
-        
-        # Translate match type
-        match_type_fr = match_type
-        if match_type == 'live':
-            match_type_fr = 'en direct'
-        elif match_type == 'finished':
-            match_type_fr = 'terminés'
-        elif match_type == 'scheduled':
-            match_type_fr = 'programmés'
-        
-        # Translate team names in the format "Team1 vs Team2"
-        teams_parts = teams.split(' vs ')
-        translated_teams = []
-        for team in teams_parts:
-            translated = team
-            for en_team, fr_team in {v: k for k, v in fr_to_en_keywords.items() if v in ['morocco', 'egypt', 'algeria', 'tunisia', 'senegal', 'ivory coast', 'cameroon', 'ghana', 'nigeria', 'south africa', 'dr congo', 'mali', 'burkina faso', 'guinea', 'zambia', 'uganda', 'tanzania', 'comoros', 'angola', 'zimbabwe', 'equatorial guinea', 'gambia', 'gabon', 'sudan', 'mozambique']}.items():
-                if team.lower() == en_team:
-                    translated = fr_team.title()
-                    break
-            translated_teams.append(translated)
+    return translator.translate_response(response)
+
+# "group A", "groupe B" in a standings question
+group_pattern = re.compile(r'\bgroupe?\s+([a-z0-9]+)\b', re.IGNORECASE)
+
+# Standings answer: the group the query names, else the groups of the teams it
+# names, else every group
+def build_standings_answer(query, teams, snapshot, lang='en'):
+    standings = snapshot.views.get('standings') if snapshot else None
+    tables = []
+    if standings:
+        named = group_pattern.search(query)
+        table = standings.group(named.group(1)) if named else None
+        if table is not None:
+            tables = [table]
+        elif teams:
+            tables = list(dict.fromkeys(t for t in map(standings.group_of, teams) if t is not None))
+        else:
+            tables = list(standings)
+    if not tables:
+        return Answer(NO_MATCH, STANDINGS, teams, lang=lang)
+    return Answer(STANDINGS, STANDINGS, teams, lang=lang, tables=tables)
+
+# Facts answering an `aspect` question (see knowledge_cues) from the
+# snapshot's knowledge index
+def find_facts(knowledge, aspect, query, teams):
+    terms = knowledge.terms(query, knowledge_cue_words)
+    if aspect == 'winner':
+        year = YEAR_PATTERN.search(query)
+        if year:
+            return knowledge.search('winner', [year.group()])[0]
+        if teams:
+            return [Entry('titles', {'team': team, 'years': [e.fields['year'] for e in knowledge.titles(team)]})
+                    for team in teams]
+        # The latest edition
+        return knowledge.entries.get('winner', [])[:1]
+    if aspect == 'stadium':
+        return knowledge.search('stadium', terms)[0] if terms else knowledge.entries.get('stadium', [])
+    if aspect == 'player':
+        return knowledge.search('player', terms)[0]
+    entries = [entry for entry in map(knowledge.team, teams) if entry is not None]
+    return entries or knowledge.search('team', terms)[0]
+
+# Answer to an info question: coach, captain, squad or profile of a team,
+# players, stadiums, AFCON winners
+def build_info_answer(query, teams, snapshot, lang='en'):
+    knowledge = snapshot.views.get('knowledge') if snapshot else None
+    aspect = knowledge_matcher.match(query).question_type
+    facts = find_facts(knowledge, aspect, query, teams) if knowledge else []
+    if not facts:
+        return Answer(NO_MATCH, INFO, teams, lang=lang)
+    return Answer(INFO, aspect, teams, lang=lang, facts=facts[:KNOWLEDGE_MAX_FACTS])
+
+# A question without teams or cues may still name a player or stadium in
+# full ("Achraf Hakimi"): answer with it rather than asking for teams
+def find_named_fact(query, snapshot, lang='en'):
+    knowledge = snapshot.views.get('knowledge') if snapshot else None
+    if not knowledge:
+        return None
+    terms = knowledge.terms(query)
+    for kind in ('player', 'stadium'):
+        entries, matched = knowledge.search(kind, terms)
+        if entries and any(' ' in term for term in matched):
+            return Answer(INFO, kind, lang=lang, facts=entries[:KNOWLEDGE_MAX_FACTS])
+    return None
+
+# Kickoffs in MatchCan are local times, so "today" and "next" are read on
+# the tournament's clock, TOURNAMENT_UTC_OFFSET hours ahead of UTC.
+# CALENDAR_NOW (an ISO date and time) pins that clock, e.g. to replay a past
+# tournament.
+app.config['TOURNAMENT_UTC_OFFSET'] = float(os.environ.get('TOURNAMENT_UTC_OFFSET', '1'))
+app.config['CALENDAR_NOW'] = os.environ.get('CALENDAR_NOW', '')
+CALENDAR_MAX_FIXTURES = 12
+
+# "next match", "upcoming games" without a team
+next_pattern = re.compile(r'\b(?:next|upcoming)\b')
+
+def tournament_now():
+    if app.config['CALENDAR_NOW']:
+        return datetime.fromisoformat(app.config['CALENDAR_NOW'])
+    offset = timedelta(hours=app.config['TOURNAMENT_UTC_OFFSET'])
+    return datetime.now(timezone.utc).replace(tzinfo=None) + offset
+
+# Kickoff datetimes of Match records, by match id, from the snapshot's calendar
+def kickoffs_of(matches, snapshot):
+    calendar = snapshot.views.get('calendar') if snapshot else None
+    kickoffs = {}
+    if calendar:
+        for match in matches:
+            kickoff = calendar.kickoff(match.match_id)
+            if kickoff is not None:
+                kickoffs[match.match_id] = kickoff
+    return kickoffs
+
+# Next scheduled fixtures of `team` (of any team when None): the first game
+# from `now` on in the calendar that hasn't started yet. When the clock is
+# past the calendar (or the data behind it), the fixtures still listed as
+# scheduled, earliest kickoff first.
+def next_matches(team, snapshot, now):
+    calendar = snapshot.views.get('calendar') if snapshot else None
+    index = snapshot.views.get('index') if snapshot else None
+    if not index:
+        return ()
+    if calendar:
+        for fixture in calendar.upcoming(now, team):
+            match = index.matches.get(fixture.match_id) if fixture.match_id else None
+            if match is not None and match.status is SCHEDULED:
+                return [match]
+    matches = index.lookup(team, status_type=SCHEDULED) if team else index.with_status(SCHEDULED)
+    if not calendar:
+        return matches
+    return sorted(matches, key=lambda match: calendar.kickoff(match.match_id) or datetime.max)
+
+# Fixtures kicking off in `window`, of the named teams if any, in their
+# current state. Calendar entries without a fixture record have no status to
+# report and are left out.
+def build_calendar_answer(teams, snapshot, window, lang='en'):
+    calendar = snapshot.views['calendar']
+    index = snapshot.views.get('index')
+    fixtures = calendar.between(*window, team=teams[0] if teams else None)
+    if len(teams) > 1:
+        fixtures = [fixture for fixture in fixtures if {fixture.team1, fixture.team2} == set(teams[:2])]
+    matches = [index.matches[fixture.match_id] for fixture in fixtures
+               if index and fixture.match_id in index.matches][:CALENDAR_MAX_FIXTURES]
+    if not matches:
+        return Answer(NO_MATCH, CALENDAR, teams, lang=lang, window=window)
+    return Answer(CALENDAR, CALENDAR, teams, matches, lang=lang, kickoffs=kickoffs_of(matches, snapshot),
+                  window=window)
+
+# Whether an answer depends on when it was asked: a day or time window
+# ("today", "at 15h") or a next match, which change as the clock moves.
+# They are never cached, since the cache only keys on the query text.
+def depends_on_clock(answer):
+    return answer.window is not None or (answer.question_type == 'scheduled' and len(answer.teams) < 2)
+
+# Function to build the typed answer for a query once its teams are known
+def build_answer(query, teams, snapshot, intent=None, lang='en'):
+    # Determine question type
+    if intent is None:
+        intent = intent_matcher.match(query)
+    question_type = intent.question_type
+    if question_type == STANDINGS:
+        with span('standings'):
+            return build_standings_answer(query, teams, snapshot, lang)
+    if question_type == INFO:
+        with span('knowledge'):
+            return build_info_answer(query, teams, snapshot, lang)
+    
+    # Score questions ("score of X and Y") name the teams after the cue
+    if intent.subject and not teams:
+        teams_text = intent.subject
+        # Try to extract teams from this specific text
+        potential_teams = teams_text.split(' and ')
+        if len(potential_teams) == 1:
+            potential_teams = teams_text.split(' vs ')
+        if len(potential_teams) == 1:
+            potential_teams = teams_text.split(' against ')
         
-        response = f"Aucun match {match_type_fr} trouvé pour {' vs '.join(translated_teams)}."
+        if len(potential_teams) == 2:
+            team1_match, team2_match = get_resolver(snapshot).resolve_many(
+                [potential_teams[0].strip(), potential_teams[1].strip()], threshold=70)
+            
+            if team1_match and team2_match:
+                teams = [team1_match, team2_match]
+                # For score questions, prioritize live matches, then finished
+                question_type = 'live'
     
-    return response
+    # A day or time window ("matches today", "between 15:00 and 18:00")
+    # lists the fixtures kicking off in it
+    calendar = snapshot.views.get('calendar') if snapshot else None
+    window = parse_window(query, tournament_now(), calendar) if calendar else None
+    if window:
+        with span('calendar'):
+            return build_calendar_answer(teams, snapshot, window, lang)
+    
+    # If no teams found, ask for more information
+    if not teams:
+        if question_type == 'scheduled' and next_pattern.search(query):
+            with span('calendar'):
+                matches = next_matches(None, snapshot, tournament_now())
+            if matches:
+                return Answer(MATCH, question_type, matches=matches, lang=lang,
+                              kickoffs=kickoffs_of(matches, snapshot))
+        with span('knowledge'):
+            answer = find_named_fact(query, snapshot, lang)
+        return answer or Answer(UNCLEAR, question_type, lang=lang)
+    
+    with span('find_match'):
+        # If one team found, find matches involving that team; its next
+        # game for a scheduled question
+        if len(teams) == 1 and question_type == 'scheduled':
+            matches = next_matches(teams[0], snapshot, tournament_now())
+        elif len(teams) == 1:
+            matches = find_match(teams[0], status_type=question_type, snapshot=snapshot)
+        # If two teams found, find matches between those teams
+        else:
+            matches = find_match(teams[0], teams[1], status_type=question_type, snapshot=snapshot)
+    
+    if not matches:
+        return Answer(NO_MATCH, question_type, teams, lang=lang)
+    return Answer(MATCH, question_type, teams, matches, lang=lang, kickoffs=kickoffs_of(matches, snapshot))
 
-# Function to process user query and generate response
-def process_query(query):
+# Follow-up questions leave out what the previous turn of the conversation
+# was about: they open with "and ..."/"what about ..." or refer back to it
+# ("their coach", "ce match"). Matched on the English text; French words
+# the translation keeps are listed as they are.
+follow_up_cues = {
+    'opener': ['and', 'and what about', 'and how about', 'what about', 'how about', 'also', 'same for',
+               'then', 'so'],
+    'reference': ['they', 'them', 'their', 'it', 'its', 'that match', 'this match', 'that game', 'this game',
+                  'the match', 'the game', 'same match', 'leur', 'leurs', 'ils', 'eux', 'ce match'],
+}
+follow_up_matcher = IntentMatcher(follow_up_cues, default=None)
+
+# Question types a bare question ("who is winning?", "when is the next
+# match?") asks about the previous turn's teams
+FOLLOW_UP_TYPES = ('live', 'finished', 'scheduled', STANDINGS)
+# Most teams kept in a conversation's context
+CONTEXT_MAX_TEAMS = 2
+
+# What a conversation keeps of an answer for its follow-ups: the teams, the
+# match answered, the question type and the language. None for an answer
+# that resolved nothing, so the conversation keeps its previous context.
+def context_of(answer):
+    if answer.kind == UNCLEAR:
+        return None
+    teams = list(answer.teams)
+    match = answer.matches[0] if answer.kind == MATCH and answer.matches else None
+    if not teams and match is not None:
+        teams = [match.team1, match.team2]
+    if not teams:
+        return None
+    return {'teams': teams[:CONTEXT_MAX_TEAMS], 'match': match.match_id if match else None,
+            'intent': answer.question_type, 'lang': answer.lang}
+
+# How a query of a conversation depends on its `context`: (teams, intent).
+# A follow-up that names no team takes the context's teams, when it opens
+# or refers back like one, or asks a bare match or standings question
+# without a day or time; an opener with no question type of its own ("and
+# Mali?") takes the context's. Teams are None, and the intent the one
+# given, for a query that stands on its own.
+def resolve_follow_up(text, intent, context, resolver, snapshot):
+    if not context:
+        return None, intent
+    cues = follow_up_matcher.match(text)
+    opener = any(kind == 'opener' and not text[:start].strip(' ¿¡"\'') for start, _, kind in cues.spans)
+    if opener and intent.question_type == intent_matcher.default and context.get('intent') in FOLLOW_UP_TYPES:
+        intent = QueryIntent(context['intent'], intent.spans, intent.subject)
+    if intent.subject or resolver.find_mentions(text):
+        return None, intent
+    if not (opener or cues.question_type == 'reference'):
+        if intent.question_type not in FOLLOW_UP_TYPES:
+            return None, intent
+        calendar = snapshot.views.get('calendar') if snapshot else None
+        if calendar and parse_window(text, tournament_now(), calendar):
+            return None, intent
+    return list(context.get('teams') or ())[:CONTEXT_MAX_TEAMS], intent
+
+# Answer to a follow-up from its context: a question on the state of a
+# match ("and the score now?") gets the match the previous turn answered,
+# looked up by id; anything else is answered for the context's teams. Two
+# teams that don't meet again ("their next match") get the first of their
+# next fixtures.
+def build_follow_up_answer(query, teams, context, snapshot, intent, lang='en'):
+    index = snapshot.views.get('index') if snapshot else None
+    match = index.matches.get(context.get('match')) if index and context.get('match') else None
+    if match is not None and intent.question_type in ('live', 'finished'):
+        return Answer(MATCH, intent.question_type, teams, [match], lang=lang,
+                      kickoffs=kickoffs_of([match], snapshot))
+    answer = build_answer(query, teams, snapshot, intent, lang)
+    if answer.kind == NO_MATCH and answer.question_type == 'scheduled' and len(teams) > 1:
+        with span('calendar'):
+            now = tournament_now()
+            matches = [match for team in teams for match in next_matches(team, snapshot, now)[:1]]
+            kickoffs = kickoffs_of(matches, snapshot)
+        if matches:
+            matches.sort(key=lambda match: kickoffs.get(match.match_id) or datetime.max)
+            return Answer(MATCH, answer.question_type, teams, matches, lang=lang, kickoffs=kickoffs)
+    return answer
+
+# Function to build the answer text for a query once its teams are known,
+# rendered straight into the query's language
+def answer_query(query, teams, original_lang, snapshot, intent=None):
+    answer = build_answer(query, teams, snapshot, intent, original_lang)
+    with span('render_answer'):
+        return renderer.render(answer)
+
+# Questions about the AFCON roll of honour ("who won AFCON 2019", "vainqueur
+# de la CAN 2019") name an edition to look it up in AFCON_Winners, not to be
+# answered from that edition's data
+def asks_roll_of_honour(query):
+    return knowledge_matcher.match(translate_query_fr_to_en(query)).question_type == 'winner'
+
+# Function to process several user queries. Each query goes to the shard of
+# the competition it names (or `competition`, or the default one), and each
+# shard's queries are answered together. Responses come back in input order,
+# as text, or as typed Answers when `structured` is set. Chat turns pass the
+# `contexts` of their conversations (see answer_queries), and get back
+# (response, context) pairs; a conversation stays in its competition until
+# a query names another one.
+def process_queries(queries, competition=None, structured=False, contexts=None):
+    routed = {}
+    texts = list(queries)
+    for i, query in enumerate(queries):
+        context = contexts[i] if contexts else None
+        key, texts[i] = shards.route(query, competition, context and context.get('competition'))
+        # The competition named is only cut out of queries sent to its shard;
+        # roll of honour questions keep it (the year) and stay in the default one
+        if texts[i] != query and asks_roll_of_honour(query):
+            key, texts[i] = shards.default, query
+        routed.setdefault(key, []).append(i)
+    
+    responses = [None] * len(queries)
+    for key, indices in routed.items():
+        shard_contexts = None
+        if contexts is not None:
+            # Match ids only mean something in their own competition
+            shard_contexts = [contexts[i] if not contexts[i] or contexts[i].get('competition') == key
+                              else dict(contexts[i], match=None) for i in indices]
+        answered = answer_queries([texts[i] for i in indices], shards.store(key).snapshot(), structured,
+                                  shard_contexts, key)
+        for i, response in zip(indices, answered):
+            if contexts is not None and response[1] is not None:
+                response = response[0], dict(response[1], competition=key)
+            if structured:
+                (response[0] if contexts is not None else response).competition = key
+            responses[i] = response
+    return responses
+
+# Function to answer queries against one data snapshot, running each pipeline
+# stage over the whole batch. Responses come back in input order. With
+# `contexts` (per query, the context of its conversation or None) they come
+# back as (response, context) pairs, the context to keep for the next turn
+# (None to keep the current one). Follow-ups take what they leave out from
+# their context instead of running language detection, team extraction
+# (spaCy, fuzzy matching) and the response cache. `competition` is the
+# snapshot's, which keeps its cached responses apart from other shards'.
+def answer_queries(queries, snapshot, structured=False, contexts=None, competition=None):
+    turns = contexts is not None
+    if not turns:
+        contexts = [None] * len(queries)
+    resolver = get_resolver(snapshot)
+    digest = snapshot.digest if snapshot else None
+    
     # Detect language
-    lang = detect_language(query)
+    with span('detect_language'):
+        langs = [detect_language(query, context.get('lang') if context else None)
+                 for query, context in zip(queries, contexts)]
+    
+    # Tell the follow-ups of conversations from queries that stand on their
+    # own; only the latter are answered the same whoever asks
+    texts = [None] * len(queries)
+    intents = [None] * len(queries)
+    follow_ups = {}
+    dependent = set()
+    in_conversation = [i for i, context in enumerate(contexts) if context]
+    if in_conversation:
+        with span('follow_up'):
+            for i in in_conversation:
+                texts[i] = translate_query_fr_to_en(queries[i]) if langs[i] == 'fr' else queries[i]
+                intent = intent_matcher.match(texts[i])
+                teams, intents[i] = resolve_follow_up(texts[i], intent, contexts[i], resolver, snapshot)
+                if teams is not None:
+                    follow_ups[i] = teams
+                if teams is not None or intents[i] is not intent:
+                    dependent.add(i)
+    
+    # Serve repeated questions from the response cache (text answers only)
+    responses = [None] * len(queries)
+    resolved = [None] * len(queries)
+    if response_cache is not None and not structured:
+        with span('response_cache'):
+            for i, (query, lang) in enumerate(zip(queries, langs)):
+                if i not in dependent:
+                    responses[i], resolved[i] = response_cache.get(query, lang, digest, competition) or (None, None)
+    pending = [i for i, response in enumerate(responses) if response is None]
+    if not pending:
+        return list(zip(responses, resolved)) if turns else responses
     
     # If French, translate to English for processing
-    original_lang = lang
-    if lang == 'fr':
-        query = translate_query_fr_to_en(query)
+    with span('translate_query'):
+        for i in pending:
+            if texts[i] is None:
+                texts[i] = translate_query_fr_to_en(queries[i]) if langs[i] == 'fr' else queries[i]
     
-    # Extract teams from the query
-    teams = extract_teams(query)
+    # Classify each query once: question type plus score-question subject
+    with span('classify_intent'):
+        for i in pending:
+            if intents[i] is None:
+                intents[i] = intent_matcher.match(texts[i])
     
-    # Determine question type
-    question_type = determine_question_type(query)
-    
-    # Check for specific score-related questions
-    score_patterns = [
-        r"(?:what(?:'s| is) the|current) score (?:of|for|between) (.*?)(?:\?|$)",
-        r"score (?:of|for|between) (.*?)(?:\?|$)"
-    ]
-    
-    for pattern in score_patterns:
-        match = re.search(pattern, query, re.IGNORECASE)
-        if match and not teams:
-            teams_text = match.group(1).strip()
-            # Try to extract teams from this specific text
-            potential_teams = teams_text.split(' and ')
-            if len(potential_teams) == 1:
-                potential_teams = teams_text.split(' vs ')
-            if len(potential_teams) == 1:
-                potential_teams = teams_text.split(' against ')
-            
-            if len(potential_teams) == 2:
-                data = load_data()
-                all_teams = set()
-                if data and 'live' in data:
-                    for group in data['live']:
-                        for match in group['mlsf']:
-                            all_teams.add(match['team1'])
-                            all_teams.add(match['team2'])
-                all_teams = list(all_teams)
-                
-                team1_match, score1 = process.extractOne(potential_teams[0].strip(), all_teams, scorer=fuzz.token_sort_ratio)
-                team2_match, score2 = process.extractOne(potential_teams[1].strip(), all_teams, scorer=fuzz.token_sort_ratio)
-                
-                if score1 > 70 and score2 > 70:
-                    teams = [team1_match, team2_match]
-                    # For score questions, prioritize live matches, then finished
-                    question_type = 'live'
-    
-    # If no teams found, return a prompt for more information
-    response = handle_unclear_question()
-    if not teams:
-        response = handle_unclear_question()
-    else:
-        # If one team found, find matches involving that team
-        if len(teams) == 1:
-            matches = find_match(teams[0], status_type=question_type)
-        # If two teams found, find matches between those teams
-        elif len(teams) >= 2:
-            # Try to find matches with the exact order first
-            matches = find_match(teams[0], teams[1], status_type=question_type)
-            
-            # If no matches found, try the reverse order
-            if not matches or len(matches) == 0:
-                matches = find_match(teams[1], teams[0], status_type=question_type)
-        
-        # If no matches found, return appropriate message
-        if not matches or len(matches) == 0:
-            if question_type == 'all':
-                response = f"No matches found for {' vs '.join(teams)}."
-            else:
-                response = f"No {question_type} matches found for {' vs '.join(teams)}."
+    # Extract teams from the queries
+    extracting = [i for i in pending if i not in follow_ups]
+    with span('extract_teams'):
+        teams = dict(zip(extracting, extract_teams_batch([texts[i] for i in extracting], resolver)))
+    
+    for i in pending:
+        if i in follow_ups:
+            answer = build_follow_up_answer(texts[i], follow_ups[i], contexts[i], snapshot, intents[i], langs[i])
         else:
-            # Return formatted response for the first match found
-            response = format_match_response(matches[0])
+            answer = build_answer(texts[i], teams[i], snapshot, intents[i], langs[i])
+        resolved[i] = context_of(answer)
+        if structured:
+            responses[i] = answer
+            continue
+        with span('render_answer'):
+            responses[i] = renderer.render(answer)
+        if response_cache is not None and i not in dependent and not depends_on_clock(answer):
+            response_cache.put(queries[i], langs[i], digest, responses[i], resolved[i], competition)
     
-    # If original query was in French, translate the response back to French
-    if original_lang == 'fr':
-        response = translate_response_en_to_fr(response)
+    if turns:
+        return list(zip(responses, resolved))
+    return responses
+
+# Function to process user query into a typed Answer
+def process_query(query, competition=None):
+    return process_queries([query], competition, structured=True)[0]
+
+# JSON body for structured answers: the Answer fields plus the rendered text
+def answer_payloads(answers):
+    with span('render_answer'):
+        return [{'answer': answer.to_json(), 'text': renderer.render(answer)} for answer in answers]
+
+# Load everything a query needs (match data and its indexes, spaCy,
+# langdetect's profiles), so the first request doesn't pay for it. Run in
+# the gunicorn master before the workers are forked, so they start warm and
+# share these pages; query pool workers run it again as their initializer.
+def warm_up():
+    create_app()
+    views = store.snapshot().views
+    for name in views.pending:
+        views.get(name)
+    get_nlp()
+    language_detector.warm()
+    _warm.set()
+
+# QUERY_WORKERS > 0 runs the query pipeline in a pool of forked worker
+# processes, so CPU-bound NLP never blocks the server's threads or event loop
+app.config['QUERY_WORKERS'] = int(os.environ.get('QUERY_WORKERS', '0'))
+app.config['QUERY_QUEUE_DEPTH'] = int(os.environ.get('QUERY_QUEUE_DEPTH', '0')) or None
+app.config['QUERY_TIMEOUT'] = float(os.environ.get('QUERY_TIMEOUT', '10'))
+
+# Pool workers send their stage timings back along with the responses;
+# structured answers travel back as their JSON payloads
+def process_queries_captured(queries, competition=None, structured=False, contexts=None):
+    if structured:
+        return metrics.captured(lambda: answer_payloads(process_queries(queries, competition, True)))
+    return metrics.captured(process_queries, queries, competition, False, contexts)
+
+# Created by create_app when QUERY_WORKERS > 0
+query_pool = None
+
+# Answer queries in the worker pool when one is configured, inline otherwise.
+# Text responses, or answer payloads (see answer_payloads) when `structured`;
+# (response, context) pairs for chat turns given their `contexts`.
+def run_queries(queries, competition=None, structured=False, contexts=None):
+    if query_pool is not None:
+        with span('query_pool'):
+            responses, spans = query_pool.run(queries, competition, structured, contexts)
+        metrics.record_spans(spans)
+        return responses
+    if structured:
+        return answer_payloads(process_queries(queries, competition, True))
+    return process_queries(queries, competition, False, contexts)
+
+# Function to answer one chat turn of a session: follow-ups are answered
+# from the context the session kept, and the turn is appended with the
+# context for the next one. Returns (response, cursor).
+def run_turn(session_id, user_message, competition=None):
+    with span('session_read'):
+        context = conversations.context(session_id)
+    response, context = run_queries([user_message], competition, contexts=[context])[0]
     
+    # Append the turn to the conversation store
+    with span('session_write'):
+        cursor = conversations.append(session_id, [(user_message, True), (response, False)], context)
+    return response, cursor
+
+# Response for requests turned away because the worker pool is saturated
+def busy_response():
+    response = jsonify({
+        'response': 'Sorry, the server is busy. Please try again in a moment.',
+        'error': 'busy'
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+# Per-request latency histograms, plus sampled trace logs: TRACE_SAMPLE_RATE
+# is the fraction of requests whose stage timings are logged as a JSON line
+app.config['TRACE_SAMPLE_RATE'] = float(os.environ.get('TRACE_SAMPLE_RATE', '0'))
+
+REQUEST_SECONDS = metrics.registry.histogram(
+    'afcon_request_seconds', 'Request latency by route', ('route', 'method', 'status'))
+REQUEST_ERRORS = metrics.registry.counter(
+    'afcon_request_errors_total', 'Requests that failed with an unexpected error', ('route',))
+
+# Servers that skip the factory (`flask run` with FLASK_APP=app.py, a bare
+# test client) still get the stores on their first request. Each serving
+# process starts its own background threads here.
+@app.before_request
+def ensure_created():
+    if _background_pid != os.getpid():
+        start_background_threads()
+
+@app.before_request
+def start_request_timer():
+    g.started = time.perf_counter()
+    g.trace = metrics.start_trace(request.path, app.config['TRACE_SAMPLE_RATE'])
+
+@app.after_request
+def record_request(response):
+    # Label by URL rule, not raw path, to keep the number of series bounded
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    elapsed = time.perf_counter() - g.started
+    REQUEST_SECONDS.labels(route, request.method, str(response.status_code)).observe(elapsed)
+    metrics.end_trace(g.pop('trace', None), method=request.method, status=response.status_code)
     return response
 
+# Hit/miss counters of an LRU-style cache, read when /metrics is scraped
+def register_cache_metrics(prefix, description, get_cache):
+    def read(attr):
+        def value():
+            cache = get_cache()
+            return getattr(cache, attr) if cache is not None else None
+        return value
+
+    def ratio():
+        cache = get_cache()
+        if cache is None:
+            return None
+        lookups = cache.hits + cache.misses
+        return cache.hits / lookups if lookups else 0.0
+
+    metrics.registry.register(prefix + '_hits_total', 'counter', description + ' hits', read('hits'))
+    metrics.registry.register(prefix + '_misses_total', 'counter', description + ' misses', read('misses'))
+    metrics.registry.register(prefix + '_hit_ratio', 'gauge', description + ' hit ratio since start', ratio)
+
+# Gauges and counters read from the stores and caches when /metrics is scraped
+def register_metrics():
+    register_cache_metrics('afcon_response_cache', 'Response cache', lambda: response_cache)
+    register_cache_metrics('afcon_language_cache', 'Language detector cache', lambda: language_detector.cache)
+    register_cache_metrics('afcon_resolver_cache', 'Fuzzy team name cache (current snapshot)',
+                           lambda: get_resolver(store.snapshot()).cache)
+    metrics.registry.register('afcon_response_cache_stale_total', 'counter',
+                              'Cached responses dropped because the data changed',
+                              lambda: response_cache.stale if response_cache is not None else None)
+    metrics.registry.register('afcon_data_reloads_total', 'counter',
+                              'Times the match data was (re)loaded', lambda: store.reload_count)
+    metrics.registry.register('afcon_data_load_errors_total', 'counter',
+                              'Failed attempts to load the match data', lambda: store.load_errors)
+    metrics.registry.register('afcon_data_version', 'gauge',
+                              'Snapshot version currently served', lambda: store.version)
+    register_cache_metrics('afcon_shard_cache', 'Competition shard LRU', lambda: shards.cache)
+    metrics.registry.register('afcon_shards_loaded', 'gauge',
+                              'Competition shards held in memory', lambda: len(shards.loaded()))
+    metrics.registry.register('afcon_shard_loads_total', 'counter',
+                              'Competition shards created (first use or after eviction)', lambda: shards.loads)
+    metrics.registry.register('afcon_match_updates_total', 'counter',
+                              'Match updates applied from the write-ahead log', lambda: store.updates_applied)
+    metrics.registry.register('afcon_match_log_compactions_total', 'counter',
+                              'Times the match update log was folded into the data file',
+                              lambda: store.compactions)
+    if query_pool is not None:
+        metrics.registry.register('afcon_query_pool_pending', 'gauge',
+                                  'Queries queued or running in the worker pool', lambda: query_pool.pending)
+        metrics.registry.register('afcon_query_pool_rejected_total', 'counter',
+                                  'Queries turned away because the pool was full', lambda: query_pool.rejected)
+    metrics.registry.register('afcon_ready', 'gauge',
+                              'Whether the process has finished warming up (see /ready)', lambda: int(is_ready()))
+
+_created = False
+_create_lock = threading.Lock()
+_warm = threading.Event()
+# Processes that started their background threads / a background warm-up
+_background_pid = None
+_warm_up_pid = None
+
+# Application factory. Importing this module only builds tables and
+# registers routes; create_app opens the session store, the match data
+# stores and the response cache and sets up the query pool and metrics. The
+# query pipeline reads these as module globals, so there is one app per
+# process: later calls return the same app. Loading the data and models is
+# left to warm_up, starting the background threads to
+# start_background_threads.
+def create_app():
+    global conversations, store, shards, response_cache, query_pool, _created
+    with _create_lock:
+        if _created:
+            return app
+        logging.basicConfig(
+            level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
+            format='%(asctime)s %(levelname)s %(name)s: %(message)s'
+        )
+        conversations = create_conversation_store(
+            app.config['SESSION_BACKEND'],
+            app.config['CONVERSATION_MAX_MESSAGES'],
+            app.config['SESSION_TTL'],
+            path=app.config['SESSION_DB_PATH'],
+            url=app.config['SESSION_REDIS_URL']
+        )
+        store = create_store(app.config['DB_PATH'], app.config['DB_WAL_PATH'])
+        shards = ShardRegistry(
+            app.config['DEFAULT_COMPETITION'],
+            store,
+            create_store,
+            directory=app.config['DATA_DIR'] or None,
+            capacity=app.config['SHARD_CACHE_SIZE'],
+            default_name='AFCON 2025',
+            default_aliases=['can 2025']
+        )
+        response_cache = create_response_cache(
+            app.config['RESPONSE_CACHE_SIZE'],
+            app.config['RESPONSE_CACHE_TTL'],
+            app.config['RESPONSE_CACHE_URL']
+        )
+        if app.config['QUERY_WORKERS'] > 0:
+            query_pool = QueryPool(
+                process_queries_captured,
+                app.config['QUERY_WORKERS'],
+                max_pending=app.config['QUERY_QUEUE_DEPTH'],
+                warm=warm_up,
+                timeout=app.config['QUERY_TIMEOUT']
+            )
+        register_metrics()
+        _created = True
+    return app
+
+# Background threads of this process: session GC and log compaction.
+# Threads don't survive a fork, so each serving process starts its own (the
+# ASGI lifespan, or the first request) instead of create_app, which gunicorn
+# runs in the master before forking the workers (preload_app).
+def start_background_threads():
+    global _background_pid
+    create_app()
+    with _create_lock:
+        if _background_pid == os.getpid():
+            return
+        _background_pid = os.getpid()
+    start_gc_thread(conversations, app.config['SESSION_GC_INTERVAL'])
+    start_compactor(shards, app.config['DB_COMPACT_INTERVAL'])
+
+# warm_up in a background thread, once per process, for servers that take
+# traffic without calling it (`flask run`, a WSGI server): the first
+# readiness probe starts it and gets 503 until it is done
+def start_warm_up():
+    global _warm_up_pid
+    with _create_lock:
+        if _warm.is_set() or _warm_up_pid == os.getpid():
+            return
+        _warm_up_pid = os.getpid()
+
+    def run():
+        try:
+            warm_up()
+        except Exception:
+            logger.exception("Warm-up failed")
+
+    threading.Thread(target=run, name='warm-up', daemon=True).start()
+
+# Ready to take traffic: warmed up, with match data loaded. Unlike /health
+# (the process is up), this stays false while the models and data load.
+def is_ready():
+    return _warm.is_set() and store is not None and store.snapshot() is not None
+
+# Session id from the signed cookie, creating one if needed
+def get_session_id(create=True):
+    session_id = session.get('session_id')
+    if not session_id and create:
+        session_id = str(uuid.uuid4())
+        session['session_id'] = session_id
+        session.permanent = True
+    return session_id
+
+# Competition the client asked for (?competition= or "competition" in the
+# body) as a shard key, or None to route by the query text
+def requested_competition(data):
+    name = request.args.get('competition') or data.get('competition')
+    return shards.key_for(str(name)) if name else None
+
+# Response for a competition that isn't served here
+def unknown_competition_response(e):
+    return jsonify({'error': f"Unknown competition: {e.args[0]}"}), 404
+
+# Whether the client asked for just the new turn (?delta=1 or "delta": true)
+def wants_delta(data):
+    flag = request.args.get('delta', data.get('delta', False))
+    return str(flag).lower() in ('1', 'true', 'yes')
+
+# Chat response body: the new turn plus a cursor in delta mode, otherwise the
+# whole stored conversation
+def chat_payload(session_id, user_message, response, cursor):
+    if wants_delta(request.json or {}):
+        return {
+            'response': response,
+            'turn': [
+                {'seq': cursor - 1, 'message': user_message, 'isUser': True},
+                {'seq': cursor, 'message': response, 'isUser': False}
+            ],
+            'cursor': cursor
+        }
+    with span('session_read'):
+        conversation = conversations.history(session_id)
+    return {
+        'response': response,
+        'conversation': conversation
+    }
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     try:
@@ -536,32 +1303,87 @@ def chat():
             return jsonify({'response': 'Please enter a message.'})
         
         # Get or create session ID
-        session_id = session.get('session_id')
-        if not session_id:
-            session_id = str(uuid.uuid4())
-            session['session_id'] = session_id
-            session['conversation'] = []
-        
-        # Process the user's query
-        response = process_query(user_message)
+        session_id = get_session_id()
         
-        # Store the conversation in session
-        conversation = session.get('conversation', [])
-        conversation.append({'message': user_message, 'isUser': True})
-        conversation.append({'message': response, 'isUser': False})
-        session['conversation'] = conversation
+        # Process the user's query, in the context of the conversation
+        response, cursor = run_turn(session_id, user_message, requested_competition(data))
         
+        payload = chat_payload(session_id, user_message, response, cursor)
+        with span('serialize'):
+            return jsonify(payload)
+    except UnknownCompetition as e:
+        return unknown_competition_response(e)
+    except PoolBusy:
+        return busy_response()
+    except Exception as e:
+        logger.exception("Error in chat endpoint")
+        REQUEST_ERRORS.labels(request.endpoint).inc()
         return jsonify({
-            'response': response,
-            'conversation': conversation
-        })
+            'response': 'Sorry, there was an error processing your request. Please try again.',
+            'error': str(e)
+        }), 500
+
+@app.route('/api/chat/batch', methods=['POST'])
+def chat_batch():
+    try:
+        data = request.json or {}
+        messages = data.get('messages')
+        
+        if not isinstance(messages, list) or not messages:
+            return jsonify({'error': "Expected a non-empty 'messages' list."}), 400
+        if len(messages) > app.config['BATCH_MAX_MESSAGES']:
+            return jsonify({'error': f"At most {app.config['BATCH_MAX_MESSAGES']} messages per batch."}), 413
+        
+        # Answer the non-empty messages together, keeping input order
+        queries = [m if isinstance(m, str) else '' for m in messages]
+        answered = iter(run_queries([q for q in queries if q], requested_competition(data)))
+        responses = [next(answered) if q else 'Please enter a message.' for q in queries]
+        
+        with span('serialize'):
+            return jsonify({'responses': responses})
+    except UnknownCompetition as e:
+        return unknown_competition_response(e)
+    except PoolBusy:
+        return busy_response()
     except Exception as e:
-        print(f"Error in chat endpoint: {e}")
+        logger.exception("Error in batch chat endpoint")
+        REQUEST_ERRORS.labels(request.endpoint).inc()
         return jsonify({
             'response': 'Sorry, there was an error processing your request. Please try again.',
             'error': str(e)
         }), 500
 
+@app.route('/api/v2/answer', methods=['POST'])
+def answer_v2():
+    # Structured answer: {"answer": {kind, intent, teams, lang, competition,
+    # matches}, "text": ...}. Stateless: nothing is added to the conversation.
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': "Expected a JSON object."}), 400
+        messages = data.get('messages')
+        if messages is None:
+            message = data.get('message')
+            if not isinstance(message, str) or not message:
+                return jsonify({'error': "Expected a non-empty 'message' or 'messages' list."}), 400
+            payload = run_queries([message], requested_competition(data), structured=True)[0]
+        else:
+            if not isinstance(messages, list) or not messages or not all(isinstance(m, str) and m for m in messages):
+                return jsonify({'error': "Expected a non-empty 'messages' list of strings."}), 400
+            if len(messages) > app.config['BATCH_MAX_MESSAGES']:
+                return jsonify({'error': f"At most {app.config['BATCH_MAX_MESSAGES']} messages per batch."}), 413
+            payload = {'answers': run_queries(messages, requested_competition(data), structured=True)}
+        with span('serialize'):
+            return jsonify(payload)
+    except UnknownCompetition as e:
+        return unknown_competition_response(e)
+    except PoolBusy:
+        return busy_response()
+    except Exception as e:
+        logger.exception("Error in answer endpoint")
+        REQUEST_ERRORS.labels(request.endpoint).inc()
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/query', methods=['POST', 'OPTIONS'])
 def query():
     # Handle preflight OPTIONS request
@@ -576,27 +1398,21 @@ def query():
             return jsonify({'response': 'Please enter a message.'})
         
         # Get or create session ID
-        session_id = session.get('session_id')
-        if not session_id:
-            session_id = str(uuid.uuid4())
-            session['session_id'] = session_id
-            session['conversation'] = []
+        session_id = get_session_id()
         
-        # Process the user's query
-        response = process_query(user_message)
+        # Process the user's query, in the context of the conversation
+        response, cursor = run_turn(session_id, user_message, requested_competition(data))
         
-        # Store the conversation in session
-        conversation = session.get('conversation', [])
-        conversation.append({'message': user_message, 'isUser': True})
-        conversation.append({'message': response, 'isUser': False})
-        session['conversation'] = conversation
-        
-        return jsonify({
-            'response': response,
-            'conversation': conversation
-        })
+        payload = chat_payload(session_id, user_message, response, cursor)
+        with span('serialize'):
+            return jsonify(payload)
+    except UnknownCompetition as e:
+        return unknown_competition_response(e)
+    except PoolBusy:
+        return busy_response()
     except Exception as e:
-        print(f"Error in query endpoint: {e}")
+        logger.exception("Error in query endpoint")
+        REQUEST_ERRORS.labels(request.endpoint).inc()
         return jsonify({
             'response': 'Sorry, there was an error processing your request. Please try again.',
             'error': str(e)
@@ -608,25 +1424,167 @@ def index():
 
 @app.route('/api/conversation', methods=['GET'])
 def get_conversation():
-    # Get conversation from session
-    conversation = session.get('conversation', [])
-    return jsonify({'conversation': conversation})
+    # Page through the conversation: messages after `since`, at most `limit`
+    since = request.args.get('since', 0, type=int)
+    limit = min(request.args.get('limit', app.config['CONVERSATION_MAX_MESSAGES'], type=int),
+                app.config['CONVERSATION_MAX_MESSAGES'])
+    # A page can't be empty: has_more would stay true and paging never end
+    if limit < 1:
+        return jsonify({'error': "'limit' must be at least 1."}), 400
+    session_id = get_session_id(create=False)
+    if not session_id:
+        return jsonify({'conversation': [], 'cursor': since, 'has_more': False})
+    
+    # The latest sequence number identifies the history, so a client polling
+    # with If-None-Match gets a 304 without the history being read
+    etag = f"{session_id[:8]}-{conversations.last_seq(session_id)}-{since}-{limit}"
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        conversation = conversations.history(session_id, since=since, limit=limit + 1)
+        has_more = len(conversation) > limit
+        conversation = conversation[:limit]
+        response = jsonify({
+            'conversation': conversation,
+            'cursor': conversation[-1]['seq'] if conversation else since,
+            'has_more': has_more
+        })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Cookie')
+    return response
 
 @app.route('/api/conversation/clear', methods=['POST'])
 def clear_conversation():
-    # Clear conversation in session
-    session['conversation'] = []
+    # Clear conversation for this session
+    session_id = get_session_id(create=False)
+    if session_id:
+        conversations.clear(session_id)
     return jsonify({'status': 'success', 'message': 'Conversation cleared'})
 
+# None if the request carries the write API token, else the error response
+def check_match_token():
+    token = app.config['MATCH_API_TOKEN']
+    if not token:
+        return jsonify({'error': 'Match updates are disabled.'}), 403
+    scheme, _, given = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(given.encode(), token.encode()):
+        response = jsonify({'error': 'Invalid or missing token.'})
+        response.headers['WWW-Authenticate'] = 'Bearer'
+        return response, 401
+    return None
+
+# Apply [(match_id, fields)] to the requested competition (?competition=,
+# default competition otherwise) and build the API response
+def apply_match_updates(updates):
+    try:
+        name = request.args.get('competition')
+        shard = shards.store(shards.key_for(name) if name else shards.default)
+    except UnknownCompetition as e:
+        return unknown_competition_response(e)
+    try:
+        for _, fields in updates:
+            parse_changes(fields)
+        records = shard.update(updates)
+    except KeyError as e:
+        return jsonify({'error': f"Unknown match: {e.args[0]}"}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'matches': [match_delta(match) for match in records],
+        'version': shard.snapshot().digest
+    })
+
+@app.route('/api/matches/<match_id>', methods=['PATCH'])
+def update_match(match_id):
+    # {"score1": 2, "score2": 1, "status": "live", "time": "67'"}, any subset
+    denied = check_match_token()
+    if denied:
+        return denied
+    return apply_match_updates([(match_id, request.get_json(silent=True))])
+
+@app.route('/api/matches', methods=['PATCH'])
+def update_matches():
+    # {"updates": [{"id": "GA-1", "score1": 2}, ...]}, applied all or nothing
+    denied = check_match_token()
+    if denied:
+        return denied
+    data = request.get_json(silent=True)
+    updates = data.get('updates') if isinstance(data, dict) else None
+    if (not isinstance(updates, list) or not updates
+            or not all(isinstance(u, dict) and isinstance(u.get('id'), str) for u in updates)):
+        return jsonify({'error': "Expected a non-empty 'updates' list of objects with an 'id'."}), 400
+    if len(updates) > app.config['MATCH_UPDATE_MAX']:
+        return jsonify({'error': f"At most {app.config['MATCH_UPDATE_MAX']} updates per request."}), 413
+    return apply_match_updates([
+        (update.get('id'), {k: v for k, v in update.items() if k != 'id'}) for update in updates
+    ])
+
+@app.route('/api/competitions', methods=['GET'])
+def list_competitions():
+    # Competitions served here; `loaded` shards are in memory right now
+    loaded = {key for key, _ in shards.loaded()}
+    return jsonify({
+        'default': shards.default,
+        'competitions': [
+            {'key': c.key, 'name': c.name, 'aliases': c.aliases, 'loaded': c.key in loaded}
+            for c in shards.competitions.values()
+        ]
+    })
+
+@app.route('/api/standings', methods=['GET'])
+def standings_table():
+    # Group tables derived from the fixtures; ?group=A for one group,
+    # ?competition= for another competition
+    try:
+        name = request.args.get('competition')
+        key = shards.key_for(name) if name else shards.default
+    except UnknownCompetition as e:
+        return unknown_competition_response(e)
+    snapshot = shards.store(key).snapshot()
+    standings = snapshot.views.get('standings') if snapshot else None
+    if standings is None:
+        return jsonify({'error': 'Match data is not available.'}), 503
+    group = request.args.get('group')
+    if group:
+        table = standings.group(group)
+        if table is None:
+            return jsonify({'error': f"Unknown group: {group}"}), 404
+        tables = [table]
+    else:
+        tables = list(standings)
+    return jsonify({
+        'competition': key,
+        'version': snapshot.digest,
+        'groups': [table.to_json() for table in tables]
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    # Prometheus text exposition format
+    return app.response_class(metrics.registry.render(),
+                              content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/health', methods=['GET'])
 def health_check():
     # Add a health check endpoint for Docker
     return jsonify({'status': 'healthy'})
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    # Readiness probe: 503 until warm_up has loaded the data and models
+    if not is_ready():
+        start_warm_up()
+        return jsonify({'status': 'starting'}), 503
+    return jsonify({'status': 'ready', 'version': store.snapshot().digest})
+
 if __name__ == '__main__':
     # Use environment variables for host and port if available
     host = os.environ.get('HOST', '0.0.0.0')
     port = int(os.environ.get('PORT', 5555))
     debug = os.environ.get('DEBUG', 'False').lower() == 'true'
-    
+
+    create_app()
+    warm_up()
+    start_background_threads()
     app.run(host=host, port=port, debug=debug)
\ No newline at end of file
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import os
+from urllib.parse import parse_qs
+
+from a2wsgi import WSGIMiddleware
+
+import app as chatbot
+import metrics
+from live_feed import LiveFeed, match_delta
+
+# ASGI entry point: serves the live score stream natively and hands every
+# other request to the Flask app. Flask views run on a thread pool (size set
+# by ASGI_THREADS), and with QUERY_WORKERS > 0 the NLP pipeline runs in a
+# process pool, so the event loop itself only shuffles bytes.
+#
+#   uvicorn asgi:application --host 0.0.0.0 --port 5555
+#   gunicorn -c gunicorn.conf.py asgi:application
+
+feed = LiveFeed()
+flask_app = WSGIMiddleware(chatbot.create_app(), workers=int(os.environ.get('ASGI_THREADS', '32')))
+
+LIVE_POLL_INTERVAL = float(os.environ.get('LIVE_POLL_INTERVAL', '1.0'))
+LIVE_HEARTBEAT = float(os.environ.get('LIVE_HEARTBEAT', '15'))
+
+# Updates from the write API (or tailed from another worker's log) go out as
+# soon as they are applied instead of on the next poll
+chatbot.store.listeners.append(
+    lambda records: feed.publish_threadsafe([match_delta(match) for match in records]))
+
+metrics.registry.register('afcon_live_subscribers', 'gauge',
+                          'Clients connected to /api/live', lambda: feed.connected)
+metrics.registry.register('afcon_live_published_total', 'counter',
+                          'Match deltas published to the live feed', lambda: feed.published)
+
+
+# Topics requested with ?team=<name> and/or ?match=<id> (both repeatable).
+# Team names go through the resolver, so "maroc" or "Morroco" both work.
+def requested_topics(query_string, snapshot):
+    params = parse_qs(query_string.decode('latin-1'))
+    resolver = chatbot.get_resolver(snapshot)
+    index = snapshot.views.get('index') if snapshot else None
+    topics = []
+    for name in params.get('team', []):
+        team = resolver.resolve(name)
+        if team:
+            topics.append('team:' + team)
+    for match_id in params.get('match', []):
+        if index and match_id in index.matches:
+            topics.append('match:' + match_id)
+    return topics
+
+
+# Current state of every match covered by the topics, sent on connect
+def initial_state(topics, snapshot):
+    index = snapshot.views.get('index') if snapshot else None
+    if not index:
+        return []
+    states = {}
+    for topic in topics:
+        kind, key = topic.split(':', 1)
+        matches = [index.matches[key]] if kind == 'match' else index.lookup(key)
+        for match in matches:
+            states[match.match_id] = match_delta(match)
+    return list(states.values())
+
+
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n".encode('utf-8')
+
+
+async def send_json(send, status, payload):
+    body = json.dumps(payload).encode('utf-8')
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'),
+                            (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+# Snapshot and topics of a subscription request
+def subscription_request(query_string):
+    snapshot = chatbot.store.snapshot()
+    return snapshot, requested_topics(query_string, snapshot)
+
+
+# GET /api/live?team=Morocco&match=GA-1 -> text/event-stream of match deltas
+async def live_stream(scope, receive, send):
+    # Getting the snapshot may stat and reload the data file, and names go
+    # through fuzzy matching: both run in a worker thread, off the loop
+    loop = asyncio.get_running_loop()
+    snapshot, topics = await loop.run_in_executor(None, subscription_request, scope.get('query_string', b''))
+    if not topics:
+        await send_json(send, 400, {'error': "Subscribe with ?team=<name> or ?match=<id>."})
+        return
+
+    subscription = feed.subscribe(topics)
+    disconnected = False
+
+    async def watch_disconnect():
+        nonlocal disconnected
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                disconnected = True
+                subscription.event.set()
+                return
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'text/event-stream'),
+                                (b'cache-control', b'no-cache'),
+                                (b'x-accel-buffering', b'no')]})
+        await send({'type': 'http.response.body', 'more_body': True,
+                    'body': sse_event('snapshot', initial_state(topics, snapshot))})
+        while not disconnected:
+            deltas = await subscription.next(LIVE_HEARTBEAT)
+            if disconnected:
+                break
+            body = b''.join(sse_event('match', delta) for delta in deltas) or b': keep-alive\n\n'
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    except OSError:
+        pass
+    finally:
+        feed.unsubscribe(subscription)
+        watcher.cancel()
+
+
+async def lifespan(scope, receive, send):
+    watch_task = None
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # Load models and data (and fork the query pool from that warm
+            # state) before accepting traffic
+            loop = asyncio.get_running_loop()
+            if chatbot.query_pool is not None:
+                await loop.run_in_executor(None, chatbot.query_pool.executor)
+            else:
+                await loop.run_in_executor(None, chatbot.warm_up)
+            # In the worker, after the fork (and after forking the pool)
+            chatbot.start_background_threads()
+            watch_task = asyncio.ensure_future(feed.watch(chatbot.store, LIVE_POLL_INTERVAL))
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if watch_task:
+                watch_task.cancel()
+            if chatbot.query_pool is not None:
+                chatbot.query_pool.shutdown()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(scope, receive, send)
+    elif scope['type'] == 'http' and scope['path'] == '/api/live' and scope['method'] == 'GET':
+        await live_stream(scope, receive, send)
+    else:
+        await flask_app(scope, receive, send)
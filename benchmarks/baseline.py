@@ -0,0 +1,58 @@
+# Stored benchmark results (benchmarks/baseline.json) and the regression
+# check against them. Each benchmark owns a section of the file:
+#
+#   {"pipeline": {"find_match_us": 1.9, ...}, "replay": {"p99_ms": 12.0, ...}}
+#
+# Baselines are machine-specific: record them with --save-baseline on the
+# machine that runs the comparison.
+import json
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+
+def load_baseline(path=BASELINE):
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(section, results, path=BASELINE):
+    baseline = load_baseline(path)
+    baseline[section] = {name: round(value, 3) for name, value in results.items()}
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(baseline, file, indent=1, sort_keys=True)
+        file.write('\n')
+
+
+# Metrics that got worse than the baseline by more than `threshold` (0.2 =
+# 20%). Names in `higher_is_better` regress when they drop, all others
+# (latencies) when they grow.
+def regressions(section, results, threshold, higher_is_better=(), path=BASELINE):
+    expected = load_baseline(path).get(section, {})
+    failed = []
+    for name, value in results.items():
+        base = expected.get(name)
+        if not base:
+            continue
+        change = (base - value) / base if name in higher_is_better else (value - base) / base
+        if change > threshold:
+            failed.append(f"{name}: {value:.3f} vs baseline {base:.3f} ({change:+.0%} worse)")
+    return failed
+
+
+# Print the comparison for `section` and return whether it passed
+def check(section, results, threshold, higher_is_better=(), path=BASELINE):
+    if section not in load_baseline(path):
+        print(f"No '{section}' baseline in {path}; run with --save-baseline to record one")
+        return True
+    failed = regressions(section, results, threshold, higher_is_better, path)
+    for line in failed:
+        print(f"REGRESSION {line}")
+    if not failed:
+        print(f"Within {threshold:.0%} of the '{section}' baseline")
+    return not failed
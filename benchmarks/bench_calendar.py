@@ -0,0 +1,99 @@
+# Calendar questions ("next match for X", "matches today", "between 15:00 and
+# 18:00") answered from the Calendar view versus a scan of MatchCan that
+# parses the date and time strings of every entry, as the calendar grows.
+# The index lookups should stay flat while the scan grows with the number of
+# fixtures. Also times building the view, once per snapshot.
+#
+#   python -m benchmarks.bench_calendar [--groups 10 100 1000]
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.bench_find_match import synthetic_tournament
+from match_index import MatchIndex
+from schedule import build_calendar, parse_kickoff
+
+START = datetime(2025, 12, 21)
+KICKOFFS = ('03:00 PM', '06:00 PM', '09:00 PM')
+# Fixtures of one group on each matchday
+PER_DAY = 3
+
+
+# MatchCan section for the synthetic fixtures: each group plays PER_DAY
+# games a day, spread over the kickoff slots
+def synthetic_calendar(data):
+    groups = []
+    for g, group in enumerate(data['live']):
+        matches = []
+        for i, match in enumerate(group['mlsf']):
+            day = START + timedelta(days=i // PER_DAY)
+            matches.append({'date': f"{day:%d/%m/%y}", 'time': KICKOFFS[(g + i) % len(KICKOFFS)],
+                            'team1': {'arabic': match['team1']}, 'team2': {'arabic': match['team2']}})
+        groups.append({'name': f"Group {g}", 'rounds': [{'round': 'Round 1', 'matches': matches}]})
+    return groups
+
+
+# The scan the index replaces: parse every entry, keep those that match
+def scan(data, keep):
+    found = []
+    for group in data['MatchCan']:
+        for group_round in group['rounds']:
+            for entry in group_round['matches']:
+                kickoff = parse_kickoff(entry['date'], entry['time'])
+                if keep(kickoff, entry['team1']['arabic'], entry['team2']['arabic']):
+                    found.append((kickoff, entry))
+    return found
+
+
+def scan_next(data, team, now):
+    found = scan(data, lambda kickoff, team1, team2: kickoff >= now and team in (team1, team2))
+    return min(found, key=lambda item: item[0]) if found else None
+
+
+def per_call_us(fn, items):
+    started = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - started) / len(items) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--groups', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'fixtures':>9} {'build ms':>9} {'next scan us':>13} {'next index us':>14} "
+          f"{'window scan us':>15} {'window index us':>16}")
+    for groups in args.groups:
+        data = synthetic_tournament(groups)
+        data['MatchCan'] = synthetic_calendar(data)
+        views = {'index': MatchIndex(data)}
+        started = time.perf_counter()
+        calendar = build_calendar(data, views)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        teams = views['index'].teams
+        days = sorted(calendar.days)
+        nexts = [(rng.choice(teams), datetime.combine(rng.choice(days), datetime.min.time()))
+                 for _ in range(args.queries)]
+        windows = []
+        for _ in range(args.queries):
+            start = datetime.combine(rng.choice(days), datetime.min.time()) + timedelta(hours=15)
+            windows.append((start, start + timedelta(hours=3)))
+
+        # A few scans are enough to time them at the larger sizes
+        few = max(1, args.queries // 10)
+        next_scan = per_call_us(lambda query: scan_next(data, *query), nexts[:few])
+        next_index = per_call_us(lambda query: next(calendar.upcoming(query[1], query[0]), None), nexts)
+        window_scan = per_call_us(
+            lambda window: scan(data, lambda kickoff, team1, team2: window[0] <= kickoff < window[1]), windows[:few])
+        window_index = per_call_us(lambda window: calendar.between(*window), windows)
+        print(f"{len(calendar):>9} {build_ms:>9.1f} {next_scan:>13.1f} {next_index:>14.1f} "
+              f"{window_scan:>15.1f} {window_index:>16.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+# Micro-benchmark: linear scan of data['live'] (the old find_match) versus the
+# precomputed MatchIndex, on a synthetic tournament of several thousand fixtures.
+#
+#   python -m benchmarks.bench_find_match [--groups 400] [--repeat 5]
+import argparse
+import random
+import timeit
+
+from match_index import MatchIndex, STATUSES
+
+
+# Build a db.json-shaped dict with `groups` groups of `teams_per_group` teams,
+# every pair meeting twice (home and away)
+def synthetic_tournament(groups, teams_per_group=6, seed=0):
+    rng = random.Random(seed)
+    live = []
+    for g in range(groups):
+        teams = [f"Team {g}-{t}" for t in range(teams_per_group)]
+        mlsf = []
+        for i, team1 in enumerate(teams):
+            for team2 in teams[i + 1:]:
+                for home, away in ((team1, team2), (team2, team1)):
+                    mlsf.append({
+                        'team1': home, 'team2': away,
+                        'status': rng.choice(STATUSES),
+                        'score1': rng.randint(0, 4), 'score2': rng.randint(0, 4),
+                        'time': 'FT',
+                    })
+        live.append({'name': f"G{g}", 'mlsf': mlsf})
+    return {'live': live, 'knockout_stage': {}}
+
+
+# The pre-index implementation of find_match, kept here as the baseline
+def scan_find_match(data, team1, team2=None, status_type='all'):
+    matches = []
+    for group in data['live']:
+        for match in group['mlsf']:
+            if team2:
+                teams_match = ((match['team1'] == team1 and match['team2'] == team2) or
+                               (match['team1'] == team2 and match['team2'] == team1))
+            else:
+                teams_match = (match['team1'] == team1 or match['team2'] == team1)
+            status_match = status_type == 'all' or match['status'] == status_type
+            if teams_match and status_match:
+                matches.append(match)
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--groups', type=int, default=400)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    data = synthetic_tournament(args.groups)
+    fixtures = sum(len(g['mlsf']) for g in data['live'])
+    build = min(timeit.repeat(lambda: MatchIndex(data), number=1, repeat=args.repeat))
+    index = MatchIndex(data)
+
+    rng = random.Random(1)
+    queries = []
+    for _ in range(args.queries):
+        group = rng.choice(data['live'])
+        match = rng.choice(group['mlsf'])
+        team2 = match['team2'] if rng.random() < 0.7 else None
+        queries.append((match['team1'], team2, rng.choice(STATUSES + ['all'])))
+
+    # Sanity check: both implementations agree (as unordered lists)
+    def fixtures_of(matches):
+        return sorted(tuple(sorted(m.items())) for m in matches)
+
+    for team1, team2, status in queries:
+        expected = fixtures_of(scan_find_match(data, team1, team2, status))
+        assert fixtures_of(m.to_json() for m in index.lookup(team1, team2, status)) == expected
+
+    def run_scan():
+        for q in queries:
+            scan_find_match(data, *q)
+
+    def run_index():
+        for q in queries:
+            index.lookup(*q)
+
+    scan = min(timeit.repeat(run_scan, number=1, repeat=args.repeat)) / len(queries)
+    indexed = min(timeit.repeat(run_index, number=1, repeat=args.repeat)) / len(queries)
+
+    print(f"fixtures:            {fixtures}")
+    print(f"index build:         {build * 1e3:.2f} ms (once per snapshot)")
+    print(f"linear scan lookup:  {scan * 1e6:.1f} us")
+    print(f"indexed lookup:      {indexed * 1e6:.2f} us")
+    print(f"speedup:             {scan / indexed:.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# Follow-up questions of a conversation ("and the score now?", "et le
+# prochain match ?") answered from the session's context versus the same
+# texts without one, which go through spaCy and fuzzy matching only to come
+# out unclear, and versus retyping the full question. The response cache is
+# off, so every turn runs the pipeline.
+#
+#   python -m benchmarks.bench_follow_up [--repeat 7]
+import argparse
+import os
+import timeit
+
+os.environ.setdefault('SESSION_BACKEND', 'memory')
+
+import app
+
+# (follow-up, the full question a user would retype instead)
+TURNS = [
+    ("and the score now?", "What is the score of Morocco vs Mali now?"),
+    ("et le prochain match ?", "Quand est le prochain match du Maroc ?"),
+    ("who is winning?", "Who is winning between Morocco and Mali?"),
+    ("and their coach?", "Who is the coach of Morocco?"),
+    ("what about the standings?", "Morocco group standings"),
+]
+OPENING = "Morocco vs Mali score"
+# A turn that names no team, after which follow-ups still take the opening's
+INTERLUDE = "matches today"
+
+
+def per_turn_us(queries, contexts, repeat):
+    timer = timeit.Timer(lambda: app.process_queries(queries, contexts=contexts))
+    number, _ = timer.autorange()
+    return min(timer.repeat(number=number, repeat=repeat)) / number / len(queries) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args()
+
+    app.warm_up()
+    app.response_cache = None
+    _, context = app.process_queries([OPENING], contexts=[None])[0]
+    follow_ups = [follow_up for follow_up, _ in TURNS]
+    full = [question for _, question in TURNS]
+
+    with_context = app.process_queries(follow_ups, contexts=[context] * len(TURNS))
+    without_context = app.process_queries(follow_ups, contexts=[None] * len(TURNS))
+    for (follow_up, _), (answer, _), (unclear, _) in zip(TURNS, with_context, without_context):
+        print(f"{follow_up!r:30} {answer!r}\n{'':30} without context: {unclear!r}")
+    _, kept = app.process_queries([INTERLUDE], contexts=[context])[0]
+    (answer, _), = app.process_queries([follow_ups[0]], contexts=[kept or context])
+    print(f"{follow_ups[0]!r:30} {answer!r}\n{'':30} after {INTERLUDE!r}")
+    print()
+    print(f"{'turn':<26} {'us/turn':>9}")
+    print(f"{'follow-up, context':<26} {per_turn_us(follow_ups, [context] * len(TURNS), args.repeat):>9.1f}")
+    print(f"{'follow-up, no context':<26} {per_turn_us(follow_ups, [None] * len(TURNS), args.repeat):>9.1f}")
+    print(f"{'full question':<26} {per_turn_us(full, [None] * len(TURNS), args.repeat):>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# Accuracy and latency of the question-type classifier on a labelled query set
+# (benchmarks/data/intent_queries.json), against the substring scan it
+# replaced. French rows go through the query translation first, like in the
+# pipeline. Exits non-zero if the matcher's accuracy drops below
+# --min-accuracy.
+#
+#   python -m benchmarks.bench_intent [--min-accuracy 1.0]
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+
+from app import determine_question_type, intent_matcher, translate_query_fr_to_en
+
+DATA = os.path.join(os.path.dirname(__file__), 'data', 'intent_queries.json')
+
+
+SCORE_PATTERNS = [
+    re.compile(r"(?:what(?:'s| is) the|current) score (?:of|for|between) (.*?)(?:\?|$)", re.IGNORECASE),
+    re.compile(r"score (?:of|for|between) (.*?)(?:\?|$)", re.IGNORECASE)
+]
+
+
+# The previous classifier: substring checks over three cue lists
+def substring_question_type(query):
+    query = query.lower()
+    for indicator in ['live', 'going', 'happening', 'now', 'current', 'playing right now',
+                      'what is the score', 'what\'s the score']:
+        if indicator in query:
+            return 'live'
+    for indicator in ['when', 'will', 'schedule', 'upcoming', 'soon', 'next', 'date', 'playing']:
+        if indicator in query:
+            return 'scheduled'
+    for indicator in ['result', 'won', 'win', 'lost', 'score', 'was', 'did', 'perform', 'final']:
+        if indicator in query:
+            return 'finished'
+    return 'all'
+
+
+# Everything the previous answer path did per query: the substring scan plus
+# the score-question patterns
+def substring_intent(query):
+    question_type = substring_question_type(query)
+    for pattern in SCORE_PATTERNS:
+        pattern.search(query)
+    return question_type
+
+
+def evaluate(classify, rows, texts):
+    wrong = [(row, got) for row, text in zip(rows, texts) if (got := classify(text)) != row['intent']]
+    return 1 - len(wrong) / len(rows), wrong
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--min-accuracy', type=float, default=1.0)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with open(DATA, encoding='utf-8') as file:
+        rows = json.load(file)
+    texts = [translate_query_fr_to_en(row['text']) if row['lang'] == 'fr' else row['text'] for row in rows]
+
+    failed = False
+    for name, classify in [('substring', substring_intent), ('matcher', determine_question_type)]:
+        accuracy, wrong = evaluate(classify, rows, texts)
+        per_query = min(timeit.repeat(lambda: [classify(t) for t in texts], number=1,
+                                      repeat=args.repeat)) / len(texts)
+        print(f"{name:<10} accuracy {accuracy:6.1%}   {per_query * 1e6:7.2f} us/query")
+        for row, got in wrong:
+            print(f"    expected {row['intent']}, got {got}: {row['text']}")
+        if name == 'matcher' and accuracy < args.min_accuracy:
+            failed = True
+
+    # Spans found for a few queries, to eyeball the longest-match rule
+    for text in texts[:3]:
+        print(f"    {text!r}: {intent_matcher.match(text)}")
+
+    if failed:
+        print(f"intent accuracy below {args.min_accuracy:.0%}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+# Latency of info questions (coach, player, stadium, AFCON winner) answered
+# from the knowledge index versus a scan of the nested db.json sections, as
+# the reference data grows (--scales copies every team, player and stadium
+# under new names). Also times building the index from scratch and a reload
+# where only the fixtures changed, which reuses every segment.
+#
+#   python -m benchmarks.bench_knowledge [--scales 1 10 100]
+import argparse
+import copy
+import json
+import os
+import string
+import time
+
+os.environ.setdefault('SESSION_BACKEND', 'memory')
+
+import app
+from knowledge import KnowledgeBuilder, tokenize
+
+QUERIES = [
+    ('coach', "Who is the coach of Morocco?", ['Morocco']),
+    ('captain', "Who is the captain of Senegal?", ['Senegal']),
+    ('player', "Which club does Achraf Hakimi play for?", []),
+    ('player', "Morocco goalkeepers", ['Morocco']),
+    ('player', "Mohamed Salah", []),
+    ('stadium', "What is the capacity of Fes Stadium?", []),
+    ('stadium', "stadiums in Rabat", []),
+    ('winner', "Who won AFCON 2019?", []),
+]
+
+
+# db.json with `scale` copies of the teams, players and stadiums, the copies
+# renamed so they never match the benchmark queries
+def scaled(data, scale):
+    data = copy.deepcopy(data)
+    if scale <= 1:
+        return data
+    originals = {key: copy.deepcopy(data[key]) for key in ('teams', 'players', 'stadiums')}
+    for i in range(1, scale):
+        tag = ''.join(string.ascii_lowercase[(i // 26 ** n) % 26] for n in range(3))
+        for group, teams in originals['teams'].items():
+            for team in teams:
+                team = copy.deepcopy(team)
+                team['name'] += f" {tag}"
+                for player in team['squad']:
+                    player['name'] += f" {tag}"
+                data['teams'].setdefault(f"{group}-{tag}", []).append(team)
+        for country in originals['players']:
+            country = copy.deepcopy(country)
+            country['name'] += f" {tag}"
+            for line in ('goalkeepers', 'defenders', 'midfielders', 'forwards'):
+                for player in country.get(line, ()):
+                    player['name'] += f" {tag}"
+            data['players'].append(country)
+        for stadium in originals['stadiums']:
+            data['stadiums'].append({**stadium, 'name': f"{stadium['name']} {tag}", 'city': f"{stadium['city']} {tag}"})
+    return data
+
+
+# The scan the index replaces: walk every team, squad, player list, stadium
+# and edition, keeping those whose text holds all of the query's words
+def scan_facts(data, aspect, query, teams):
+    words = [w for w in tokenize(query) if w not in app.knowledge_cue_words and w not in
+             ('who', 'is', 'the', 'of', 'what', 'which', 'does', 'play', 'for', 'in')]
+    if aspect in ('coach', 'captain'):
+        return [team for group in data['teams'].values() for team in group if team['name'] in teams]
+    if aspect == 'winner':
+        return [edition for edition in data['AFCON_Winners'] if str(edition['year']) in words]
+    if aspect == 'stadium':
+        return [stadium for stadium in data['stadiums']
+                if all(w in ' '.join(tokenize(f"{stadium['name']} {stadium['city']}")) for w in words)]
+    found = []
+    for group in data['teams'].values():
+        for team in group:
+            for player in team['squad']:
+                text = ' '.join(tokenize(f"{player['name']} {team['name']} {player['position']}"))
+                if all(w.rstrip('s') in text for w in words):
+                    found.append(player)
+    for country in data['players']:
+        for line in ('goalkeepers', 'defenders', 'midfielders', 'forwards'):
+            for player in country.get(line, ()):
+                text = ' '.join(tokenize(f"{player['name']} {player.get('club', '')}"))
+                if all(w in text for w in words):
+                    found.append(player)
+    return found
+
+
+def per_query_us(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for aspect, query, teams in QUERIES:
+            fn(aspect, query, teams)
+        best = min(best, time.perf_counter() - started)
+    return best / len(QUERIES) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with open(app.app.config['DB_PATH'], encoding='utf-8') as file:
+        base = json.load(file)
+
+    print(f"{'entries':>8} {'scan us':>9} {'index us':>9} {'build ms':>9} {'reload ms':>10}")
+    for scale in args.scales:
+        data = scaled(base, scale)
+        builder = KnowledgeBuilder(app.english_team_name)
+        started = time.perf_counter()
+        knowledge = builder(data)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        # A reload after a fixture edit: the reference sections are equal
+        reloaded = json.loads(json.dumps(data))
+        reloaded['live'] = []
+        started = time.perf_counter()
+        builder(reloaded)
+        reload_ms = (time.perf_counter() - started) * 1000
+
+        scan_us = per_query_us(lambda aspect, query, teams: scan_facts(data, aspect, query, teams), args.repeat)
+        index_us = per_query_us(lambda aspect, query, teams: app.find_facts(knowledge, aspect, query, teams),
+                                args.repeat)
+        print(f"{len(knowledge):>8} {scan_us:>9.1f} {index_us:>9.1f} {build_ms:>9.1f} {reload_ms:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
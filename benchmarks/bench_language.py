@@ -0,0 +1,68 @@
+# Accuracy and latency of the FR/EN detectors on real bilingual AFCON queries
+# (benchmarks/data/language_queries.json). Exits non-zero if the fast
+# detector's accuracy drops below --min-accuracy.
+#
+#   python -m benchmarks.bench_language [--min-accuracy 0.97]
+import argparse
+import json
+import os
+import sys
+import timeit
+
+from app import fr_to_en_keywords
+from language import create_detector
+
+DATA = os.path.join(os.path.dirname(__file__), 'data', 'language_queries.json')
+
+
+def evaluate(detector, rows):
+    wrong = [row for row in rows if detector.detect(row['text']) != row['lang']]
+    return 1 - len(wrong) / len(rows), wrong
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--min-accuracy', type=float, default=0.97)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with open(DATA, encoding='utf-8') as file:
+        rows = json.load(file)
+    texts = [row['text'] for row in rows]
+
+    failed = False
+    for kind in ['keywords', 'fast', 'langdetect']:
+        try:
+            accuracy, wrong = evaluate(create_detector(kind, fr_to_en_keywords), rows)
+        except ImportError as e:
+            print(f"{kind:<11} skipped ({e})")
+            continue
+
+        # Uncached cost per query: a fresh detector for every timing round
+        def run():
+            detector = create_detector(kind, fr_to_en_keywords)
+            for text in texts:
+                detector.detect(text)
+        cold = min(timeit.repeat(run, number=1, repeat=args.repeat)) / len(texts)
+
+        print(f"{kind:<11} accuracy {accuracy:6.1%}   {cold * 1e6:9.1f} us/query")
+        for row in wrong:
+            print(f"    expected {row['lang']}: {row['text']}")
+        if kind == 'fast' and accuracy < args.min_accuracy:
+            failed = True
+
+    # Memoized lookups, the steady state for repeated questions
+    detector = create_detector('fast', fr_to_en_keywords)
+    for text in texts:
+        detector.detect(text)
+    warm = min(timeit.repeat(lambda: [detector.detect(t) for t in texts], number=1,
+                             repeat=args.repeat)) / len(texts)
+    print(f"fast (memo) {warm * 1e6:25.2f} us/query")
+
+    if failed:
+        print(f"fast detector accuracy below {args.min_accuracy:.0%}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# Memory per fixture and lookup cost: plain JSON dicts indexed by team name
+# and status string (the previous MatchIndex layout) versus __slots__ Match
+# records with interned team ids and enum statuses.
+#
+#   python -m benchmarks.bench_match_records [--groups 400] [--repeat 5]
+import argparse
+import json
+import random
+import timeit
+import tracemalloc
+
+from benchmarks.bench_find_match import synthetic_tournament
+from match_index import MatchIndex, STATUSES, iter_match_records, iter_matches
+from match_records import FINISHED, LIVE, TeamTable
+
+
+# The dict-based index this replaces, kept as the baseline
+class DictIndex:
+    def __init__(self, data):
+        self.by_pair = {}
+        self.by_team = {}
+        for _, _, match in iter_matches(data):
+            for index, key in ((self.by_pair, frozenset((match['team1'], match['team2']))),
+                               (self.by_team, match['team1']), (self.by_team, match['team2'])):
+                buckets = index.setdefault(key, {'all': []})
+                buckets['all'].append(match)
+                buckets.setdefault(match['status'], []).append(match)
+
+    def lookup(self, team1, team2=None, status_type='all'):
+        buckets = self.by_pair.get(frozenset((team1, team2))) if team2 else self.by_team.get(team1)
+        return list(buckets.get(status_type, ())) if buckets else []
+
+
+def format_dict(match):
+    if match['status'] == 'finished':
+        return f"{match['team1']} {match['score1']} - {match['score2']} {match['team2']} | Status: Finished"
+    if match['status'] == 'live':
+        return f"{match['team1']} {match['score1']} - {match['score2']} {match['team2']} | Status: Live - {match['time']}"
+    return f"{match['team1']} vs {match['team2']} | Status: Scheduled"
+
+
+def format_record(match):
+    if match.status is FINISHED:
+        return f"{match.team1} {match.score1} - {match.score2} {match.team2} | Status: Finished"
+    if match.status is LIVE:
+        return f"{match.team1} {match.score1} - {match.score2} {match.team2} | Status: Live - {match.time}"
+    return f"{match.team1} vs {match.team2} | Status: Scheduled"
+
+
+# Bytes allocated (and still alive) while building fn()'s result
+def allocated(fn):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = fn()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--groups', type=int, default=400)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args()
+
+    data = synthetic_tournament(args.groups)
+    raw = json.dumps(data)
+    fixtures = sum(len(g['mlsf']) for g in data['live'])
+
+    # Fixtures as parsed from JSON vs the same fixtures as records (the
+    # records are built from already-parsed data, so only they are counted)
+    parsed, dict_bytes = allocated(lambda: json.loads(raw))
+    records, record_bytes = allocated(lambda: list(iter_match_records(parsed, TeamTable())))
+    _, dict_index_bytes = allocated(lambda: DictIndex(parsed))
+    _, record_index_bytes = allocated(lambda: MatchIndex(parsed))
+    record_index_bytes -= record_bytes
+
+    old, new = DictIndex(parsed), MatchIndex(parsed)
+    rng = random.Random(1)
+    queries = []
+    for _ in range(args.queries):
+        match = rng.choice(rng.choice(parsed['live'])['mlsf'])
+        team2 = match['team2'] if rng.random() < 0.7 else None
+        queries.append((match['team1'], team2, rng.choice(STATUSES + ['all'])))
+
+    def run(index, fmt):
+        for query in queries:
+            for match in index.lookup(*query)[:1]:
+                fmt(match)
+
+    def per_query(fn):
+        return min(timeit.repeat(fn, number=1, repeat=args.repeat)) / len(queries) * 1e6
+
+    dict_lookup = per_query(lambda: [old.lookup(*q) for q in queries])
+    record_lookup = per_query(lambda: [new.lookup(*q) for q in queries])
+    dict_answer = per_query(lambda: run(old, format_dict))
+    record_answer = per_query(lambda: run(new, format_record))
+
+    print(f"fixtures:               {fixtures} ({len(records)} records, {len(new.table)} teams)")
+    print(f"{'':24}{'dicts':>10}{'records':>10}")
+    print(f"{'bytes per fixture':24}{dict_bytes / fixtures:>10.0f}{record_bytes / fixtures:>10.0f}")
+    print(f"{'index bytes per fixture':24}{dict_index_bytes / fixtures:>10.0f}{record_index_bytes / fixtures:>10.0f}")
+    print(f"{'lookup us':24}{dict_lookup:>10.2f}{record_lookup:>10.2f}")
+    print(f"{'lookup + format us':24}{dict_answer:>10.2f}{record_answer:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
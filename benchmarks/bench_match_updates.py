@@ -0,0 +1,74 @@
+# Cost of one score update as the tournament grows: rewriting the whole data
+# file and reloading it (the old way to change a score) versus
+# MatchStore.update, which appends to the write-ahead log and patches the
+# index. The update should stay flat while the rewrite grows with the data.
+#
+#   python -m benchmarks.bench_match_updates [--groups 10 100 1000] [--updates 200]
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.bench_find_match import synthetic_tournament
+from match_index import build_match_index, patch_match_index
+from match_store import MatchStore
+from wal import WriteAheadLog
+
+
+def make_store(path, wal_path=None):
+    wal = WriteAheadLog(wal_path, fsync=False) if wal_path else None
+    return MatchStore(path, poll_interval=3600, builders={'index': build_match_index},
+                      wal=wal, updaters={'index': patch_match_index})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--groups', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--updates', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'fixtures':>9} {'rewrite ms':>11} {'update us':>10} {'lookup after us':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for groups in args.groups:
+            data = synthetic_tournament(groups)
+            path = os.path.join(tmp, f"db-{groups}.json")
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(data, file)
+            ids = [f"G{g}-{i + 1}" for g in range(groups) for i in range(len(data['live'][g]['mlsf']))]
+
+            # Old way: edit the parsed data, write the file, reload the store
+            store = make_store(path)
+            store.snapshot()
+            rewrites = max(1, min(args.updates, 20))
+            started = time.perf_counter()
+            for i in range(rewrites):
+                data['live'][0]['mlsf'][0]['score1'] = i
+                with open(path, 'w', encoding='utf-8') as file:
+                    json.dump(data, file)
+                store.refresh(force=True)
+            rewrite_ms = (time.perf_counter() - started) / rewrites * 1000
+
+            store = make_store(path, os.path.join(tmp, f"db-{groups}.wal"))
+            store.snapshot()
+            picks = [rng.choice(ids) for _ in range(args.updates)]
+            started = time.perf_counter()
+            for i, match_id in enumerate(picks):
+                store.update([(match_id, {'score1': i % 5, 'time': f"{i % 90}'"})])
+            update_us = (time.perf_counter() - started) / len(picks) * 1e6
+
+            # Lookups through the patch overlays, before compaction
+            index = store.snapshot().views['index']
+            teams = [index.matches[match_id].team1 for match_id in picks]
+            started = time.perf_counter()
+            for team in teams:
+                index.lookup(team)
+            lookup_us = (time.perf_counter() - started) / len(teams) * 1e6
+
+            print(f"{len(ids):>9} {rewrite_ms:>11.2f} {update_us:>10.1f} {lookup_us:>16.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# Microbenchmarks of the query pipeline stages on the benchmark corpus:
+# extract_teams, determine_question_type, find_match, and both translation
+# directions. Reports the best-of-N mean time per call and fails when a stage
+# is more than --threshold slower than benchmarks/baseline.json. The default
+# threshold is loose because per-call timings of a few microseconds swing by
+# a third between runs on shared machines; it still catches the regressions
+# that matter here, like a lookup falling back to a scan.
+#
+#   python -m benchmarks.bench_pipeline [--threshold 0.5] [--save-baseline]
+import argparse
+import os
+import sys
+import timeit
+
+os.environ.setdefault('SESSION_BACKEND', 'memory')
+
+import app
+from benchmarks.baseline import check, save_baseline
+from benchmarks.corpus import app_corpus
+
+
+# Best-of-`repeat` mean time per call in microseconds. Each round loops over
+# the items long enough (>= 0.2s) for timer noise to average out.
+def per_call(fn, items, repeat):
+    timer = timeit.Timer(lambda: [fn(item) for item in items])
+    number, _ = timer.autorange()
+    best = min(timer.repeat(number=number, repeat=repeat))
+    return best / number / len(items) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--threshold', type=float, default=0.5)
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args()
+
+    app.warm_up()
+    snapshot = app.store.snapshot()
+    corpus = app_corpus(app, size=args.size)
+    french = [row['text'] for row in corpus if row['lang'] == 'fr']
+    english = [app.translate_query_fr_to_en(row['text']) if row['lang'] == 'fr' else row['text']
+               for row in corpus]
+
+    # Team pairs and question types as the pipeline would produce them
+    # (standings and info questions don't look matches up)
+    lookups = []
+    for text in english:
+        teams = app.extract_teams(text, snapshot)
+        question_type = app.determine_question_type(text)
+        if teams and question_type not in (app.STANDINGS, app.INFO):
+            lookups.append((teams[0], teams[1] if len(teams) > 1 else None, question_type))
+    answers = [app.answer_query(text, app.extract_teams(text, snapshot), 'en', snapshot)
+               for text in english]
+
+    # extract_teams is timed warm (fuzzy cache filled by the pass above), the
+    # steady state for a server that has seen these team names before
+    results = {
+        'extract_teams_us': per_call(lambda text: app.extract_teams(text, snapshot), english, args.repeat),
+        'determine_question_type_us': per_call(app.determine_question_type, english, args.repeat),
+        'find_match_us': per_call(lambda lookup: app.find_match(*lookup, snapshot=snapshot), lookups, args.repeat),
+        'translate_query_fr_to_en_us': per_call(app.translate_query_fr_to_en, french, args.repeat),
+        'translate_response_en_to_fr_us': per_call(app.translate_response_en_to_fr, answers, args.repeat),
+    }
+
+    print(f"{len(corpus)} queries ({len(french)} French), {len(lookups)} match lookups")
+    for name, value in results.items():
+        print(f"{name[:-3]:<28} {value:9.2f} us/call")
+
+    if args.save_baseline:
+        save_baseline('pipeline', results)
+        print("Baseline saved")
+    elif not check('pipeline', results, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# Per-query cost against the default competition as more competitions are
+# added to the deployment, and the cost of queries spread over all of them
+# with a small shard LRU (so some of them load a shard first).
+#
+#   python -m benchmarks.bench_shards [--competitions 0 10 100] [--cache 4]
+import argparse
+import json
+import os
+import random
+import tempfile
+import timeit
+
+os.environ.setdefault('SESSION_BACKEND', 'memory')
+os.environ['RESPONSE_CACHE_SIZE'] = '0'
+
+import app
+from benchmarks.bench_find_match import synthetic_tournament
+from benchmarks.corpus import app_corpus
+from shards import ShardRegistry
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--competitions', type=int, nargs='+', default=[0, 10, 100])
+    parser.add_argument('--cache', type=int, default=4)
+    parser.add_argument('--groups', type=int, default=20)
+    parser.add_argument('--size', type=int, default=300)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    app.warm_up()
+    texts = [row['text'] for row in app_corpus(app, size=args.size, seed=0)]
+    rng = random.Random(0)
+
+    print(f"{'competitions':>12} {'default us/query':>17} {'spread us/query':>16} {'shard loads':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in args.competitions:
+            directory = os.path.join(tmp, str(count))
+            os.makedirs(directory)
+            for i in range(count):
+                with open(os.path.join(directory, f"cup-{i}.json"), 'w', encoding='utf-8') as file:
+                    json.dump(synthetic_tournament(args.groups, seed=i), file)
+            app.shards = ShardRegistry(app.app.config['DEFAULT_COMPETITION'], app.store, app.create_store,
+                                       directory=directory, capacity=args.cache)
+
+            default = min(timeit.repeat(lambda: [app.process_queries([t]) for t in texts], number=1,
+                                        repeat=args.repeat)) / len(texts) * 1e6
+
+            # The same queries, each naming a random competition
+            keys = list(app.shards.competitions)
+            spread_texts = [f"{t} {rng.choice(keys)}" for t in texts]
+            spread = min(timeit.repeat(lambda: [app.process_queries([t]) for t in spread_texts], number=1,
+                                       repeat=args.repeat)) / len(texts) * 1e6
+            print(f"{count:>12} {default:>17.1f} {spread:>16.1f} {app.shards.loads:>12}")
+
+
+if __name__ == '__main__':
+    main()
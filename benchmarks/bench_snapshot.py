@@ -0,0 +1,82 @@
+# Load time of the match data as JSON versus the compiled snapshot, while the
+# descriptive (cold) content grows: players, stadium descriptions and teams
+# are repeated --scale times. With the snapshot, loading should stay flat,
+# both bare (the match index only) and with the app's builders (its lazy
+# views decode no cold section until a question needs one).
+#
+#   python -m benchmarks.bench_snapshot [--scales 1 10 50] [--repeat 5]
+import argparse
+import json
+import os
+import tempfile
+import timeit
+
+from db_snapshot import build_snapshot
+from match_index import build_match_index
+from match_store import MatchStore
+
+os.environ.setdefault('SESSION_BACKEND', 'memory')
+
+import app
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COLD_KEYS = ('players', 'stadiums', 'teams', 'MatchCan', 'AFCON_Winners')
+
+
+def inflate(data, scale):
+    data = dict(data)
+    for key in COLD_KEYS:
+        value = data.get(key)
+        if isinstance(value, list):
+            data[key] = value * scale
+        elif isinstance(value, dict):
+            data[key] = {f"{name}#{i}": item for i in range(scale) for name, item in value.items()}
+    return data
+
+
+# Fresh store (so nothing is cached) loading the file and building the index
+def load(path):
+    store = MatchStore(path, builders={'index': build_match_index})
+    return store.snapshot()
+
+
+# Fresh store with the app's builders; returns the snapshot and the number
+# of cold sections decoded by the load
+def load_app(path):
+    snapshot = app.create_store(path, path + '.wal').snapshot()
+    return snapshot, len(getattr(snapshot.data, 'loaded', ()))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with open(os.path.join(ROOT, 'db.json'), encoding='utf-8') as file:
+        base = json.load(file)
+
+    print(f"{'scale':>5} {'json KB':>9} {'snap KB':>9} {'json load ms':>13} "
+          f"{'snap load ms':>13} {'first players ms':>17} {'app snap load ms':>17} {'decoded':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            json_path = os.path.join(tmp, f"db-{scale}.json")
+            snap_path = os.path.join(tmp, f"db-{scale}.snap")
+            with open(json_path, 'w', encoding='utf-8') as file:
+                json.dump(inflate(base, scale), file, ensure_ascii=False)
+            build_snapshot(json_path, snap_path)
+
+            json_ms = min(timeit.repeat(lambda: load(json_path), number=1, repeat=args.repeat)) * 1000
+            snap_ms = min(timeit.repeat(lambda: load(snap_path), number=1, repeat=args.repeat)) * 1000
+            # Price of the first read of a cold section
+            cold_ms = min(timeit.repeat(lambda: load(snap_path).data['players'], number=1,
+                                        repeat=args.repeat)) * 1000 - snap_ms
+            app_ms = min(timeit.repeat(lambda: load_app(snap_path), number=1, repeat=args.repeat)) * 1000
+            _, decoded = load_app(snap_path)
+            print(f"{scale:>5} {os.path.getsize(json_path) // 1024:>9} {os.path.getsize(snap_path) // 1024:>9} "
+                  f"{json_ms:>13.2f} {snap_ms:>13.2f} {cold_ms:>17.2f} {app_ms:>17.2f} {decoded:>8}")
+
+
+if __name__ == '__main__':
+    main()
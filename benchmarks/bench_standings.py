@@ -0,0 +1,68 @@
+# Cost of keeping group standings current as the tournament grows: ranking
+# every group again after a score change versus Standings.updated, which only
+# ranks the group of the changed fixture. The update should stay flat while
+# the full rebuild grows with the number of fixtures. Also times a whole
+# MatchStore.update with the index and standings views patched together.
+#
+#   python -m benchmarks.bench_standings [--groups 10 100 1000] [--updates 200]
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.bench_find_match import synthetic_tournament
+from match_index import MatchIndex, build_match_index, patch_match_index
+from match_records import parse_changes
+from match_store import MatchStore
+from standings import Standings, build_standings, update_standings
+from wal import WriteAheadLog
+
+
+def per_call_us(fn, items):
+    started = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - started) / len(items) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--groups', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--updates', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'fixtures':>9} {'rebuild us':>11} {'update us':>10} {'store update us':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for groups in args.groups:
+            data = synthetic_tournament(groups)
+            index = MatchIndex(data)
+            standings = Standings.build(data, index.matches.values())
+            ids = list(index.matches)
+            changed = [index.matches[rng.choice(ids)].replace(parse_changes({'score1': i % 5, 'status': 'live'}))
+                       for i in range(args.updates)]
+
+            # Old way: rank every group again from all the fixtures
+            rebuilds = changed[:max(1, min(len(changed), 20))]
+            rebuild_us = per_call_us(
+                lambda match: Standings.build(data, index.patched([match]).matches.values()), rebuilds)
+            update_us = per_call_us(lambda match: standings.updated([match]), changed)
+
+            path = os.path.join(tmp, f"db-{groups}.json")
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(data, file)
+            store = MatchStore(path, poll_interval=3600,
+                               builders={'index': build_match_index, 'standings': build_standings},
+                               wal=WriteAheadLog(os.path.join(tmp, f"db-{groups}.wal"), fsync=False),
+                               updaters={'index': patch_match_index, 'standings': update_standings})
+            store.snapshot()
+            store_us = per_call_us(lambda match: store.update([(match.match_id, {'score1': match.score1})]),
+                                   changed)
+
+            print(f"{len(ids):>9} {rebuild_us:>11.1f} {update_us:>10.1f} {store_us:>16.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# Startup cost of a worker: importing app, create_app, warm_up and the
+# latency of the first response, each run in a fresh interpreter (median of
+# --runs). Three ways a worker can start:
+#
+#   cold  import + create_app; the first request loads what it needs
+#   warm  import + create_app + warm_up, then the first request
+#   fork  a warmed-up parent forks and the child answers at once, as a
+#         gunicorn worker does with preload_app (see gunicorn.conf.py)
+#
+# "ready in" is the time to the first response from process spawn (cold,
+# warm) or from the fork. Fails when a metric is more than --threshold worse
+# than benchmarks/baseline.json.
+#
+#   python -m benchmarks.bench_startup [--runs 5] [--threshold 0.5] [--save-baseline]
+import argparse
+import gc
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.baseline import check, save_baseline
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = ('cold', 'warm', 'fork')
+# Needs the data, the team resolver and langdetect (no clear language cue)
+FIRST_QUERY = "Morocco vs Mali score"
+COLUMNS = ('import_ms', 'create_app_ms', 'warm_up_ms', 'first_response_ms', 'ready_ms')
+
+
+def since(started):
+    return (time.perf_counter() - started) * 1000
+
+
+def first_response_ms(flask_app):
+    started = time.perf_counter()
+    response = flask_app.test_client().post('/api/chat', json={'message': FIRST_QUERY, 'delta': True})
+    if response.status_code != 200:
+        raise RuntimeError(f"first request failed with {response.status_code}")
+    return since(started)
+
+
+# One measurement, in the process started by run_child; prints its timings
+def child(mode, spawned):
+    timings = {}
+    started = time.perf_counter()
+    import app
+    timings['import_ms'] = since(started)
+    started = time.perf_counter()
+    flask_app = app.create_app()
+    timings['create_app_ms'] = since(started)
+    if mode != 'cold':
+        started = time.perf_counter()
+        app.warm_up()
+        timings['warm_up_ms'] = since(started)
+
+    if mode != 'fork':
+        timings['first_response_ms'] = first_response_ms(flask_app)
+        timings['ready_ms'] = (time.monotonic() - spawned) * 1000
+    else:
+        gc.freeze()
+        read, write = os.pipe()
+        started = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read)
+            first = first_response_ms(flask_app)
+            os.write(write, json.dumps({'first_response_ms': first, 'ready_ms': since(started)}).encode())
+            os._exit(0)
+        os.close(write)
+        with os.fdopen(read) as pipe:
+            timings.update(json.loads(pipe.read()))
+        os.waitpid(pid, 0)
+    print(json.dumps(timings))
+
+
+def run_child(mode):
+    env = dict(os.environ, SESSION_BACKEND='memory', LOG_LEVEL='ERROR', QUERY_WORKERS='0')
+    command = [sys.executable, '-m', 'benchmarks.bench_startup', '--child', mode, str(time.monotonic())]
+    output = subprocess.run(command, cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                            check=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--threshold', type=float, default=0.5)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'SPAWNED'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], float(args.child[1]))
+        return
+
+    results = {}
+    print(f"{'mode':<6}" + ''.join(f"{name[:-3].replace('_', ' '):>16}" for name in COLUMNS[:-1])
+          + f"{'ready in':>16}")
+    for mode in MODES:
+        runs = [run_child(mode) for _ in range(args.runs)]
+        medians = {name: statistics.median(run[name] for run in runs) for name in COLUMNS if name in runs[0]}
+        print(f"{mode:<6}" + ''.join(f"{medians[name]:>13.1f} ms" if name in medians else f"{'-':>16}"
+                                     for name in COLUMNS))
+        results.update({f"{mode}_{name}": value for name, value in medians.items()})
+
+    if args.save_baseline:
+        save_baseline('startup', results)
+        print("Baseline saved")
+    elif not check('startup', results, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
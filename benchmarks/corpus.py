@@ -0,0 +1,80 @@
+# Reproducible mixed French/English chat corpus for benchmarks: the labelled
+# queries in data/language_queries.json plus synthetic questions generated
+# from the teams in db.json (templates, French names, aliases and typos).
+import json
+import os
+import random
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LANGUAGE_QUERIES = os.path.join(ROOT, 'benchmarks', 'data', 'language_queries.json')
+
+EN_TEMPLATES = [
+    "{a} vs {b} score",
+    "What's the score between {a} and {b}?",
+    "who won {a} vs {b}",
+    "When does {a} play {b}?",
+    "Is {a} playing now?",
+    "{a} result",
+    "how is {a} doing against {b}",
+    "next match for {a}",
+    "did {a} beat {b}",
+    "{a}",
+]
+
+FR_TEMPLATES = [
+    "{a} contre {b} score",
+    "quel est le score de {a} et {b}",
+    "qui a gagné {a} contre {b}",
+    "quand joue {a} contre {b} ?",
+    "{a} joue actuellement ?",
+    "résultat {a} {b}",
+    "comment se passe le match {a} contre {b}",
+    "prochain match du {a}",
+    "score final {a} {b}",
+]
+
+UNCLEAR = ["hello", "who is winning", "score?", "bonjour", "quel est le score", "any news"]
+
+
+# Swap two adjacent letters, the most common typo in team names
+def typo(name, rng):
+    if len(name) < 4:
+        return name
+    i = rng.randrange(1, len(name) - 2)
+    return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+
+
+def load_labelled():
+    with open(LANGUAGE_QUERIES, encoding='utf-8') as file:
+        return json.load(file)
+
+
+# `size` queries ({'text', 'lang'}) drawn deterministically from `seed`.
+# `teams` are English names and `french` maps them to French display names.
+def build_corpus(teams, french, size=500, seed=0):
+    rng = random.Random(seed)
+    corpus = list(load_labelled())
+    while len(corpus) < size:
+        roll = rng.random()
+        a, b = rng.sample(teams, 2)
+        if roll < 0.05:
+            corpus.append({'text': rng.choice(UNCLEAR), 'lang': None})
+        elif roll < 0.55:
+            if rng.random() < 0.2:
+                a = typo(a, rng)
+            corpus.append({'text': rng.choice(EN_TEMPLATES).format(a=a, b=b), 'lang': 'en'})
+        else:
+            a, b = french.get(a, a), french.get(b, b)
+            corpus.append({'text': rng.choice(FR_TEMPLATES).format(a=a, b=b), 'lang': 'fr'})
+    rng.shuffle(corpus)
+    return corpus[:size]
+
+
+# Corpus built from the app's own team list and French names
+def app_corpus(app_module, size=500, seed=0):
+    snapshot = app_module.store.snapshot()
+    index = snapshot.views.get('index') if snapshot else None
+    teams = sorted(index.teams) if index else list(app_module.fallback_teams)
+    french = {team: app_module.translator.team_name(team) for team in teams}
+    return build_corpus(teams, french, size=size, seed=seed)
@@ -0,0 +1,109 @@
+# Throughput of /api/chat as the number of worker processes grows.
+#
+#   python -m benchmarks.load_chat --workers 1 2 4 --mode pool
+#   python -m benchmarks.load_chat --workers 1 2 4 --mode gunicorn
+#
+# "pool" runs one uvicorn process with QUERY_WORKERS=<n> (the query pipeline in
+# a process pool); "gunicorn" runs gunicorn.conf.py with WEB_CONCURRENCY=<n>.
+# The response cache is disabled so every request runs the full pipeline.
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from benchmarks.load_live_subscribers import ROOT, free_port, wait_ready
+
+QUERIES = os.path.join(ROOT, 'benchmarks', 'data', 'language_queries.json')
+
+
+async def post(reader, writer, body):
+    writer.write(b"POST /api/chat HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length = 0
+    for line in head.split(b'\r\n'):
+        if line.lower().startswith(b'content-length:'):
+            length = int(line.split(b':')[1])
+    await reader.readexactly(length)
+    return status
+
+
+async def client(port, queries, deadline, latencies, statuses, seed):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        while time.perf_counter() < deadline:
+            body = json.dumps({'message': rng.choice(queries), 'delta': True}).encode()
+            started = time.perf_counter()
+            status = await post(reader, writer, body)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def drive(port, queries, concurrency, duration):
+    latencies, statuses = [], {}
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(client(port, queries, deadline, latencies, statuses, i)
+                           for i in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - started
+
+
+def start_server(mode, workers, port):
+    env = dict(os.environ, RESPONSE_CACHE_SIZE='0', SESSION_BACKEND='memory', PORT=str(port))
+    if mode == 'pool':
+        env['QUERY_WORKERS'] = str(workers)
+        env['QUERY_QUEUE_DEPTH'] = str(workers * 64)
+        command = [sys.executable, '-m', 'uvicorn', 'asgi:application', '--port', str(port),
+                   '--log-level', 'warning']
+    else:
+        env['WEB_CONCURRENCY'] = str(workers)
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'asgi:application',
+                   '--log-level', 'warning']
+    return subprocess.Popen(command, cwd=ROOT, env=env)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mode', choices=['pool', 'gunicorn'], default='pool')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10)
+    args = parser.parse_args()
+
+    with open(QUERIES, encoding='utf-8') as file:
+        queries = [row['text'] for row in json.load(file)]
+
+    print(f"cpus: {os.cpu_count()}  mode: {args.mode}  concurrency: {args.concurrency}")
+    print(f"{'workers':>7} {'req/s':>9} {'scaling':>8} {'p50 ms':>8} {'p99 ms':>8}  statuses")
+    baseline = None
+    for workers in args.workers:
+        port = free_port()
+        server = start_server(args.mode, workers, port)
+        try:
+            wait_ready(port)
+            # Warm-up pass, then the measured run
+            asyncio.run(drive(port, queries, args.concurrency, 1))
+            latencies, statuses, elapsed = asyncio.run(
+                drive(port, queries, args.concurrency, args.duration))
+        finally:
+            server.terminate()
+            server.wait()
+        latencies.sort()
+        throughput = len(latencies) / elapsed
+        baseline = baseline or throughput
+        p50 = latencies[len(latencies) // 2] * 1e3
+        p99 = latencies[int(len(latencies) * 0.99) - 1] * 1e3
+        print(f"{workers:>7} {throughput:>9.1f} {throughput / baseline:>7.2f}x {p50:>8.1f} {p99:>8.1f}  {statuses}")
+
+
+if __name__ == '__main__':
+    main()
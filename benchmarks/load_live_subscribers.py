@@ -0,0 +1,131 @@
+# Load test for the live score stream: start the ASGI server, hold N idle SSE
+# subscribers, report server memory per connection, then change a score and
+# time how long it takes to reach every subscriber.
+#
+#   python -m benchmarks.load_live_subscribers [--subscribers 5000]
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def rss_kb(pid):
+    with open(f"/proc/{pid}/status") as file:
+        for line in file:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def wait_ready(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1)
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+
+async def subscribe(port, team):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"GET /api/live?team={team} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    # Headers, then the initial snapshot event
+    await reader.readuntil(b'\r\n\r\n')
+    await reader.readuntil(b'\n\n')
+    return reader, writer
+
+
+async def wait_for_event(reader, event):
+    while True:
+        chunk = await reader.readuntil(b'\n\n')
+        if b'event: ' + event.encode() in chunk:
+            return time.perf_counter()
+
+
+async def run(args, port, pid, db_path):
+    base = rss_kb(pid)
+    teams = ['Morocco', 'Comoros', 'Mali', 'Zambia']
+    connections = []
+    started = time.perf_counter()
+    for start in range(0, args.subscribers, args.connect_batch):
+        batch = range(start, min(start + args.connect_batch, args.subscribers))
+        connections += await asyncio.gather(*(subscribe(port, teams[i % 2]) for i in batch))
+    connect_time = time.perf_counter() - started
+    await asyncio.sleep(1)
+    held = rss_kb(pid)
+
+    print(f"subscribers:          {len(connections)} (connected in {connect_time:.1f}s)")
+    print(f"server RSS:           {base / 1024:.1f} MB idle -> {held / 1024:.1f} MB")
+    print(f"memory per connection: {(held - base) / len(connections):.1f} KB")
+
+    # Morocco vs Comoros goes 3-1: every subscriber follows one of those teams
+    with open(db_path, encoding='utf-8') as file:
+        data = json.load(file)
+    data['live'][0]['mlsf'][0]['score1'] += 1
+    waiters = [asyncio.ensure_future(wait_for_event(reader, 'match')) for reader, _ in connections]
+    changed = time.perf_counter()
+    with open(db_path + '.tmp', 'w', encoding='utf-8') as file:
+        json.dump(data, file)
+    os.replace(db_path + '.tmp', db_path)
+    arrivals = sorted(t - changed for t in await asyncio.gather(*waiters))
+    p50 = arrivals[len(arrivals) // 2]
+    p99 = arrivals[int(len(arrivals) * 0.99) - 1]
+    print(f"fan-out after change: p50 {p50 * 1e3:.0f} ms, p99 {p99 * 1e3:.0f} ms, "
+          f"max {arrivals[-1] * 1e3:.0f} ms (includes {args.poll}s poll interval)")
+
+    for _, writer in connections:
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--subscribers', type=int, default=5000)
+    parser.add_argument('--connect-batch', type=int, default=500)
+    parser.add_argument('--poll', type=float, default=0.2)
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    needed = args.subscribers * 2 + 256
+    if soft < needed:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(needed, hard), hard))
+
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, 'db.json')
+    shutil.copy(os.path.join(ROOT, 'db.json'), db_path)
+    port = free_port()
+    env = dict(os.environ, DB_PATH=db_path, DB_POLL_INTERVAL='0', LIVE_POLL_INTERVAL=str(args.poll),
+               SESSION_BACKEND='memory', SPACY_ENABLED='false')
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'asgi:application', '--port', str(port),
+         '--log-level', 'warning', '--backlog', '4096'],
+        cwd=ROOT, env=env)
+    try:
+        wait_ready(port)
+        asyncio.run(run(args, port, server.pid, db_path))
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
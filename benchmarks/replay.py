@@ -0,0 +1,164 @@
+# End-to-end replay of the benchmark corpus through /api/chat, either in
+# process via the Flask test client or against a running server. Requests
+# are sent open-loop at --rps (0 = as fast as the senders go), and latency is
+# measured from each request's scheduled send time, so a stalled server shows
+# up as queueing delay instead of silently lowering the offered load.
+#
+#   python -m benchmarks.replay [--rps 200] [--duration 10]
+#   python -m benchmarks.replay --url http://127.0.0.1:5555 --rps 500
+#   python -m benchmarks.replay --save-baseline   # record the current numbers
+#
+# Exits non-zero when throughput or latency is more than --threshold worse
+# than benchmarks/baseline.json for the same target and rate.
+import argparse
+import http.client
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+from benchmarks.baseline import check, save_baseline
+from benchmarks.corpus import app_corpus
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+# One sender's transport: post(text) -> HTTP status
+def test_client_sender(app_module):
+    client = app_module.app.test_client()
+
+    def post(text):
+        return client.post('/api/chat', json={'message': text, 'delta': True}).status_code
+    return post
+
+
+def http_sender(url):
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    cookie = {}
+
+    def post(text):
+        headers = {'Content-Type': 'application/json'}
+        if cookie:
+            headers['Cookie'] = cookie['value']
+        conn.request('POST', '/api/chat', json.dumps({'message': text, 'delta': True}), headers)
+        response = conn.getresponse()
+        response.read()
+        # Keep one session per sender, like a real client
+        set_cookie = response.getheader('Set-Cookie')
+        if set_cookie:
+            cookie['value'] = set_cookie.split(';', 1)[0]
+        return response.status
+    return post
+
+
+def replay(make_sender, texts, rps, duration, concurrency):
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+    counter = itertools.count()
+    started = time.perf_counter()
+    deadline = started + duration
+
+    def run():
+        post = make_sender()
+        while True:
+            i = next(counter)
+            scheduled = started + i / rps if rps else time.perf_counter()
+            if scheduled >= deadline:
+                return
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                status = post(texts[i % len(texts)])
+            except (OSError, http.client.HTTPException):
+                status = 'error'
+            elapsed = time.perf_counter() - scheduled
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    threads = [threading.Thread(target=run) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(latencies), statuses, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', help="Server to replay against (default: in-process test client)")
+    parser.add_argument('--rps', type=float, default=200)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--size', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Disable the response cache (test client only)")
+    parser.add_argument('--cold', action='store_true',
+                        help="Skip the warm-up pass over the corpus")
+    parser.add_argument('--threshold', type=float, default=0.3)
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args()
+
+    os.environ.setdefault('SESSION_BACKEND', 'memory')
+    if args.no_cache:
+        os.environ['RESPONSE_CACHE_SIZE'] = '0'
+    import app
+    app.create_app()
+
+    texts = [row['text'] for row in app_corpus(app, size=args.size, seed=args.seed)]
+    if args.url:
+        target = 'server'
+        make_sender = lambda: http_sender(args.url)
+    else:
+        target = 'client-nocache' if args.no_cache else 'client'
+        app.warm_up()
+        make_sender = lambda: test_client_sender(app)
+
+    # One untimed pass fills the per-process caches (fuzzy matches, language
+    # memo, response cache), so the numbers reflect a server in steady state
+    if not args.cold:
+        post = make_sender()
+        for text in texts:
+            post(text)
+
+    latencies, statuses, elapsed = replay(make_sender, texts, args.rps, args.duration, args.concurrency)
+    ok = statuses.get(200, 0)
+    results = {
+        'throughput_rps': ok / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p90_ms': percentile(latencies, 0.90) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+    print(f"target {target}  offered {f'{args.rps:g}' if args.rps else 'max'} req/s  {args.duration:.0f}s  "
+          f"concurrency {args.concurrency}  corpus {len(texts)} queries")
+    print(f"requests {len(latencies)}  statuses {statuses}")
+    print(f"throughput {results['throughput_rps']:.1f} req/s  p50 {results['p50_ms']:.2f} ms  "
+          f"p90 {results['p90_ms']:.2f} ms  p99 {results['p99_ms']:.2f} ms  "
+          f"max {latencies[-1] * 1000 if latencies else 0:.2f} ms")
+
+    section = f"replay:{target}:{args.rps:g}"
+    if args.save_baseline:
+        save_baseline(section, results)
+        print(f"Baseline '{section}' saved")
+        return
+    passed = check(section, results, args.threshold, higher_is_better={'throughput_rps'})
+    if len(latencies) != ok:
+        print(f"{len(latencies) - ok} requests failed")
+        passed = False
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
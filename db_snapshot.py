@@ -0,0 +1,309 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from collections.abc import Mapping
+
+from match_index import KNOCKOUT_STAGES, iter_matches
+from match_records import Match, STATUSES, Status
+
+# Compiled, versioned form of db.json:
+#
+#   header    magic, format version, sha1 of the source JSON, section count
+#   sections  name, encoding, offset, length -- one entry per section
+#   strings   string table shared by the match records (teams, stages, clocks)
+#   matches   fixed-size records for every fixture in `live` + `knockout_stage`
+#   layout    JSON: group/stage order and the order of the top-level keys
+#   <key>     one JSON section per remaining top-level key (teams, players,
+#             stadiums, AFCON_Winners...), decoded only on first access
+#
+# The file is mmap'ed read-only, so loading touches the header and the hot
+# sections only and every worker process shares the same page cache pages.
+# Cold sections cost nothing until a request actually reads them.
+#
+#   python db_snapshot.py db.json db.snap
+
+MAGIC = b'AFCS'
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct('<4sHH20sI')
+SECTION = struct.Struct('<16sBQQ')
+# kind (0 group, 1 knockout), status, stage, team1, team2, time, score1, score2
+MATCH_RECORD = struct.Struct('<BBHHHHHH')
+
+ENCODING_JSON = 0
+ENCODING_MATCHES = 1
+ENCODING_STRINGS = 2
+
+MATCH_FIELDS = ('team1', 'team2', 'status', 'score1', 'score2', 'time')
+NO_SCORE = 0xFFFF
+HOT_KEYS = ('live', 'knockout_stage')
+
+
+def _json_bytes(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _score(value):
+    if value is None:
+        return NO_SCORE
+    if isinstance(value, int) and not isinstance(value, bool) and 0 <= value < NO_SCORE:
+        return value
+    raise ValueError(value)
+
+
+# Match records can only hold fixtures with exactly the usual fields; anything
+# else keeps `live` and `knockout_stage` as plain JSON sections
+def _fits_records(data):
+    try:
+        for group in data.get('live', []):
+            if set(group) != {'name', 'mlsf'}:
+                return False
+            for match in group['mlsf']:
+                if set(match) != set(MATCH_FIELDS) or match['status'] not in STATUSES:
+                    return False
+                _score(match['score1'])
+                _score(match['score2'])
+        for matches in (data.get('knockout_stage') or {}).values():
+            for match in matches:
+                if set(match) != set(MATCH_FIELDS) or match['status'] not in STATUSES:
+                    return False
+                _score(match['score1'])
+                _score(match['score2'])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return False
+    return True
+
+
+def _encode_matches(data):
+    strings = {}
+
+    def string_id(value):
+        if value not in strings:
+            strings[value] = len(strings)
+        return strings[value]
+
+    records = bytearray()
+    layout = {'live': [], 'knockout_stage': []}
+    for kind, key, groups in ((0, 'live', [(g['name'], g['mlsf']) for g in data.get('live', [])]),
+                              (1, 'knockout_stage', list((data.get('knockout_stage') or {}).items()))):
+        for stage, matches in groups:
+            layout[key].append([stage, len(matches)])
+            for match in matches:
+                records += MATCH_RECORD.pack(
+                    kind, STATUSES.index(match['status']), string_id(stage),
+                    string_id(match['team1']), string_id(match['team2']), string_id(match['time']),
+                    _score(match['score1']), _score(match['score2']))
+    if len(strings) > 0xFFFF:
+        raise ValueError("too many distinct strings for the match records")
+
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = [0]
+    for raw in encoded:
+        offsets.append(offsets[-1] + len(raw))
+    table = struct.pack(f'<I{len(offsets)}I', len(encoded), *offsets) + b''.join(encoded)
+    return table, bytes(records), layout
+
+
+# Serialize parsed db.json `data` (whose source bytes hash to `digest`)
+def encode_snapshot(data, digest):
+    sections = []
+    layout = {'keys': list(data)}
+    if _fits_records(data):
+        table, records, match_layout = _encode_matches(data)
+        layout.update(match_layout)
+        sections.append(('strings', ENCODING_STRINGS, table))
+        sections.append(('matches', ENCODING_MATCHES, records))
+        cold = [key for key in data if key not in HOT_KEYS]
+    else:
+        cold = list(data)
+    sections.append(('layout', ENCODING_JSON, _json_bytes(layout)))
+    for key in cold:
+        if len(key.encode('utf-8')) > 16:
+            raise ValueError(f"section name too long: {key!r}")
+        sections.append((key, ENCODING_JSON, _json_bytes(data[key])))
+
+    offset = HEADER.size + SECTION.size * len(sections)
+    table = bytearray()
+    for name, encoding, payload in sections:
+        table += SECTION.pack(name.encode('utf-8'), encoding, offset, len(payload))
+        offset += len(payload)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, 0, bytes.fromhex(digest), len(sections))
+    return header + bytes(table) + b''.join(payload for _, _, payload in sections)
+
+
+# Compile a db.json file into a snapshot file, replacing it atomically so a
+# running MatchStore only ever sees a complete file
+def build_snapshot(json_path, out_path):
+    with open(json_path, 'rb') as file:
+        raw = file.read()
+    data = json.loads(raw.decode('utf-8'))
+    write_atomic(out_path, encode_snapshot(data, hashlib.sha1(raw).hexdigest()))
+
+
+def write_atomic(path, payload):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.snapshot-')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(payload)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def is_snapshot(path):
+    try:
+        with open(path, 'rb') as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+# Read-only mapping over a snapshot file. The match index is built straight
+# from the binary records (match_records); `live`, `knockout_stage` and every
+# other key are decoded into their JSON shape only the first time they are
+# read.
+class SnapshotData(Mapping):
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self._buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, digest, count = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a match data snapshot")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path} has snapshot format {version}, expected {FORMAT_VERSION}")
+        self.digest = digest.hex()
+        self._sections = {}
+        for i in range(count):
+            name, encoding, offset, length = SECTION.unpack_from(self._buffer, HEADER.size + i * SECTION.size)
+            self._sections[name.rstrip(b'\0').decode('utf-8')] = (encoding, offset, length)
+
+        self._layout = json.loads(self._section_bytes('layout'))
+        self._keys = self._layout['keys']
+        self._values = {}
+        self._digests = {}
+
+    def _section_bytes(self, name):
+        _, offset, length = self._sections[name]
+        return self._buffer[offset:offset + length]
+
+    def _decode_strings(self):
+        _, offset, _ = self._sections['strings']
+        (count,) = struct.unpack_from('<I', self._buffer, offset)
+        offsets = struct.unpack_from(f'<{count + 1}I', self._buffer, offset + 4)
+        base = offset + 4 + 4 * (count + 1)
+        blob = self._buffer[base:base + offsets[-1]]
+        return [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(count)]
+
+    # (stage, position in stage, record) for every fixture, in file order
+    def _records(self):
+        records = MATCH_RECORD.iter_unpack(self._section_bytes('matches'))
+        for key in HOT_KEYS:
+            for stage, count in self._layout[key]:
+                for i in range(count):
+                    yield key, stage, i, next(records)
+
+    # Match records in iter_matches order, teams interned into `table`
+    def match_records(self, table):
+        if 'matches' not in self._sections:
+            for match_id, stage, match in iter_matches(self):
+                yield Match.from_json(match_id, stage, match, table)
+            return
+        strings = self._decode_strings()
+        team_ids = {}
+        knockout = {}
+        for key, stage, i, record in self._records():
+            _, status, _, team1, team2, time, score1, score2 = record
+            for string_id in (team1, team2):
+                if string_id not in team_ids:
+                    team_ids[string_id] = table.intern(strings[string_id])
+            match = Match(f"{stage}-{i + 1}", sys.intern(stage), table, team_ids[team1], team_ids[team2],
+                          Status(status), None if score1 == NO_SCORE else score1,
+                          None if score2 == NO_SCORE else score2, strings[time])
+            if key == 'live':
+                yield match
+            else:
+                knockout.setdefault(stage, []).append(match)
+        # Knockout rounds come out in bracket order, like iter_matches
+        for stage in KNOCKOUT_STAGES:
+            yield from knockout.get(stage, ())
+
+    # `live` / `knockout_stage` in their db.json shape
+    def _decode_fixtures(self, key):
+        strings = self._decode_strings()
+        fixtures = {}
+        for record_key, stage, _, record in self._records():
+            if record_key != key:
+                continue
+            _, status, _, team1, team2, time, score1, score2 = record
+            fixtures.setdefault(stage, []).append({
+                'team1': strings[team1], 'team2': strings[team2], 'status': STATUSES[status],
+                'score1': None if score1 == NO_SCORE else score1,
+                'score2': None if score2 == NO_SCORE else score2,
+                'time': strings[time],
+            })
+        stages = [stage for stage, _ in self._layout[key]]
+        if key == 'live':
+            return [{'name': stage, 'mlsf': fixtures.get(stage, [])} for stage in stages]
+        return {stage: fixtures.get(stage, []) for stage in stages}
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            if key not in self._keys:
+                raise
+        if key in HOT_KEYS and 'matches' in self._sections:
+            value = self._decode_fixtures(key)
+        else:
+            value = json.loads(self._section_bytes(key))
+        self._values[key] = value
+        return value
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    # sha1 of the encoded bytes of a top-level key (the match records for
+    # `live` and `knockout_stage`), without decoding it; None for a missing key
+    def section_digest(self, key):
+        digest = self._digests.get(key)
+        if digest is None:
+            name = key if key in self._sections else 'matches' if key in HOT_KEYS else None
+            if key not in self._keys or name not in self._sections:
+                return None
+            digest = self._digests[key] = hashlib.sha1(self._section_bytes(name)).hexdigest()
+        return digest
+
+    # Names of the sections decoded so far (for diagnostics and benchmarks)
+    @property
+    def loaded(self):
+        return [key for key in self._keys if key in self._values]
+
+
+# Identity of a top-level key of parsed data, to tell whether it changed
+# between two loads: the digest of its bytes in a snapshot (nothing is
+# decoded), the value itself in parsed JSON
+def section_identity(data, key):
+    if isinstance(data, SnapshotData):
+        return data.section_digest(key)
+    return data.get(key)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("usage: python db_snapshot.py <db.json> <out.snap>")
+        sys.exit(2)
+    build_snapshot(sys.argv[1], sys.argv[2])
+    print(f"Wrote {sys.argv[2]} ({os.path.getsize(sys.argv[2])} bytes)")
+
@@ -0,0 +1,27 @@
+# Production profile: one uvicorn worker per core behind gunicorn.
+#
+#   gunicorn -c gunicorn.conf.py asgi:application
+#
+# The app (data snapshot, translator tables, spaCy model) is loaded once in the
+# master and shared copy-on-write with the forked workers. Alternatively run a
+# single `uvicorn asgi:application` with QUERY_WORKERS=<cores> to keep one
+# event loop and push the NLP pipeline into a process pool.
+import multiprocessing
+import os
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '5555')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'uvicorn.workers.UvicornWorker'
+preload_app = True
+timeout = int(os.environ.get('WORKER_TIMEOUT', '30'))
+graceful_timeout = 10
+keepalive = 5
+backlog = 2048
+
+
+# Load models and data in the master, before the workers are forked
+def when_ready(server):
+    import gc
+    import app
+    app.warm_up()
+    gc.freeze()
@@ -0,0 +1,98 @@
+import re
+
+
+# What a query asks about: the question type used to filter matches, the
+# cue phrases found as (start, end, intent) character spans, and for
+# "score of/for/between ..." questions the text naming the teams.
+class QueryIntent:
+    __slots__ = ('question_type', 'spans', 'subject')
+
+    def __init__(self, question_type, spans, subject=None):
+        self.question_type = question_type
+        self.spans = spans
+        self.subject = subject
+
+    def __repr__(self):
+        return f"QueryIntent({self.question_type!r}, {self.spans!r}, subject={self.subject!r})"
+
+
+# Regex source matching any of `phrases`, factored into a character trie
+# ("now|next|none" -> "n(?:ow|ext|one)") so the engine branches once per
+# character instead of trying every phrase at every position. Longer
+# continuations come first, so the longest phrase at a position wins. Spaces
+# inside a phrase match `separator` (any run of whitespace by default).
+def phrase_pattern(phrases, separator=r'\s+'):
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in ' '.join(phrase.split()):
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def emit(node):
+        branches = []
+        for char in sorted(node, key=lambda c: (c == '', c)):
+            if char == '':
+                branches.append('')
+            else:
+                branches.append((separator if char == ' ' else re.escape(char)) + emit(node[char]))
+        if len(branches) == 1:
+            return branches[0]
+        if branches[-1] == '':
+            # Phrase ends here but may continue: try the longer one first
+            rest = branches[:-1]
+            if len(rest) == 1 and len(rest[0]) == 1:
+                return rest[0] + '?'
+            return '(?:' + '|'.join(rest) + ')?'
+        return '(?:' + '|'.join(branches) + ')'
+
+    return emit(trie)
+
+
+# Question-type classifier compiled once from cue phrases into a single
+# word-bounded alternation, so a query is scanned once, in C: "now" never
+# matches inside "know", and the longest phrase at a position wins ("playing
+# right now" is one live cue, not "playing" + "now"). When cues of several
+# intents appear, the one listed first in `cues` decides.
+#
+#   cues           intent -> phrases, in precedence order
+#   subject_cues   phrases after which the rest of the question (up to "?")
+#                  names the teams, e.g. "score between"
+class IntentMatcher:
+    def __init__(self, cues, subject_cues=(), default='all'):
+        self.default = default
+        self.intents = list(cues)
+        self.precedence = {intent: rank for rank, intent in enumerate(self.intents)}
+        self.phrases = {}
+        for intent, phrases in cues.items():
+            for phrase in phrases:
+                self.phrases.setdefault(' '.join(phrase.lower().split()), intent)
+        self._pattern = re.compile(r'\b(?:' + phrase_pattern(self.phrases) + r')\b')
+        self._subject = None
+        if subject_cues:
+            self._subject = re.compile(
+                r'\b(?:' + phrase_pattern([p.lower() for p in subject_cues]) + r')\b([^?]*)')
+
+    def match(self, text):
+        lowered = text.lower()
+        if '’' in lowered:
+            lowered = lowered.replace('’', "'")
+        phrases = self.phrases
+        precedence = self.precedence
+        spans = []
+        best = None
+        for found in self._pattern.finditer(lowered):
+            phrase = found.group()
+            intent = phrases.get(phrase) or phrases[' '.join(phrase.split())]
+            spans.append((found.start(), found.end(), intent))
+            if best is None or precedence[intent] < precedence[best]:
+                best = intent
+
+        subject = None
+        if self._subject is not None:
+            found = self._subject.search(lowered)
+            if found:
+                # Keep the original spelling unless lowercasing changed offsets
+                source = text if len(lowered) == len(text) else lowered
+                subject = source[found.start(1):found.end(1)].strip() or None
+        return QueryIntent(best or self.default, spans, subject)
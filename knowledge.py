@@ -0,0 +1,270 @@
+import logging
+import re
+
+from db_snapshot import section_identity
+from team_resolver import normalize_name
+
+logger = logging.getLogger(__name__)
+
+# Sections of db.json each segment is built from
+SEGMENT_SECTIONS = {
+    'squads': ('teams', 'players'),
+    'stadiums': ('stadiums',),
+    'winners': ('AFCON_Winners',),
+}
+PLAYER_LINES = ('goalkeepers', 'defenders', 'midfielders', 'forwards')
+# Query tokens that never narrow a search down
+STOPWORDS = frozenset('''
+    a an the of for in at on to is are was were who whom what which where when how many much does do did
+    has have had about tell me show give list and or with from by his her their its this that there team
+    teams play plays played playing le la les de du des un une est qui quel quelle quels quelles ou
+'''.split())
+# Query words for the positions used in the data
+SYNONYMS = {'striker': 'forward', 'strikers': 'forward', 'keeper': 'goalkeeper', 'keepers': 'goalkeeper'}
+# Shortest unknown token worth correcting through the trigram index
+MIN_CORRECTABLE = 4
+MIN_SIMILARITY = 0.6
+
+
+# Query and index tokens: normalized words, single letters dropped
+def tokenize(text):
+    return [token for token in normalize_name(text).split() if len(token) > 1 or token.isdigit()]
+
+
+def _grams(token):
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# One thing the data knows about: a team (coach, captain, rankings, squad), a
+# player, a stadium or an AFCON edition. `fields` is its JSON shape.
+class Entry:
+    __slots__ = ('kind', 'fields')
+
+    def __init__(self, kind, fields):
+        self.kind = kind
+        self.fields = fields
+
+    def to_json(self):
+        return {'kind': self.kind, **self.fields}
+
+    def __repr__(self):
+        return f"Entry({self.kind!r}, {self.fields.get('name') or self.fields.get('year')!r})"
+
+
+# Entries built from some sections of db.json, with their postings:
+#   kind -> [Entry], kind -> term -> frozenset of positions in that list
+# Terms are the tokens of the names, cities, teams and positions of an entry
+# plus adjacent token pairs ("achraf hakimi"), so a full name is one lookup.
+# Single words also go into a trigram table used to correct typos.
+class Segment:
+    def __init__(self, entries, terms):
+        self.entries = {}
+        postings = {}
+        for entry, entry_terms in zip(entries, terms):
+            kind_entries = self.entries.setdefault(entry.kind, [])
+            table = postings.setdefault(entry.kind, {})
+            for term in entry_terms:
+                table.setdefault(term, set()).add(len(kind_entries))
+            kind_entries.append(entry)
+        self.postings = {kind: {term: frozenset(ids) for term, ids in table.items()}
+                         for kind, table in postings.items()}
+        self.vocabulary = {term for table in postings.values() for term in table if ' ' not in term}
+        self.grams = {}
+        for term in self.vocabulary:
+            for gram in _grams(term):
+                self.grams.setdefault(gram, set()).add(term)
+
+
+def _terms(*texts):
+    terms = set()
+    for text in texts:
+        if not text:
+            continue
+        tokens = tokenize(str(text))
+        terms.update(tokens)
+        terms.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    return terms
+
+
+# Teams and players, from `teams` (English names, squad numbers and
+# positions) merged with `players` (French team names, clubs). `team_name`
+# maps a French team name to its English one.
+def build_squads(data, team_name):
+    entries, terms = [], []
+    teams = {}
+    players = {}
+    for group in (data.get('teams') or {}).values():
+        for team in group:
+            fields = {key: value for key, value in team.items() if key not in ('squad', 'flag')}
+            fields['squad'] = [player['name'] for player in team.get('squad', ())]
+            teams[normalize_name(team['name'])] = fields
+            for player in team.get('squad', ()):
+                players[(normalize_name(player['name']), team['name'])] = {
+                    'name': player['name'], 'team': team['name'], 'position': player.get('position'),
+                    'number': player.get('number'), 'starter': player.get('starter'), 'club': None,
+                }
+
+    by_team = {key: fields['name'] for key, fields in teams.items()}
+    for country in data.get('players') or ():
+        name = team_name(country.get('name', '')) or country.get('name', '')
+        team = by_team.get(normalize_name(name), name)
+        for line in PLAYER_LINES:
+            for player in country.get(line, ()):
+                key = (normalize_name(player['name']), team)
+                fields = players.setdefault(key, {
+                    'name': player['name'], 'team': team, 'position': player.get('position'),
+                    'number': None, 'starter': None, 'club': None,
+                })
+                fields['club'] = player.get('club')
+                fields.setdefault('line', line)
+
+    for fields in teams.values():
+        entries.append(Entry('team', fields))
+        terms.append(_terms(fields['name'], fields.get('coach'), fields.get('captain')))
+    for fields in players.values():
+        entries.append(Entry('player', fields))
+        # "goalkeepers" line -> "goalkeeper", like the squad positions
+        terms.append(_terms(fields['name'], fields['team'], fields.get('position'), fields.get('club'),
+                            fields.get('line', '')[:-1]))
+    return Segment(entries, terms)
+
+
+def build_stadiums(data, team_name=None):
+    entries, terms = [], []
+    for stadium in data.get('stadiums') or ():
+        fields = {key: stadium.get(key) for key in ('name', 'city', 'capacity')}
+        entries.append(Entry('stadium', fields))
+        terms.append(_terms(fields['name'], fields['city']))
+    return Segment(entries, terms)
+
+
+def build_winners(data, team_name=None):
+    entries, terms = [], []
+    for edition in sorted(data.get('AFCON_Winners') or (), key=lambda e: -e['year']):
+        fields = {key: edition.get(key) for key in ('year', 'champion', 'runner_up', 'host', 'final_score')}
+        entries.append(Entry('winner', fields))
+        terms.append(_terms(fields['year'], fields['champion'], fields['runner_up'], fields['host']))
+    return Segment(entries, terms)
+
+
+SEGMENT_BUILDERS = {'squads': build_squads, 'stadiums': build_stadiums, 'winners': build_winners}
+
+
+# Inverted index over the reference sections of db.json (teams, players,
+# stadiums, AFCON_Winners). A search intersects the postings of the query's
+# terms, rarest first, instead of walking the nested lists. Words the index
+# doesn't know are matched to its vocabulary through a character trigram
+# index, so "hakimy" still finds Hakimi.
+class KnowledgeIndex:
+    def __init__(self, segments):
+        self.segments = segments
+        self.entries = {}
+        self.postings = {}
+        for segment in segments.values():
+            self.entries.update(segment.entries)
+            self.postings.update(segment.postings)
+        self.teams = {normalize_name(entry.fields['name']): entry for entry in self.entries.get('team', ())}
+
+    def known(self, token):
+        return any(token in segment.vocabulary for segment in self.segments.values())
+
+    # Closest known word to `token`, by shared trigrams (Dice coefficient)
+    def correct(self, token):
+        if self.known(token):
+            return token
+        if len(token) < MIN_CORRECTABLE or token.isdigit():
+            return None
+        grams = _grams(token)
+        counts = {}
+        for segment in self.segments.values():
+            for gram in grams:
+                for term in segment.grams.get(gram, ()):
+                    counts[term] = counts.get(term, 0) + 1
+        best, score = None, MIN_SIMILARITY
+        for term, shared in counts.items():
+            # A padded word of n letters has n trigrams
+            similarity = 2 * shared / (len(grams) + len(term))
+            if similarity > score or (similarity == score and best is not None and term < best):
+                best, score = term, similarity
+        return best
+
+    # Index terms for a query: known (or corrected) tokens plus the adjacent
+    # pairs among them. Words in `ignore` (the question's cue words, such as
+    # "coach") are dropped before they can be mistaken for a misspelled name.
+    def terms(self, text, ignore=frozenset()):
+        tokens = []
+        for token in tokenize(text):
+            token = SYNONYMS.get(token, token)
+            if token.endswith('s') and self.known(token[:-1]):
+                token = token[:-1]
+            if token in STOPWORDS or token in ignore:
+                continue
+            token = self.correct(token)
+            if token:
+                tokens.append(token)
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    # Entries of `kind` matching the query terms, and the terms that matched.
+    # Postings are intersected rarest first; a term that would empty the
+    # result (a word about something else) is skipped.
+    def search(self, kind, terms):
+        table = self.postings.get(kind)
+        if not table:
+            return [], []
+        found = sorted((table[term] for term in set(terms) if term in table), key=len)
+        if not found:
+            return [], []
+        result = found[0]
+        for ids in found[1:]:
+            narrowed = result & ids
+            if narrowed:
+                result = narrowed
+        matched = [term for term in terms if term in table and result <= table[term]]
+        entries = self.entries[kind]
+        return [entries[i] for i in sorted(result)], matched
+
+    def team(self, name):
+        return self.teams.get(normalize_name(name))
+
+    # AFCON editions won by a team, latest first
+    def titles(self, team):
+        return [entry for entry in self.entries.get('winner', ()) if entry.fields['champion'] == team]
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.entries.values())
+
+
+# Snapshot builder hook for MatchStore. Keeps the segments of the last build
+# and reuses each one whose source sections are unchanged (compared by the
+# digests of their snapshot bytes, see section_identity), so a reload of
+# the data file after a score edit rebuilds nothing but the fixture views
+# and decodes none of the reference sections. One builder per store.
+class KnowledgeBuilder:
+    def __init__(self, team_name=None):
+        self.team_name = team_name or (lambda name: None)
+        self._last = {}
+        self.segments_built = 0
+
+    def __call__(self, data, views=None):
+        if not data:
+            return KnowledgeIndex({})
+        segments = {}
+        for name, sections in SEGMENT_SECTIONS.items():
+            source = tuple(section_identity(data, section) for section in sections)
+            last = self._last.get(name)
+            if last is not None and last[0] == source:
+                segments[name] = last[1]
+                continue
+            try:
+                segments[name] = SEGMENT_BUILDERS[name](data, self.team_name)
+            except (KeyError, TypeError, AttributeError) as e:
+                logger.warning("Skipping %s reference data: %s", name, e)
+                continue
+            self._last[name] = (source, segments[name])
+            self.segments_built += 1
+        return KnowledgeIndex(segments)
+
+
+# Year named in a query ("AFCON 2019")
+YEAR_PATTERN = re.compile(r'\b(19[5-9]\d|20\d\d)\b')
@@ -0,0 +1,144 @@
+import re
+
+from lru import LRUCache
+
+
+# French words that are common in football questions and never used in English
+FR_FUNCTION_WORDS = {
+    'le', 'la', 'les', 'de', 'du', 'des', 'un', 'une', 'est', 'sont', 'sera',
+    'quel', 'quelle', 'quels', 'quelles', 'qui', 'que', 'quoi', 'quand', 'où',
+    'comment', 'combien', 'pourquoi', 'et', 'au', 'aux', 'pour', 'avec', 'entre',
+    'sur', 'dans', 'en', 'par', 'pas', 'ne', 'ce', 'cette', 'ces', 'il', 'elle',
+    'ils', 'je', 'moi', 'nous', 'vous', 'joue', 'jouent', 'va', 'vont',
+    'aujourd', 'hui', 'demain', 'hier', 'prochaine', 'dernier', 'dernière',
+    'équipe', 'équipes', 'résultats', 'été', 'buts', 'vainqueur', 'groupe',
+    'classement', 'joueur', 'joueurs', 'entraîneur', 'sélectionneur', 'stade',
+    'gardien', 'capitaine', 'coupe', 'heure', 'soir', 'matin', 'ou', 'mon',
+    'donne', 'dis', 'fait', 'faire', 'gagne', 'remporté', 'finale',
+}
+
+# English words that show up in the same kinds of questions
+EN_WORDS = {
+    'the', 'is', 'are', 'was', 'were', 'what', 'whats', 'who', 'when', 'where',
+    'which', 'how', 'will', 'did', 'does', 'do', 'has', 'have', 'of', 'and',
+    'between', 'playing', 'play', 'plays', 'played', 'won', 'win', 'wins', 'lost',
+    'lose', 'result', 'results', 'next', 'today', 'tonight', 'tomorrow',
+    'yesterday', 'current', 'currently', 'now', 'going', 'happening', 'tell',
+    'me', 'please', 'show', 'upcoming', 'schedule', 'scheduled', 'game', 'games',
+    'team', 'teams', 'against', 'in', 'on', 'at', 'for', 'with', 'an', 'it',
+    'this', 'that', 'latest', 'there', 'standings', 'table', 'coach', 'stadium',
+    'player', 'players', 'squad', 'group', 'winner', 'beat', 'goals', 'kick',
+    'off', 'kickoff', 'time', 'last', 'first', 'their', 'my', 'any', 'soon',
+}
+
+# Words shared by both languages that say nothing about the query language
+NEUTRAL_WORDS = {'vs', 'versus', 'score', 'match', 'live', 'final', 'date', 'opposition'}
+
+_WORD = re.compile(r"[a-zà-ÿœæ]+")
+_ELISION = re.compile(r"\b(?:l|d|qu|j|c|n|m|t)['’][a-zà-ÿ]")
+_DIACRITIC = re.compile(r"[àâäçéèêëîïôöùûüÿœæ]")
+
+
+# French-only tokens from the query translation table: every word of a French
+# phrase that does not also occur in the English side, EN_WORDS or NEUTRAL_WORDS
+def french_vocabulary(fr_to_en):
+    english = set(EN_WORDS) | NEUTRAL_WORDS
+    for en_phrase in fr_to_en.values():
+        english.update(_WORD.findall(en_phrase.lower()))
+    vocab = set(FR_FUNCTION_WORDS)
+    for fr_phrase in fr_to_en:
+        vocab.update(w for w in _WORD.findall(fr_phrase.lower()) if len(w) > 1)
+    return {w for w in vocab if w not in english}
+
+
+# langdetect, seeded so the same text always gets the same answer
+def langdetect_fallback(text):
+    from langdetect import DetectorFactory, LangDetectException, detect
+    DetectorFactory.seed = 0
+    try:
+        return detect(text)
+    except LangDetectException:
+        return None
+
+
+# Read langdetect's language profiles now rather than on its first call
+# (a few hundred ms)
+def load_langdetect():
+    from langdetect.detector_factory import init_factory
+    init_factory()
+
+
+# FR/EN decision for chat queries. A keyword/diacritic classifier settles
+# almost every query; only long texts with no clear signal go to the heavier
+# fallback model. Results are memoized per normalized text.
+class LanguageDetector:
+    def __init__(self, fr_vocabulary, fallback=None, cache_size=8192, min_fallback_words=4):
+        self.fr_vocabulary = frozenset(fr_vocabulary)
+        self.en_vocabulary = frozenset(EN_WORDS)
+        self.fallback = fallback
+        self.min_fallback_words = min_fallback_words
+        self.cache = LRUCache(cache_size)
+        self.fallback_calls = 0
+
+    # (french evidence, english evidence, word count) for a lowercased text
+    def score(self, text):
+        words = _WORD.findall(text)
+        fr = sum(1 for w in words if w in self.fr_vocabulary)
+        en = sum(1 for w in words if w in self.en_vocabulary)
+        fr += 2 * len(_ELISION.findall(text))
+        if _DIACRITIC.search(text):
+            fr += 1
+        return fr, en, len(words)
+
+    def classify(self, text):
+        fr, en, words = self.score(text)
+        if fr != en:
+            return 'fr' if fr > en else 'en'
+        if self.fallback is not None and words >= self.min_fallback_words:
+            self.fallback_calls += 1
+            return 'fr' if self.fallback(text) == 'fr' else 'en'
+        return 'en'
+
+    def warm(self):
+        if self.fallback is langdetect_fallback:
+            load_langdetect()
+
+    # `default` (a conversation's language) settles texts with no clear
+    # signal instead of the fallback model; such results are not memoized
+    def detect(self, text, default=None):
+        key = ' '.join(text.lower().split())
+        lang = self.cache.get(key)
+        if lang is None:
+            if default is not None:
+                fr, en, _ = self.score(key)
+                if fr == en:
+                    return default
+            lang = self.classify(key)
+            self.cache.put(key, lang)
+        return lang
+
+
+# Always defer to langdetect (seeded), for comparison with the fast detector
+class LangdetectDetector:
+    def __init__(self, cache_size=8192):
+        self.cache = LRUCache(cache_size)
+
+    def warm(self):
+        load_langdetect()
+
+    # `default` is ignored: every text goes to langdetect
+    def detect(self, text, default=None):
+        lang = self.cache.get(text)
+        if lang is None:
+            lang = 'fr' if langdetect_fallback(text) == 'fr' else 'en'
+            self.cache.put(text, lang)
+        return lang
+
+
+# Detector by name: 'fast' (keywords + langdetect when unsure), 'keywords'
+# (no fallback model) or 'langdetect'
+def create_detector(kind, fr_to_en):
+    if kind == 'langdetect':
+        return LangdetectDetector()
+    fallback = langdetect_fallback if kind == 'fast' else None
+    return LanguageDetector(french_vocabulary(fr_to_en), fallback=fallback)
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# The fields clients follow, in the compact form pushed to subscribers
+def match_delta(match):
+    delta = {'id': match.match_id}
+    delta.update(match.to_json())
+    return delta
+
+
+# Matches whose score, status or clock differ between two MatchIndex objects
+def diff_indexes(old, new):
+    deltas = []
+    for match_id, match in new.matches.items():
+        before = old.matches.get(match_id) if old else None
+        if before is None or before.state() != match.state():
+            deltas.append(match_delta(match))
+    return deltas
+
+
+# One connected client. Pending deltas are coalesced per match, so a slow
+# client only ever holds the latest state of each match it follows.
+class Subscription:
+    __slots__ = ('topics', 'pending', 'event')
+
+    def __init__(self, topics):
+        self.topics = topics
+        self.pending = {}
+        self.event = asyncio.Event()
+
+    def push(self, delta):
+        self.pending[delta['id']] = delta
+        self.event.set()
+
+    # Wait for deltas (or the timeout, for keep-alives) and take them
+    async def next(self, timeout):
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self.event.clear()
+        deltas, self.pending = list(self.pending.values()), {}
+        return deltas
+
+
+# Fan-out of match changes to subscribers, keyed by topic ("team:Morocco",
+# "match:GA-1"). Everything runs on the event loop thread; other threads hand
+# changes over with publish_threadsafe.
+class LiveFeed:
+    def __init__(self):
+        self.topics = {}
+        self.loop = None
+        self.published = 0
+        self.connected = 0
+        # Last published state per match id. Updates from the write API are
+        # pushed as they are applied and then seen again by watch(); this
+        # keeps them from going out twice.
+        self.states = {}
+
+    @staticmethod
+    def topics_for(delta):
+        return ('match:' + delta['id'], 'team:' + delta['team1'], 'team:' + delta['team2'])
+
+    def subscribe(self, topics):
+        subscription = Subscription(tuple(topics))
+        for topic in subscription.topics:
+            self.topics.setdefault(topic, set()).add(subscription)
+        self.connected += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        for topic in subscription.topics:
+            subscribers = self.topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.topics[topic]
+        self.connected -= 1
+
+    @property
+    def subscriber_count(self):
+        return len({s for subscribers in self.topics.values() for s in subscribers})
+
+    def publish(self, deltas):
+        for delta in deltas:
+            state = (delta['score1'], delta['score2'], delta['status'], delta['time'])
+            if self.states.get(delta['id']) == state:
+                continue
+            self.states[delta['id']] = state
+            seen = set()
+            for topic in self.topics_for(delta):
+                for subscription in self.topics.get(topic, ()):
+                    if subscription not in seen:
+                        seen.add(subscription)
+                        subscription.push(delta)
+            self.published += 1
+
+    def publish_threadsafe(self, deltas):
+        if self.loop is not None and deltas:
+            self.loop.call_soon_threadsafe(self.publish, deltas)
+
+    # Poll the match store and publish whatever changed between snapshots.
+    # The stat/reload runs in a worker thread so parsing never blocks the loop.
+    async def watch(self, store, interval=1.0):
+        self.loop = asyncio.get_running_loop()
+        current = await self.loop.run_in_executor(None, store.snapshot)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                latest = await self.loop.run_in_executor(None, store.snapshot)
+            except Exception as e:
+                logger.warning("Live feed refresh failed: %s", e)
+                continue
+            if latest is None or latest is current:
+                continue
+            old = current.views.get('index') if current else None
+            new = latest.views.get('index')
+            current = latest
+            if new is not None:
+                self.publish(diff_indexes(old, new))
@@ -0,0 +1,225 @@
+import logging
+from collections.abc import Mapping
+
+from match_records import Match, Status, STATUSES, TeamTable
+
+logger = logging.getLogger(__name__)
+
+KNOCKOUT_STAGES = ['round_of_16', 'quarter_finals', 'semi_finals', 'final']
+
+
+# Walk every fixture in the data (group stage first, then knockout rounds in
+# order) and yield (match_id, stage, match). Ids are stable for a given file
+# layout: "<group>-<n>" for group fixtures, "<stage>-<n>" for knockout ones.
+def iter_matches(data):
+    if not data:
+        return
+    for group in data.get('live', []):
+        for i, match in enumerate(group.get('mlsf', [])):
+            yield f"{group['name']}-{i + 1}", group['name'], match
+    knockout = data.get('knockout_stage') or {}
+    for stage in KNOCKOUT_STAGES:
+        for i, match in enumerate(knockout.get(stage, [])):
+            yield f"{stage}-{i + 1}", stage, match
+
+
+# Match records for every fixture, in iter_matches order. Compiled snapshots
+# decode theirs straight from the binary records.
+def iter_match_records(data, table):
+    if hasattr(data, 'match_records'):
+        yield from data.match_records(table)
+        return
+    for match_id, stage, match in iter_matches(data):
+        try:
+            yield Match.from_json(match_id, stage, match, table)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning("Skipping fixture %s: %s", match_id, e)
+
+
+# Bucket slot for a status filter: one per Status, then 'all'. Filters can be
+# given as JSON labels or Status values.
+ALL = len(Status)
+STATUS_SLOTS = {None: ALL, 'all': ALL}
+for _status in Status:
+    STATUS_SLOTS[_status.label] = STATUS_SLOTS[_status] = int(_status)
+
+
+def status_slot(status_type):
+    try:
+        return STATUS_SLOTS[status_type]
+    except KeyError:
+        raise ValueError(f"unknown match status: {status_type!r}") from None
+
+
+def _add(buckets, match):
+    buckets[match.status].append(match)
+    buckets[ALL].append(match)
+
+
+def _bucket(index, key):
+    buckets = index.get(key)
+    if buckets is None:
+        buckets = index[key] = [[] for _ in range(ALL + 1)]
+    return buckets
+
+
+def _pair(a, b):
+    return (a, b) if a <= b else (b, a)
+
+
+def _freeze(index):
+    for key, buckets in index.items():
+        index[key] = tuple(tuple(bucket) for bucket in buckets)
+
+
+# Copy-on-write view of a dict: entries in `changes` shadow those of `base`.
+# Patching an index copies only the (small) changes dict, never the base, so
+# an update costs O(changes), not O(fixtures).
+class Overlay(Mapping):
+    __slots__ = ('base', 'changes')
+
+    def __init__(self, base, changes):
+        if isinstance(base, Overlay):
+            changes = {**base.changes, **changes}
+            base = base.base
+        self.base = base
+        self.changes = changes
+
+    def get(self, key, default=None):
+        value = self.changes.get(key)
+        if value is None:
+            value = self.base.get(key, default)
+        return value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return key in self.changes or key in self.base
+
+    def __iter__(self):
+        return iter(self.base)
+
+    def __len__(self):
+        return len(self.base)
+
+
+# Frozen per-status buckets (plus 'all') for a sequence of matches
+def _group(matches):
+    buckets = [[] for _ in range(ALL + 1)]
+    for match in matches:
+        _add(buckets, match)
+    return tuple(tuple(bucket) for bucket in buckets)
+
+
+# A frozen bucket with some of its matches swapped for updated records,
+# regrouped since their status may have changed
+def _rebucket(buckets, updated):
+    return _group([updated.get(match.match_id, match) for match in buckets[ALL]])
+
+
+# Precomputed lookups over every fixture of one snapshot:
+#   unordered team pair -> matches, team -> matches, status -> matches
+# Keys are the table's interned team names and each entry is a tuple of
+# per-status tuples, so find_match is one dict hit plus an index, and the
+# result can be handed out without copying.
+class MatchIndex:
+    def __init__(self, data):
+        self.table = TeamTable()
+        self.matches = {}
+        self.by_pair = {}
+        self.by_team = {}
+        self.by_status = [[] for _ in range(ALL + 1)]
+
+        for match in iter_match_records(data, self.table):
+            self.matches[match.match_id] = match
+            _add(_bucket(self.by_pair, _pair(match.team1, match.team2)), match)
+            _add(_bucket(self.by_team, match.team1), match)
+            if match.team2_id != match.team1_id:
+                _add(_bucket(self.by_team, match.team2), match)
+            _add(self.by_status, match)
+        _freeze(self.by_pair)
+        _freeze(self.by_team)
+        self.by_status = tuple(tuple(bucket) for bucket in self.by_status)
+        self.teams = list(self.table.names)
+
+    # Matches between team1 and team2 (in either order), or involving team1
+    # when team2 is omitted, optionally restricted to one status. The result
+    # is an immutable tuple shared with the index.
+    def lookup(self, team1, team2=None, status_type='all'):
+        if team2:
+            buckets = self.by_pair.get((team1, team2) if team1 <= team2 else (team2, team1))
+        else:
+            buckets = self.by_team.get(team1)
+        if not buckets:
+            return ()
+        return buckets[status_slot(status_type)]
+
+    def with_status(self, status_type='all'):
+        if self.by_status is None:
+            self.by_status = _group(self.matches.values())
+        return self.by_status[status_slot(status_type)]
+
+    # New index with some matches replaced by updated records (same ids and
+    # teams). Only the buckets of the teams involved are rebuilt; everything
+    # else is shared with this index, which stays valid for its readers.
+    def patched(self, records):
+        updated = {match.match_id: match for match in records}
+        pairs, teams = {}, {}
+        for match in records:
+            key = _pair(match.team1, match.team2)
+            pairs[key] = _rebucket(pairs.get(key) or self.by_pair[key], updated)
+            for team in (match.team1, match.team2):
+                teams[team] = _rebucket(teams.get(team) or self.by_team[team], updated)
+
+        index = object.__new__(MatchIndex)
+        index.table = self.table
+        index.teams = self.teams
+        index.matches = Overlay(self.matches, updated)
+        index.by_pair = Overlay(self.by_pair, pairs)
+        index.by_team = Overlay(self.by_team, teams)
+        # The status buckets span every fixture: rebuilt on first use
+        index.by_status = None
+        return index
+
+    def match_id(self, match):
+        return match.match_id
+
+    def stage_of(self, match_id):
+        match = self.matches.get(match_id)
+        return match.stage if match else None
+
+
+# Snapshot builder hook for MatchStore
+def build_match_index(data, views=None):
+    return MatchIndex(data)
+
+
+# Snapshot updater hook for MatchStore
+def patch_match_index(index, records, views=None):
+    return index.patched(records)
+
+
+# Copy of db.json `data` with every fixture replaced by the current state of
+# its record in `records` (match id -> Match). Other fields are kept as-is.
+def with_fixtures(data, records):
+    def current(match_id, match):
+        record = records.get(match_id)
+        return {**match, **record.to_json()} if record is not None else match
+
+    data = dict(data)
+    if 'live' in data:
+        data['live'] = [
+            {**group, 'mlsf': [current(f"{group['name']}-{i + 1}", match)
+                               for i, match in enumerate(group.get('mlsf', []))]}
+            for group in data['live']
+        ]
+    if data.get('knockout_stage'):
+        data['knockout_stage'] = {
+            stage: [current(f"{stage}-{i + 1}", match) for i, match in enumerate(fixtures)]
+            for stage, fixtures in data['knockout_stage'].items()
+        }
+    return data
@@ -0,0 +1,145 @@
+import sys
+from enum import IntEnum
+
+
+# Match status, stored as a small int. The JSON spelling is `label`.
+class Status(IntEnum):
+    LIVE = 0
+    FINISHED = 1
+    SCHEDULED = 2
+
+    @property
+    def label(self):
+        return self.name.lower()
+
+    @classmethod
+    def parse(cls, label):
+        try:
+            return _BY_LABEL[label]
+        except (KeyError, TypeError):
+            raise ValueError(f"unknown match status: {label!r}") from None
+
+
+_BY_LABEL = {status.label: status for status in Status}
+
+# JSON spellings in code order
+STATUSES = [status.label for status in Status]
+
+# Module-level aliases: plain globals are cheaper to reach in hot paths than
+# attributes of the enum class
+LIVE, FINISHED, SCHEDULED = Status
+
+
+# Team names interned to small integer ids. Every record of a snapshot shares
+# one table, so a team name (and its id) is stored once however many fixtures
+# it plays; records only hold references.
+class TeamTable:
+    __slots__ = ('names', 'ids')
+
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+
+    def intern(self, name):
+        team_id = self.ids.get(name)
+        if team_id is None:
+            name = sys.intern(name)
+            team_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return team_id
+
+    def name(self, team_id):
+        return self.names[team_id]
+
+    def get(self, name):
+        return self.ids.get(name)
+
+    def __len__(self):
+        return len(self.names)
+
+
+# One fixture. Team ids come from the snapshot's TeamTable and the names are
+# the table's interned strings; the status is a Status, so comparisons are
+# identity/integer checks instead of string equality.
+class Match:
+    __slots__ = ('match_id', 'stage', 'team1', 'team2', 'team1_id', 'team2_id', 'status',
+                 'score1', 'score2', 'time')
+
+    def __init__(self, match_id, stage, table, team1_id, team2_id, status, score1, score2, time):
+        self.match_id = match_id
+        self.stage = stage
+        self.team1 = table.names[team1_id]
+        self.team2 = table.names[team2_id]
+        self.team1_id = team1_id
+        self.team2_id = team2_id
+        self.status = status
+        self.score1 = score1
+        self.score2 = score2
+        self.time = time
+
+    # Fields the live feed watches for changes
+    def state(self):
+        return (self.score1, self.score2, self.status, self.time)
+
+    # Record from a fixture dict as found in db.json
+    @classmethod
+    def from_json(cls, match_id, stage, match, table):
+        return cls(match_id, sys.intern(stage), table,
+                   table.intern(match['team1']), table.intern(match['team2']),
+                   Status.parse(match['status']), match['score1'], match['score2'],
+                   sys.intern(match['time']))
+
+    # Copy with some fields replaced (see parse_changes); the teams, id and
+    # stage of a fixture never change
+    def replace(self, changes):
+        match = object.__new__(Match)
+        for name in Match.__slots__:
+            setattr(match, name, changes[name] if name in changes else getattr(self, name))
+        return match
+
+    # Back to the db.json fixture shape
+    def to_json(self):
+        return {
+            'team1': self.team1,
+            'team2': self.team2,
+            'status': self.status.label,
+            'score1': self.score1,
+            'score2': self.score2,
+            'time': self.time,
+        }
+
+    def __repr__(self):
+        return f"Match({self.match_id!r}, {self.team1!r}, {self.team2!r}, {self.status.label})"
+
+
+# Fields the write API may change, and a check of their values
+UPDATABLE_FIELDS = ('score1', 'score2', 'status', 'time')
+
+
+def _parse_score(value):
+    if value is None or (isinstance(value, int) and not isinstance(value, bool) and value >= 0):
+        return value
+    raise ValueError(f"score must be a non-negative integer or null, not {value!r}")
+
+
+# Validated Match.replace arguments from a JSON object such as
+# {"score1": 2, "status": "live", "time": "67'"}
+def parse_changes(fields):
+    if not isinstance(fields, dict):
+        raise ValueError("changes must be an object")
+    unknown = set(fields) - set(UPDATABLE_FIELDS)
+    if unknown:
+        raise ValueError(f"cannot update {', '.join(sorted(unknown))}")
+    if not fields:
+        raise ValueError("no fields to update")
+    changes = {}
+    for name in ('score1', 'score2'):
+        if name in fields:
+            changes[name] = _parse_score(fields[name])
+    if 'status' in fields:
+        changes['status'] = Status.parse(fields['status'])
+    if 'time' in fields:
+        if not isinstance(fields['time'], str):
+            raise ValueError(f"time must be a string, not {fields['time']!r}")
+        changes['time'] = sys.intern(fields['time'])
+    return changes
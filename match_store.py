@@ -0,0 +1,321 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from db_snapshot import SnapshotData, encode_snapshot, is_snapshot, write_atomic
+from match_index import with_fixtures
+from match_records import parse_changes
+
+logger = logging.getLogger(__name__)
+
+
+# A parsed, read-only view of db.json. Every request grabs one snapshot and uses
+# it for all of its lookups, so a reload in the middle of a request can never
+# mix old and new data. Snapshots are never mutated after construction; a
+# reload builds a new one and swaps the store's reference.
+class Snapshot:
+    __slots__ = ('data', 'version', 'digest', 'loaded_at', 'source', 'views')
+
+    def __init__(self, data, version, source=None, views=None, digest=None):
+        self.data = data
+        self.version = version
+        # Content hash of the source file; unlike `version` (a per-process
+        # reload counter) it is the same in every worker and container
+        self.digest = digest or str(version)
+        self.loaded_at = time.time()
+        self.source = source
+        # Structures derived from `data` (indexes, resolvers...) keyed by name
+        self.views = views if views is not None else {}
+
+
+# Views of a snapshot, by name. Lazy views are built on first access by
+# their builder, called with the snapshot's data and this mapping, so views
+# a process never queries (the reference data index, the calendar) cost
+# nothing on load, and neither do the cold snapshot sections behind them. A
+# lazy view whose builder fails is logged and left out, like an eager one.
+class Views(dict):
+    def __init__(self, data=None, built=None, lazy=None, source=None):
+        super().__init__(built or {})
+        self.data = data
+        self.source = source
+        self._lazy = {name: builder for name, builder in (lazy or {}).items() if name not in self}
+        self._lock = threading.RLock()
+
+    def __missing__(self, name):
+        if name not in self._lazy:
+            raise KeyError(name)
+        with self._lock:
+            if dict.__contains__(self, name):
+                return dict.__getitem__(self, name)
+            builder = self._lazy.pop(name, None)
+            if builder is None:
+                raise KeyError(name)
+            try:
+                view = builder(self.data, self)
+            except Exception:
+                logger.exception("Error building %r for %s", name, self.source)
+                raise KeyError(name)
+            self[name] = view
+            return view
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    # Names of the lazy views not built yet
+    @property
+    def pending(self):
+        return list(self._lazy)
+
+    # Views of the next snapshot of the same data: the built ones as they
+    # are, the pending ones still built on demand (from the new views)
+    def copy(self):
+        with self._lock:
+            return Views(self.data, dict(self), self._lazy, self.source)
+
+
+# Process-wide cache of db.json. The file is parsed once and then only again
+# when its mtime, size or inode changes. The stat check itself is throttled to
+# once per `poll_interval` seconds so the hot path is a plain attribute read.
+#
+# With a write-ahead log (wal.py), match updates are applied in memory as they
+# arrive: each one appends to the log and swaps in a snapshot whose `index`
+# view is patched copy-on-write, so its cost depends on the update, not on the
+# size of the data. The same poll tails the log for updates written by other
+# processes, and compact() folds the log back into the data file.
+class MatchStore:
+    def __init__(self, path, poll_interval=1.0, builders=None, wal=None, updaters=None, lazy_builders=None):
+        self.path = path
+        self.poll_interval = poll_interval
+        # name -> callable(data, views) run once per new snapshot, in order, to
+        # build derived views; `views` holds the ones built so far
+        self.builders = dict(builders or {})
+        # name -> callable(data, views) building a view on its first access
+        # (see Views)
+        self.lazy_builders = dict(lazy_builders or {})
+        # name -> callable(view, records, views) deriving a view's next version
+        # from updated Match records. Views without one are carried over as-is,
+        # and lazy views not built yet stay that way.
+        self.updaters = dict(updaters or {})
+        self.wal = wal
+        # Callables(records) run after every applied batch of updates
+        self.listeners = []
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._signature = None
+        self._next_check = 0.0
+        self._version = 0
+        # Digest of the data file, and the last log entry reflected in memory
+        self._base_digest = None
+        self._applied_seq = None
+        self.reload_count = 0
+        self.load_errors = 0
+        self.updates_applied = 0
+        self.compactions = 0
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _build_views(self, data):
+        views = Views(data, lazy=self.lazy_builders, source=self.path)
+        for name, builder in self.builders.items():
+            try:
+                views[name] = builder(data, views)
+            except Exception:
+                logger.exception("Error building %r for %s", name, self.path)
+        return views
+
+    # Parsed data and content digest of the file. Compiled snapshots (see
+    # db_snapshot.py) are mapped and decoded lazily; anything else is JSON.
+    def _read(self):
+        if is_snapshot(self.path):
+            data = SnapshotData(self.path)
+            return data, data.digest
+        with open(self.path, 'rb') as file:
+            raw = file.read()
+        return json.loads(raw.decode('utf-8')), hashlib.sha1(raw).hexdigest()
+
+    def _load(self, signature):
+        try:
+            data, digest = self._read()
+        except Exception as e:
+            logger.error("Error loading data from %s: %s", self.path, e)
+            self.load_errors += 1
+            return False
+
+        self._version += 1
+        self._snapshot = Snapshot(data, self._version, source=self.path,
+                                  views=self._build_views(data),
+                                  digest=digest)
+        self._signature = signature
+        self._base_digest = digest
+        self._applied_seq = None
+        self.reload_count += 1
+        if self.wal is not None:
+            # Replay the whole log on top of the fresh data
+            self.wal.rewind()
+        return True
+
+    # Apply log entries that are newer than the current snapshot
+    def _replay(self):
+        if self.wal is None or self._snapshot is None:
+            return
+        entries = self.wal.read_new()
+        header = self.wal.header
+        if header is None:
+            return
+        if header['base'] != self._base_digest:
+            # Written for another version of the data file: either compaction
+            # has replaced the file but not yet the log, or the file was edited
+            # by hand (which supersedes the log). Look again on the next poll.
+            self.wal.rewind()
+            return
+        if self._applied_seq is None or self._applied_seq < header['seq']:
+            self._applied_seq = header['seq']
+        entries = [entry for entry in entries if entry['seq'] > self._applied_seq]
+        if entries:
+            self._apply(entries)
+
+    # Swap in a snapshot with the log entries applied; returns the updated
+    # Match records
+    def _apply(self, entries):
+        snapshot = self._snapshot
+        index = snapshot.views.get('index')
+        updated = {}
+        for entry in entries:
+            match = updated.get(entry['id']) or (index.matches.get(entry['id']) if index else None)
+            if match is None:
+                logger.warning("Ignoring update %s: unknown match %s", entry['seq'], entry['id'])
+                continue
+            try:
+                updated[entry['id']] = match.replace(parse_changes(entry['set']))
+            except ValueError as e:
+                logger.warning("Ignoring update %s: %s", entry['seq'], e)
+        self._applied_seq = entries[-1]['seq']
+        records = list(updated.values())
+        if not records:
+            return records
+
+        views = snapshot.views.copy()
+        for name, updater in self.updaters.items():
+            if name in views:
+                try:
+                    views[name] = updater(views[name], records, views)
+                except Exception:
+                    logger.exception("Error updating %r for %s", name, self.path)
+        self._version += 1
+        self._snapshot = Snapshot(snapshot.data, self._version, source=self.path, views=views,
+                                  digest=f"{self._base_digest}+{self._applied_seq}")
+        self.updates_applied += len(entries)
+        for listener in self.listeners:
+            try:
+                listener(records)
+            except Exception:
+                logger.exception("Match update listener failed")
+        return records
+
+    def _sync(self, force=False):
+        self._next_check = time.monotonic() + self.poll_interval
+        signature = self._stat_signature()
+        if signature is None:
+            if self._snapshot is None:
+                logger.warning("%s not found", self.path)
+            return
+        if force or signature != self._signature:
+            self._load(signature)
+        self._replay()
+
+    # Re-stat the file and reload it if it changed. Readers that lose the race
+    # for the lock keep serving the current snapshot instead of waiting.
+    def refresh(self, force=False):
+        if not self._lock.acquire(blocking=force or self._snapshot is None):
+            return self._snapshot
+        try:
+            self._sync(force)
+            return self._snapshot
+        finally:
+            self._lock.release()
+
+    # Apply [(match_id, fields)] (fields as accepted by parse_changes) as one
+    # batch: logged first, then visible to readers. Raises KeyError for an
+    # unknown match and ValueError for invalid fields, before anything is
+    # written. Returns the updated Match records.
+    def update(self, updates):
+        if self.wal is None:
+            raise RuntimeError("match updates need a write-ahead log")
+        with self.wal.locked(), self._lock:
+            self._sync()
+            index = self._snapshot.views.get('index') if self._snapshot else None
+            if index is None:
+                raise RuntimeError("match data is not loaded")
+            for match_id, fields in updates:
+                if match_id not in index.matches:
+                    raise KeyError(match_id)
+                parse_changes(fields)
+            entries = self.wal.append(updates, self._base_digest)
+            return self._apply(entries)
+
+    # Write the current state back to the data file (in its own format) and
+    # start a fresh log. Readers keep using the current snapshot meanwhile;
+    # only writers wait. Returns whether there was anything to compact.
+    def compact(self):
+        if self.wal is None:
+            return False
+        with self.wal.locked(), self._lock:
+            self._sync()
+            snapshot = self._snapshot
+            header = self.wal.header
+            if (snapshot is None or header is None or header['base'] != self._base_digest
+                    or self._applied_seq is None or self._applied_seq <= header['seq']):
+                return False
+
+            data = with_fixtures(snapshot.data, snapshot.views['index'].matches)
+            raw = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+            digest = hashlib.sha1(raw).hexdigest()
+            write_atomic(self.path, encode_snapshot(data, digest) if isinstance(snapshot.data, SnapshotData) else raw)
+            self.wal.start(digest, self._applied_seq)
+
+            # The file now matches memory: rebuild the views once (dropping
+            # the patch overlays) and don't reload it as an outside change
+            self._version += 1
+            self._snapshot = Snapshot(data, self._version, source=self.path,
+                                      views=self._build_views(data), digest=digest)
+            self._signature = self._stat_signature()
+            self._base_digest = digest
+            self.compactions += 1
+            return True
+
+    # Current snapshot (or None if the file has never been readable)
+    def snapshot(self):
+        if self._snapshot is None or time.monotonic() >= self._next_check:
+            return self.refresh()
+        return self._snapshot
+
+    @property
+    def version(self):
+        snap = self.snapshot()
+        return snap.version if snap else 0
+
+
+# Compact the store's write-ahead log every `interval` seconds
+def start_compactor(store, interval):
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                store.compact()
+            except Exception as e:
+                logger.warning("Match log compaction failed: %s", e)
+
+    thread = threading.Thread(target=run, name='match-compactor', daemon=True)
+    thread.start()
+    return thread
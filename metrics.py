@@ -0,0 +1,222 @@
+import bisect
+import json
+import logging
+import random
+import threading
+import time
+
+trace_logger = logging.getLogger('afcon.trace')
+
+# Latency buckets in seconds, from 100µs to 10s
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value) if value == value else 'NaN'
+    return str(value)
+
+
+# Cumulative-bucket histogram in the Prometheus sense: observe() is a bisect
+# and three increments under a lock, cheap enough for every pipeline stage.
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def state(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class Counter:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+# A metric name plus one child (Histogram or Counter) per label combination
+class Family:
+    def __init__(self, name, help, kind, label_names, factory):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.label_names = tuple(label_names)
+        self._factory = factory
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._factory()
+        return child
+
+    def render(self, lines):
+        for values, child in sorted(self._children.items()):
+            if self.kind == 'counter':
+                lines.append(f"{self.name}{_format_labels(self.label_names, values)} {child.value}")
+                continue
+            counts, total, count = child.state()
+            cumulative = 0
+            for bound, n in zip(child.buckets, counts):
+                cumulative += n
+                le = _format_labels(self.label_names, values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _format_labels(self.label_names, values, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, values)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, values)} {count}")
+
+
+# All metrics of this process. Histograms and counters are updated as work
+# happens; values owned by other objects (cache counters, reload counts) are
+# registered as callbacks and read only when /metrics is scraped.
+class Registry:
+    def __init__(self):
+        self._families = {}
+        self._callbacks = {}
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._families.setdefault(
+            name, Family(name, help, 'histogram', labels, lambda: Histogram(buckets)))
+
+    def counter(self, name, help, labels=()):
+        return self._families.setdefault(name, Family(name, help, 'counter', labels, Counter))
+
+    # `fn` returns the current value; kind is 'gauge' or 'counter'
+    def register(self, name, kind, help, fn):
+        self._callbacks[name] = (kind, help, fn)
+
+    def render(self):
+        lines = []
+        for name, family in sorted(self._families.items()):
+            lines.append(f"# HELP {name} {family.help}")
+            lines.append(f"# TYPE {name} {family.kind}")
+            family.render(lines)
+        for name, (kind, help, fn) in sorted(self._callbacks.items()):
+            try:
+                value = fn()
+            except Exception:
+                continue
+            if value is None:
+                continue
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram(
+    'afcon_stage_seconds', 'Time spent in each query pipeline stage', ('stage',))
+
+_local = threading.local()
+
+
+# Timing records of one sampled request, logged as a single JSON line
+class Trace:
+    __slots__ = ('name', 'started', 'spans')
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans = []
+
+
+# Start tracing the current thread's request with probability `sample_rate`.
+# Unsampled requests still feed the histograms; they just aren't logged.
+def start_trace(name, sample_rate):
+    trace = Trace(name) if sample_rate > 0 and random.random() < sample_rate else None
+    _local.trace = trace
+    return trace
+
+
+def end_trace(trace, **fields):
+    _local.trace = None
+    if trace is None:
+        return
+    record = {'trace': trace.name,
+              'ms': round((time.perf_counter() - trace.started) * 1000, 3)}
+    record.update(fields)
+    record['spans'] = [[stage, round(elapsed * 1000, 3)] for stage, elapsed in trace.spans]
+    trace_logger.info(json.dumps(record, separators=(',', ':')))
+
+
+def _record(stage, elapsed):
+    STAGE_SECONDS.labels(stage).observe(elapsed)
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace.spans.append((stage, elapsed))
+    captured = getattr(_local, 'captured', None)
+    if captured is not None:
+        captured.append((stage, elapsed))
+
+
+# Times a block as one pipeline stage:
+#
+#   with span('nlp'):
+#       docs = list(nlp.pipe(texts))
+class span:
+    __slots__ = ('stage', 'started')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _record(self.stage, time.perf_counter() - self.started)
+        return False
+
+
+# Run fn(*args) and return (result, spans) so work done in another process
+# can report its stage timings back to the parent
+def captured(fn, *args):
+    _local.captured = spans = []
+    try:
+        return fn(*args), spans
+    finally:
+        _local.captured = None
+
+
+# Feed stage timings collected elsewhere (see captured) into this process
+def record_spans(spans):
+    for stage, elapsed in spans:
+        _record(stage, elapsed)
@@ -0,0 +1,102 @@
+import gc
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+# Raised when the pool already has `max_pending` jobs queued or running
+class PoolBusy(Exception):
+    pass
+
+
+# Bounded process pool for the CPU-bound query pipeline. Workers are forked
+# from a parent that has already loaded the models and the match store, so
+# they start warm and share those pages copy-on-write. Admission is capped:
+# once `max_pending` jobs are in flight, new work is rejected immediately
+# instead of queueing behind a backlog. A pool whose worker died is replaced
+# on the next query.
+class QueryPool:
+    def __init__(self, fn, workers, max_pending=None, warm=None, timeout=10.0):
+        self.fn = fn
+        self.workers = workers
+        self.max_pending = max_pending or workers * 4
+        self.warm = warm
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._count_lock = threading.Lock()
+        self._executor = None
+        self._owner = None
+        self.pending = 0
+        self.rejected = 0
+
+    def _start(self):
+        if self.warm:
+            self.warm()
+        # Keep everything loaded so far out of the cyclic GC, which would
+        # otherwise touch (and un-share) those pages in every worker
+        gc.freeze()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=self.warm
+        )
+        self._owner = os.getpid()
+
+    def executor(self):
+        # A pool belongs to the process that created it; forked children
+        # (including the pool's own workers) never dispatch to it
+        if self._owner != os.getpid():
+            with self._lock:
+                if self._owner != os.getpid():
+                    self._start()
+        return self._executor
+
+    # A worker died: drop the broken pool so the next query starts a fresh one
+    def _restart(self, broken):
+        with self._lock:
+            if self._executor is broken:
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._owner = None
+
+    def _release(self, future=None):
+        with self._count_lock:
+            self.pending -= 1
+        self._slots.release()
+
+    def run(self, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._count_lock:
+                self.rejected += 1
+            raise PoolBusy(f"{self.max_pending} queries already in flight")
+        with self._count_lock:
+            self.pending += 1
+        try:
+            executor = self.executor()
+            try:
+                future = executor.submit(self.fn, *args)
+            except BrokenProcessPool:
+                # Retry once on a fresh pool
+                self._restart(executor)
+                executor = self.executor()
+                future = executor.submit(self.fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # The slot is held until a worker is done with the query, not until
+        # the caller stops waiting, so a timed-out query still counts
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except BrokenProcessPool:
+            # Killed mid-query; the query fails but the pool is rebuilt
+            self._restart(executor)
+            raise
+
+    def shutdown(self):
+        if self._executor is not None and self._owner == os.getpid():
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self._owner = None
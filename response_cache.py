@@ -0,0 +1,129 @@
+import json
+import logging
+import threading
+import time
+
+from lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+# Collapse case, whitespace and trailing punctuation so trivially different
+# spellings of a question share one cache entry. Accents are kept: the French
+# translation table depends on them.
+def normalize_query(query):
+    return ' '.join(query.lower().split()).rstrip(' ?!.')
+
+
+# In-process backend: bounded LRU of (expires_at, data_digest, response,
+# context)
+class LocalBackend:
+    def __init__(self, maxsize):
+        self._entries = LRUCache(maxsize)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.time():
+            self._entries.pop(key)
+            return None
+        return entry[1:]
+
+    def put(self, key, digest, response, context, ttl):
+        self._entries.put(key, (time.time() + ttl, digest, response, context))
+
+    def clear(self):
+        self._entries.clear()
+
+
+# Shared backend for several workers/containers, talking to any Redis-compatible
+# server. Expiry is left to the server; failures degrade to cache misses.
+class RedisBackend:
+    def __init__(self, url, prefix='afcon:response:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RESPONSE_CACHE_URL needs the redis package (pip install redis)") from None
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, key):
+        try:
+            raw = self._client.get(self._prefix + key)
+        except Exception as e:
+            logger.warning("Response cache read failed: %s", e)
+            return None
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        # Entries written before contexts were cached read as misses
+        return tuple(entry) if len(entry) == 3 else None
+
+    def put(self, key, digest, response, context, ttl):
+        try:
+            self._client.set(self._prefix + key, json.dumps([digest, response, context]), ex=max(1, int(ttl)))
+        except Exception as e:
+            logger.warning("Response cache write failed: %s", e)
+
+    def clear(self):
+        try:
+            for key in self._client.scan_iter(self._prefix + '*'):
+                self._client.delete(key)
+        except Exception as e:
+            logger.warning("Response cache clear failed: %s", e)
+
+
+# Cache of final chat responses keyed on (competition, language, normalized
+# query), the same question asked of two competitions having two answers. Each
+# entry remembers the digest of the data snapshot it was computed from, so a
+# db.json update invalidates every older answer on its next lookup, and the
+# conversation context of the answer (a small dict, or None), so a cached
+# answer still updates the session asking.
+class ResponseCache:
+    def __init__(self, backend, ttl=60.0):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    @staticmethod
+    def key(query, lang, competition=None):
+        return f"{competition or ''}:{lang}:{normalize_query(query)}"
+
+    # (response, context), or None
+    def get(self, query, lang, digest, competition=None):
+        entry = self.backend.get(self.key(query, lang, competition))
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] != digest:
+                self.stale += 1
+                self.misses += 1
+                return None
+            self.hits += 1
+        return entry[1], entry[2]
+
+    def put(self, query, lang, digest, response, context=None, competition=None):
+        self.backend.put(self.key(query, lang, competition), digest, response, context, self.ttl)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale': self.stale,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Cache configured from settings: None when disabled, Redis when a URL is
+# given, otherwise in-process
+def create_response_cache(size, ttl, url=None):
+    if size <= 0:
+        return None
+    backend = RedisBackend(url) if url else LocalBackend(size)
+    return ResponseCache(backend, ttl=ttl)
@@ -0,0 +1,224 @@
+import bisect
+import logging
+import re
+from datetime import date, datetime, time, timedelta
+
+from match_index import KNOCKOUT_STAGES
+
+logger = logging.getLogger(__name__)
+
+# MatchCan dates and times: "21/12/25", "03:00 PM" (tournament local time)
+DATE_FORMAT = '%d/%m/%y'
+TIME_FORMAT = '%I:%M %p'
+ONE_DAY = timedelta(days=1)
+ONE_MINUTE = timedelta(minutes=1)
+
+
+def parse_kickoff(day, hour):
+    return datetime.strptime(f"{day.strip()} {hour.strip()}", f"{DATE_FORMAT} {TIME_FORMAT}")
+
+
+# MatchCan teams are {"arabic": "Morocco", "english": "Morocco National
+# Team", ...}; `arabic` holds the short name the fixtures use
+def _team_name(team):
+    if isinstance(team, str):
+        return team
+    return team.get('arabic') or team['english'].replace(' National Team', '')
+
+
+# One calendar entry. `match_id` links it to its fixture record in the match
+# index (current status and score), or is None when no fixture matches.
+class Fixture:
+    __slots__ = ('kickoff', 'team1', 'team2', 'group', 'round', 'match_id')
+
+    def __init__(self, kickoff, team1, team2, group=None, round=None, match_id=None):
+        self.kickoff = kickoff
+        self.team1 = team1
+        self.team2 = team2
+        self.group = group
+        self.round = round
+        self.match_id = match_id
+
+    def __repr__(self):
+        return f"Fixture({self.kickoff:%d/%m/%y %H:%M}, {self.team1!r}, {self.team2!r}, {self.match_id!r})"
+
+
+# Fixtures sorted by kickoff, with a parallel list of kickoffs for bisect,
+# the same per team, and per day the slice of fixtures played on it. A
+# window ("today", "between 15:00 and 18:00") or a team's next fixture is
+# two binary searches whatever the size of the calendar:
+#   fixtures  (Fixture, ...) by kickoff
+#   by_team   team -> ([kickoff, ...], (Fixture, ...))
+#   days      date -> (first, last + 1) positions in fixtures
+class Calendar:
+    def __init__(self, fixtures):
+        self.fixtures = tuple(sorted(fixtures, key=lambda fixture: fixture.kickoff))
+        self.kickoffs = [fixture.kickoff for fixture in self.fixtures]
+        self.by_match = {fixture.match_id: fixture for fixture in self.fixtures if fixture.match_id}
+        teams = {}
+        self.days = {}
+        for position, fixture in enumerate(self.fixtures):
+            for team in (fixture.team1, fixture.team2):
+                teams.setdefault(team, []).append(fixture)
+            first, _ = self.days.get(fixture.kickoff.date(), (position, position))
+            self.days[fixture.kickoff.date()] = (first, position + 1)
+        self.by_team = {team: ([fixture.kickoff for fixture in line], tuple(line)) for team, line in teams.items()}
+
+    def _line(self, team):
+        if team is None:
+            return self.kickoffs, self.fixtures
+        return self.by_team.get(team, ((), ()))
+
+    # Fixtures kicking off in [start, end), of one team or of all; either
+    # bound may be None
+    def between(self, start, end, team=None):
+        kickoffs, fixtures = self._line(team)
+        first = bisect.bisect_left(kickoffs, start) if start is not None else 0
+        last = bisect.bisect_left(kickoffs, end) if end is not None else len(fixtures)
+        return fixtures[first:last]
+
+    # Fixtures from `now` on, one at a time (the caller stops at the first
+    # one it wants)
+    def upcoming(self, now, team=None):
+        kickoffs, fixtures = self._line(team)
+        for position in range(bisect.bisect_left(kickoffs, now), len(fixtures)):
+            yield fixtures[position]
+
+    def on(self, day):
+        first, last = self.days.get(day, (0, 0))
+        return self.fixtures[first:last]
+
+    def kickoff(self, match_id):
+        fixture = self.by_match.get(match_id)
+        return fixture.kickoff if fixture else None
+
+    # Year of the calendar's day/month (for dates like "29/12"), or None
+    def year_of(self, month, day):
+        return next((d.year for d in self.days if d.month == month and d.day == day), None)
+
+    def __len__(self):
+        return len(self.fixtures)
+
+
+# Fixture record of the index for a calendar entry: a group-stage match
+# between the two teams not linked yet, home team first if there is one
+def _link(index, team1, team2, linked):
+    candidates = [match for match in index.lookup(team1, team2)
+                  if match.stage not in KNOCKOUT_STAGES and match.match_id not in linked]
+    for match in sorted(candidates, key=lambda match: match.team1 != team1):
+        linked.add(match.match_id)
+        return match.match_id
+    return None
+
+
+# Snapshot builder hook for MatchStore: the MatchCan rounds parsed once into
+# a Calendar, linked to the records of the `index` view. Kickoffs don't
+# change with score updates, so the view needs no updater.
+def build_calendar(data, views=None):
+    index = views.get('index') if views else None
+    fixtures = []
+    linked = set()
+    for group in (data.get('MatchCan') or ()) if data else ():
+        for group_round in group.get('rounds', ()):
+            for entry in group_round.get('matches', ()):
+                try:
+                    kickoff = parse_kickoff(entry['date'], entry['time'])
+                    team1, team2 = _team_name(entry['team1']), _team_name(entry['team2'])
+                except (KeyError, TypeError, AttributeError, ValueError) as e:
+                    logger.warning("Skipping calendar entry in %s: %s", group.get('name'), e)
+                    continue
+                match_id = _link(index, team1, team2, linked) if index else None
+                fixtures.append(Fixture(kickoff, team1, team2, group.get('name'), group_round.get('round'),
+                                        match_id))
+    return Calendar(fixtures)
+
+
+# Time windows named in a query, once translated to English (the French
+# "de 15h à 18h" and "à 15h" are matched as they are)
+_CLOCK = r'(\d{1,2})(?::(\d{2})|(h)(\d{2})?)?\s*(am|pm)?'
+RANGE_PATTERN = re.compile(rf'\b(?:between|from|de)\s+{_CLOCK}\s*(?:and|to|à|-)\s*{_CLOCK}(?!\w)')
+POINT_PATTERN = re.compile(rf'(?<!\w)(at|à|after|since|before|until)\s+{_CLOCK}(?!\w)')
+DATE_PATTERN = re.compile(r'\b(\d{1,2})/(\d{1,2})(?:/(\d{2}|\d{4}))?\b')
+MONTHS = ('january', 'february', 'march', 'april', 'may', 'june', 'july', 'august', 'september', 'october',
+          'november', 'december')
+_MONTH = r'(' + '|'.join(m[:3] + f"(?:{m[3:]})?" if len(m) > 3 else m for m in MONTHS) + r')'
+MONTH_DAY_PATTERN = re.compile(rf'\b(?:(\d{{1,2}})(?:st|nd|rd|th)?\s+{_MONTH}|{_MONTH}\s+(\d{{1,2}})(?:st|nd|rd|th)?)\b')
+DAY_WORDS = {'today': 0, 'tonight': 0, 'tomorrow': 1, 'yesterday': -1}
+DAY_WORD_PATTERN = re.compile(r'\b(' + '|'.join(DAY_WORDS) + r')\b')
+
+
+# datetime.time from the _CLOCK groups (hour, ":minute", "h", "h" minute,
+# am/pm), or None. A bare hour ("3") only counts as a time when the other
+# end of a range is one (`explicit`), taking its am/pm (`suffix`).
+def _clock(hour, minute, h, h_minute, meridiem, suffix=None, explicit=False):
+    meridiem = meridiem or suffix
+    if not (explicit or minute or h or meridiem):
+        return None
+    hour = int(hour)
+    minute = int(minute or h_minute or 0)
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem == 'pm' else 0)
+    if hour > 23 or minute > 59:
+        return None
+    return time(hour, minute)
+
+
+def _day(text, today, calendar):
+    found = DATE_PATTERN.search(text)
+    if found:
+        day, month, year = int(found.group(1)), int(found.group(2)), found.group(3)
+    else:
+        found = MONTH_DAY_PATTERN.search(text)
+        if not found:
+            word = DAY_WORD_PATTERN.search(text)
+            return today + timedelta(days=DAY_WORDS[word.group(1)]) if word else None
+        day = int(found.group(1) or found.group(4))
+        month = next(i for i, m in enumerate(MONTHS, 1) if m.startswith(found.group(2) or found.group(3)))
+        year = None
+    if year is None:
+        year = (calendar.year_of(month, day) if calendar else None) or today.year
+    else:
+        year = int(year) + (2000 if len(year) == 2 else 0)
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+# [start, end) kickoff window named in `text`, or None: a day (a date,
+# "29 december", "today", "tomorrow"), a time range ("between 15:00 and
+# 18:00", "from 3 to 6pm"), "after"/"before" a time, or a time ("at 15h",
+# a one-minute window). Times without a day are today's; a day without a
+# time is the whole day. Year-less dates take the calendar's year.
+def parse_window(text, now, calendar=None):
+    text = text.lower()
+    day = _day(text, now.date(), calendar)
+    start = end = None
+    found = RANGE_PATTERN.search(text)
+    if found:
+        groups = found.groups()
+        start = _clock(*groups[:5], suffix=groups[9], explicit=bool(groups[9]))
+        end = _clock(*groups[5:], suffix=groups[4], explicit=bool(groups[4]) or start is not None)
+        if start is None or end is None:
+            start = end = None
+    else:
+        found = POINT_PATTERN.search(text)
+        clock = _clock(*found.groups()[1:]) if found else None
+        if clock is not None:
+            word = found.group(1)
+            if word in ('at', 'à'):
+                start, end = clock, (datetime.combine(date.min, clock) + ONE_MINUTE).time()
+            elif word in ('after', 'since'):
+                start = clock
+            else:
+                end = clock
+    if day is None and start is None and end is None:
+        return None
+    day = day or now.date()
+    window_start = datetime.combine(day, start or time(0))
+    window_end = datetime.combine(day, end) if end not in (None, time(0)) else datetime.combine(day + ONE_DAY, time(0))
+    if window_end <= window_start:
+        return None
+    return window_start, window_end
@@ -0,0 +1,319 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+# Conversation history lives server-side, keyed by the session id kept in the
+# signed Flask cookie. Every backend stores messages with a per-session
+# sequence number, keeps at most `max_messages` of them (oldest dropped
+# first) and forgets sessions idle for longer than `ttl` seconds.
+#
+# Each session also keeps a small context: what its last answered turn was
+# about (teams, match, intent, language), for follow-up questions. It is
+# written along with the turn, expires with the session and is dropped by
+# clear().
+#
+# Backend interface:
+#   append(session_id, messages, context=None) -> seq of the last message
+#       appended; a `context` replaces the session's context
+#   context(session_id) -> dict, or None for an unknown session or none kept
+#   history(session_id, since=0, limit=None) -> [{'seq', 'message', 'isUser'}]
+#   last_seq(session_id) -> int (0 for an empty/unknown session)
+#   clear(session_id) -- also bumps the sequence, so cursors/ETags change
+#   gc() -> number of expired sessions removed
+
+
+# Largest context kept, once encoded; bigger ones are not stored
+MAX_CONTEXT_BYTES = 1024
+
+
+def _entry(seq, message, is_user):
+    return {'seq': seq, 'message': message, 'isUser': bool(is_user)}
+
+
+# Context as stored (compact JSON), or None when there is none to store
+def _encode_context(context):
+    if context is None:
+        return None
+    encoded = json.dumps(context, separators=(',', ':'), ensure_ascii=False)
+    if len(encoded.encode('utf-8')) > MAX_CONTEXT_BYTES:
+        logger.warning("Session context of %d bytes not stored", len(encoded))
+        return None
+    return encoded
+
+
+def _decode_context(raw):
+    if raw is None:
+        return None
+    return json.loads(raw)
+
+
+# In-process store, for tests and single-worker development
+class MemoryConversationStore:
+    def __init__(self, max_messages=100, ttl=86400):
+        self.max_messages = max_messages
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def append(self, session_id, messages, context=None):
+        encoded = _encode_context(context)
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                state = self._sessions[session_id] = {
+                    'seq': 0, 'messages': deque(maxlen=self.max_messages), 'last_seen': 0, 'context': None}
+            for message, is_user in messages:
+                state['seq'] += 1
+                state['messages'].append(_entry(state['seq'], message, is_user))
+            if encoded is not None:
+                state['context'] = encoded
+            state['last_seen'] = time.time()
+            return state['seq']
+
+    def context(self, session_id):
+        state = self._sessions.get(session_id)
+        return _decode_context(state['context']) if state else None
+
+    def history(self, session_id, since=0, limit=None):
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                return []
+            entries = [e for e in state['messages'] if e['seq'] > since]
+        return entries[:limit] if limit else entries
+
+    def last_seq(self, session_id):
+        state = self._sessions.get(session_id)
+        return state['seq'] if state else 0
+
+    def clear(self, session_id):
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state:
+                state['messages'].clear()
+                state['context'] = None
+                state['seq'] += 1
+
+    def gc(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [sid for sid, state in self._sessions.items() if state['last_seen'] < cutoff]
+            for sid in expired:
+                del self._sessions[sid]
+        return len(expired)
+
+
+# SQLite in WAL mode: appends are single-row inserts and readers never block
+# the writer. Each thread (of each forked worker) keeps its own connection.
+class SQLiteConversationStore:
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY,
+            last_seen REAL NOT NULL,
+            seq INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS messages (
+            session_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            is_user INTEGER NOT NULL,
+            message TEXT NOT NULL,
+            PRIMARY KEY (session_id, seq)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS contexts (
+            session_id TEXT PRIMARY KEY,
+            context TEXT NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen);
+    """
+
+    def __init__(self, path, max_messages=100, ttl=86400):
+        self.path = path
+        self.max_messages = max_messages
+        self.ttl = ttl
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(self.SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        # Connections must not cross a fork, so they are tagged with the pid
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def append(self, session_id, messages, context=None):
+        encoded = _encode_context(context)
+        conn = self._conn()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT seq FROM sessions WHERE id = ?', (session_id,)).fetchone()
+            seq = row[0] if row else 0
+            rows = []
+            for message, is_user in messages:
+                seq += 1
+                rows.append((session_id, seq, int(is_user), message))
+            conn.executemany(
+                'INSERT INTO messages (session_id, seq, is_user, message) VALUES (?, ?, ?, ?)', rows)
+            conn.execute(
+                'INSERT INTO sessions (id, last_seen, seq) VALUES (?, ?, ?) '
+                'ON CONFLICT(id) DO UPDATE SET last_seen = excluded.last_seen, seq = excluded.seq',
+                (session_id, now, seq))
+            # Ring buffer: drop whatever fell out of the window (a row or two)
+            conn.execute('DELETE FROM messages WHERE session_id = ? AND seq <= ?',
+                         (session_id, seq - self.max_messages))
+            if encoded is not None:
+                conn.execute(
+                    'INSERT INTO contexts (session_id, context) VALUES (?, ?) '
+                    'ON CONFLICT(session_id) DO UPDATE SET context = excluded.context',
+                    (session_id, encoded))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return seq
+
+    def history(self, session_id, since=0, limit=None):
+        sql = ('SELECT seq, message, is_user FROM messages '
+               'WHERE session_id = ? AND seq > ? ORDER BY seq')
+        params = [session_id, since]
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return [_entry(*row) for row in self._conn().execute(sql, params)]
+
+    def last_seq(self, session_id):
+        row = self._conn().execute('SELECT seq FROM sessions WHERE id = ?', (session_id,)).fetchone()
+        return row[0] if row else 0
+
+    def context(self, session_id):
+        row = self._conn().execute('SELECT context FROM contexts WHERE session_id = ?', (session_id,)).fetchone()
+        return _decode_context(row[0]) if row else None
+
+    def clear(self, session_id):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM messages WHERE session_id = ?', (session_id,))
+            conn.execute('DELETE FROM contexts WHERE session_id = ?', (session_id,))
+            conn.execute('UPDATE sessions SET seq = seq + 1 WHERE id = ?', (session_id,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def gc(self):
+        conn = self._conn()
+        cutoff = time.time() - self.ttl
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM messages WHERE session_id IN '
+                         '(SELECT id FROM sessions WHERE last_seen < ?)', (cutoff,))
+            conn.execute('DELETE FROM contexts WHERE session_id IN '
+                         '(SELECT id FROM sessions WHERE last_seen < ?)', (cutoff,))
+            removed = conn.execute('DELETE FROM sessions WHERE last_seen < ?', (cutoff,)).rowcount
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return removed
+
+
+# Redis (or any server speaking its protocol): a capped list per session plus
+# a sequence counter and the context, all expiring with the session
+class RedisConversationStore:
+    def __init__(self, url, max_messages=100, ttl=86400, prefix='afcon:conversation:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("SESSION_BACKEND=redis needs the redis package (pip install redis)") from None
+        self._client = redis.Redis.from_url(url)
+        self.max_messages = max_messages
+        self.ttl = ttl
+        self._prefix = prefix
+
+    def _keys(self, session_id):
+        base = self._prefix + session_id
+        return base + ':messages', base + ':seq'
+
+    def _context_key(self, session_id):
+        return self._prefix + session_id + ':context'
+
+    def append(self, session_id, messages, context=None):
+        encoded = _encode_context(context)
+        messages_key, seq_key = self._keys(session_id)
+        context_key = self._context_key(session_id)
+        seq = self._client.incrby(seq_key, len(messages))
+        first = seq - len(messages)
+        pipe = self._client.pipeline()
+        for offset, (message, is_user) in enumerate(messages, 1):
+            pipe.rpush(messages_key, json.dumps(_entry(first + offset, message, is_user)))
+        pipe.ltrim(messages_key, -self.max_messages, -1)
+        pipe.expire(messages_key, self.ttl)
+        pipe.expire(seq_key, self.ttl)
+        if encoded is not None:
+            pipe.set(context_key, encoded, ex=self.ttl)
+        else:
+            pipe.expire(context_key, self.ttl)
+        pipe.execute()
+        return seq
+
+    def history(self, session_id, since=0, limit=None):
+        messages_key, _ = self._keys(session_id)
+        entries = [json.loads(raw) for raw in self._client.lrange(messages_key, 0, -1)]
+        entries = [e for e in entries if e['seq'] > since]
+        return entries[:limit] if limit else entries
+
+    def last_seq(self, session_id):
+        _, seq_key = self._keys(session_id)
+        return int(self._client.get(seq_key) or 0)
+
+    def context(self, session_id):
+        return _decode_context(self._client.get(self._context_key(session_id)))
+
+    def clear(self, session_id):
+        messages_key, seq_key = self._keys(session_id)
+        pipe = self._client.pipeline()
+        pipe.delete(messages_key, self._context_key(session_id))
+        pipe.incr(seq_key)
+        pipe.expire(seq_key, self.ttl)
+        pipe.execute()
+
+    def gc(self):
+        # Keys carry their own TTL
+        return 0
+
+
+# Store configured from settings
+def create_conversation_store(backend, max_messages, ttl, path=None, url=None):
+    if backend == 'redis':
+        return RedisConversationStore(url, max_messages=max_messages, ttl=ttl)
+    if backend == 'memory':
+        return MemoryConversationStore(max_messages=max_messages, ttl=ttl)
+    return SQLiteConversationStore(path, max_messages=max_messages, ttl=ttl)
+
+
+# Daemon thread that periodically drops expired sessions
+def start_gc_thread(store, interval):
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                store.gc()
+            except Exception as e:
+                logger.warning("Session cleanup failed: %s", e)
+
+    thread = threading.Thread(target=run, name='session-gc', daemon=True)
+    thread.start()
+    return thread
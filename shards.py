@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import re
+import threading
+
+from intent import phrase_pattern
+from lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'competitions.json'
+# Preferred first when a competition has both a compiled snapshot and JSON
+DATA_SUFFIXES = ('.snap', '.json')
+
+
+class UnknownCompetition(LookupError):
+    pass
+
+
+# "AFCON-2023", "afcon_2023 " -> "afcon 2023"
+def normalize_competition(name):
+    return ' '.join(re.split(r'[-_\s]+', name.lower())).strip()
+
+
+# One competition (a tournament edition): its data file and the names a
+# query or API call may use for it
+class Competition:
+    __slots__ = ('key', 'name', 'path', 'aliases')
+
+    def __init__(self, key, path, name=None, aliases=()):
+        self.key = key
+        self.path = path
+        self.name = name or key
+        words = normalize_competition(key).split()
+        self.aliases = list(dict.fromkeys(
+            [' '.join(words), ''.join(words), normalize_competition(self.name)]
+            + [normalize_competition(alias) for alias in aliases]))
+
+
+# Competitions served by one deployment, each with its own MatchStore (and so
+# its own indexes, resolver and write-ahead log). The default competition's
+# store is always loaded; the others are created on first use and kept in an
+# LRU of at most `capacity` stores, so memory stays bounded however many past
+# editions are on disk. An evicted shard is simply loaded again when next
+# asked for; pending updates wait in its log.
+#
+# Competitions come from `directory`: every <key>.snap / <key>.json file,
+# plus names and aliases from an optional competitions.json:
+#
+#   {"afcon-2023": {"name": "AFCON 2023", "path": "afcon-2023.snap",
+#                   "aliases": ["can 2023", "ivory coast 2023"]}}
+class ShardRegistry:
+    def __init__(self, default_key, default_store, make_store, directory=None, capacity=4,
+                 default_name=None, default_aliases=()):
+        self.default = default_key
+        self.make_store = make_store
+        self.competitions = {
+            default_key: Competition(default_key, default_store.path, default_name, default_aliases)
+        }
+        self._pinned = {default_key: default_store}
+        self._stores = LRUCache(capacity)
+        self._lock = threading.Lock()
+        self.loads = 0
+        if directory:
+            self.discover(directory)
+        self._compile()
+
+    def discover(self, directory):
+        manifest = {}
+        manifest_path = os.path.join(directory, MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding='utf-8') as file:
+                manifest = json.load(file)
+
+        found = {}
+        filenames = set(os.listdir(directory)) - {MANIFEST}
+        for suffix in reversed(DATA_SUFFIXES):
+            for filename in sorted(filenames):
+                key, ext = os.path.splitext(filename)
+                if ext == suffix:
+                    found[key] = filename
+        for key, entry in manifest.items():
+            if 'path' in entry:
+                found[key] = entry['path']
+
+        default_path = os.path.realpath(self.competitions[self.default].path)
+        for key, filename in found.items():
+            path = os.path.join(directory, filename)
+            if key in self.competitions or os.path.realpath(path) == default_path:
+                continue
+            entry = manifest.get(key, {})
+            self.competitions[key] = Competition(key, path, entry.get('name'), entry.get('aliases', ()))
+
+    def _compile(self):
+        self._by_alias = {}
+        for competition in self.competitions.values():
+            for alias in competition.aliases:
+                if self._by_alias.setdefault(alias, competition.key) != competition.key:
+                    logger.warning("Competition alias %r is ambiguous, using %s", alias, self._by_alias[alias])
+        mentions = [alias for alias in self._by_alias if alias]
+        # "afcon 2023" also matches "AFCON-2023" and "afcon_2023"
+        self._pattern = re.compile(r'\b(?:' + phrase_pattern(mentions, r'[\s_-]+') + r')\b') if mentions else None
+
+    # Competition key for a name, key or alias given by an API caller
+    def find(self, name):
+        return self._by_alias.get(normalize_competition(name))
+
+    def key_for(self, name):
+        key = self.find(name)
+        if key is None:
+            raise UnknownCompetition(name)
+        return key
+
+    # (competition key, query text) for a query: an explicit `competition`
+    # (already checked with key_for) wins, then a competition named in the query
+    # ("AFCON 2023 final"), which is cut out of the text so it can't be
+    # mistaken for a team; otherwise `fallback` (the competition a conversation
+    # was about), then the default competition.
+    def route(self, query, competition=None, fallback=None):
+        if competition:
+            return self.find(competition) or self.default, query
+        if self._pattern is not None:
+            lowered = query.lower()
+            found = self._pattern.search(lowered)
+            if found:
+                key = self._by_alias[normalize_competition(found.group())]
+                # Keep the original spelling unless lowercasing changed offsets
+                source = query if len(lowered) == len(query) else lowered
+                return key, ' '.join((source[:found.start()] + ' ' + source[found.end():]).split())
+        if fallback in self.competitions:
+            return fallback, query
+        return self.default, query
+
+    # MatchStore of a competition, creating it (unloaded) if needed
+    def store(self, key):
+        store = self._pinned.get(key)
+        if store is not None:
+            return store
+        store = self._stores.get(key)
+        if store is None:
+            with self._lock:
+                # Another thread may have created it meanwhile
+                store = self._stores.get(key) if key in self._stores else None
+                if store is None:
+                    store = self.make_store(self.competitions[key].path)
+                    self._stores.put(key, store)
+                    self.loads += 1
+        return store
+
+    @property
+    def cache(self):
+        return self._stores
+
+    # Stores currently held, pinned ones included
+    def loaded(self):
+        return list(self._pinned.items()) + self._stores.items()
+
+    def compact(self):
+        for key, store in self.loaded():
+            try:
+                store.compact()
+            except Exception as e:
+                logger.warning("Compaction of %s failed: %s", key, e)
@@ -0,0 +1,241 @@
+import re
+
+from match_index import KNOCKOUT_STAGES, Overlay, iter_match_records
+from match_records import FINISHED, LIVE, TeamTable
+
+# Results that count towards the table. Live scores count as they stand, so
+# a table with a live match in it is provisional.
+COUNTED = (FINISHED, LIVE)
+POINTS_WIN = 3
+POINTS_DRAW = 1
+
+
+# One team's line in a group table
+class Standing:
+    __slots__ = ('rank', 'team', 'played', 'wins', 'draws', 'losses', 'gf', 'ga', 'points')
+
+    def __init__(self, team):
+        self.rank = 0
+        self.team = team
+        self.played = self.wins = self.draws = self.losses = 0
+        self.gf = self.ga = self.points = 0
+
+    def add(self, scored, conceded):
+        self.played += 1
+        self.gf += scored
+        self.ga += conceded
+        if scored > conceded:
+            self.wins += 1
+            self.points += POINTS_WIN
+        elif scored == conceded:
+            self.draws += 1
+            self.points += POINTS_DRAW
+        else:
+            self.losses += 1
+
+    @property
+    def gd(self):
+        return self.gf - self.ga
+
+    # Same keys as the `standings` rows of db.json, plus points
+    def to_json(self):
+        return {
+            'rank': self.rank, 'team': self.team, 'matches': self.played, 'wins': self.wins,
+            'losses': self.losses, 'draws': self.draws, 'gf': self.gf, 'ga': self.ga,
+            'gd': self.gd, 'points': self.points,
+        }
+
+    def __repr__(self):
+        return f"Standing({self.rank}, {self.team!r}, {self.points} pts, {self.gd:+d})"
+
+
+# Rows for `teams` from (team1, team2, score1, score2) results
+def _tally(teams, results):
+    rows = {team: Standing(team) for team in teams}
+    for team1, team2, score1, score2 in results:
+        rows[team1].add(score1, score2)
+        rows[team2].add(score2, score1)
+    return rows
+
+
+# Consecutive runs of `rows` (already sorted by `key`) with equal keys
+def _runs(rows, key):
+    runs = []
+    for row in rows:
+        if runs and key(runs[-1][0]) == key(row):
+            runs[-1].append(row)
+        else:
+            runs.append([row])
+    return runs
+
+
+# Order teams level on points with the CAF group-stage criteria: points, goal
+# difference and goals scored in the matches between them; the same again
+# among any teams still level; then goal difference and goals scored in all
+# group matches. Team name stands in for fair play and the drawing of lots.
+def _break_tie(tied, results):
+    teams = {row.team for row in tied}
+    mini = _tally(teams, [result for result in results if result[0] in teams and result[1] in teams])
+
+    def head_to_head(row):
+        line = mini[row.team]
+        return (-line.points, -line.gd, -line.gf)
+
+    runs = _runs(sorted(tied, key=head_to_head), head_to_head)
+    if len(runs) == 1:
+        return sorted(tied, key=lambda row: (-row.gd, -row.gf, row.team))
+    ordered = []
+    for run in runs:
+        ordered.extend(_break_tie(run, results) if len(run) > 1 else run)
+    return ordered
+
+
+# Ranked rows for `teams` from their results
+def rank(teams, results):
+    rows = _tally(teams, results)
+    ordered = []
+    for run in _runs(sorted(rows.values(), key=lambda row: -row.points), lambda row: row.points):
+        ordered.extend(_break_tie(run, results) if len(run) > 1 else run)
+    for position, row in enumerate(ordered, 1):
+        row.rank = position
+    return tuple(ordered)
+
+
+# The table of one group, derived from the current state of its fixtures
+# (match id -> Match record). Immutable: an update builds a new one.
+class GroupTable:
+    __slots__ = ('name', 'stage', 'teams', 'fixtures', 'rows', 'provisional')
+
+    def __init__(self, name, stage, teams, fixtures):
+        self.name = name
+        self.stage = stage
+        self.teams = teams
+        self.fixtures = fixtures
+        counted = [match for match in fixtures.values()
+                   if match.status in COUNTED and match.score1 is not None and match.score2 is not None]
+        self.rows = rank(teams, [(m.team1, m.team2, m.score1, m.score2) for m in counted])
+        self.provisional = any(match.status is LIVE for match in counted)
+
+    # Same table with some of its fixtures replaced by updated records
+    def updated(self, records):
+        return GroupTable(self.name, self.stage, self.teams,
+                          {**self.fixtures, **{match.match_id: match for match in records}})
+
+    def row(self, team):
+        for row in self.rows:
+            if row.team == team:
+                return row
+        return None
+
+    def to_json(self):
+        return {
+            'name': self.name,
+            'provisional': self.provisional,
+            'standings': [row.to_json() for row in self.rows],
+        }
+
+
+# "Group A", "group a", "A" and the fixture stage "GA" all name group A
+def group_key(name):
+    name = ' '.join(name.lower().split())
+    return re.sub(r'^(?:group|groupe)\s+', '', name)
+
+
+# Group-stage tables of one snapshot: group name -> GroupTable, in the order
+# of `groups` in db.json (then of any other group-stage fixtures). Fixtures
+# are grouped by stage; a stage such as "GA" is matched to "Group A" by
+# letter, or else to the group listing its teams. The `standings` rows stored
+# in db.json are not read: tables always come from the fixtures.
+class Standings:
+    def __init__(self, tables, by_stage, by_team, by_key):
+        self.tables = tables
+        self.by_stage = by_stage
+        self.by_team = by_team
+        self.by_key = by_key
+
+    @classmethod
+    def build(cls, data, matches):
+        groups = (data.get('groups') or {}) if data else {}
+        by_letter = {group_key(name): name for name in groups}
+        fixtures = {}
+        for match in matches:
+            if match.stage not in KNOCKOUT_STAGES:
+                fixtures.setdefault(match.stage, {})[match.match_id] = match
+
+        by_stage = {}
+        for stage, stage_fixtures in fixtures.items():
+            name = by_letter.get(group_key(stage)) or by_letter.get(group_key(stage)[1:])
+            if name is None:
+                first = next(iter(stage_fixtures.values()))
+                name = next((group for group, entry in groups.items()
+                             if {first.team1, first.team2} <= set(entry.get('teams', ()))), stage)
+            by_stage[stage] = name
+
+        tables = {}
+        for name in list(groups) + [name for name in by_stage.values() if name not in groups]:
+            if name in tables:
+                continue
+            stages = [stage for stage, group in by_stage.items() if group == name]
+            group_fixtures = {match_id: match for stage in stages for match_id, match in fixtures[stage].items()}
+            # The fixtures decide who is in the group; the listed teams only
+            # fill in a group that has none yet
+            teams = tuple(dict.fromkeys(team for match in group_fixtures.values()
+                                        for team in (match.team1, match.team2)))
+            if not teams:
+                teams = tuple((groups.get(name) or {}).get('teams', ()))
+            tables[name] = GroupTable(name, stages[0] if stages else None, teams, group_fixtures)
+
+        by_team = {}
+        for name, table in tables.items():
+            for team in table.teams:
+                by_team.setdefault(team, name)
+        by_key = {}
+        for name, table in tables.items():
+            by_key.setdefault(group_key(name), name)
+            if table.stage:
+                by_key.setdefault(group_key(table.stage), name)
+        return cls(tables, by_stage, by_team, by_key)
+
+    # Table for a group name ("Group A", "A", "GA"), or None
+    def group(self, name):
+        name = self.by_key.get(group_key(name))
+        return self.tables[name] if name is not None else None
+
+    # Table of the group a team plays in, or None
+    def group_of(self, team):
+        name = self.by_team.get(team)
+        return self.tables[name] if name is not None else None
+
+    def __iter__(self):
+        return iter(self.tables.values())
+
+    def __len__(self):
+        return len(self.tables)
+
+    # New Standings with updated Match records applied. Only the groups of
+    # those fixtures are ranked again, so an update costs
+    # O(fixtures in the group) however many groups there are; the other
+    # tables are shared through an Overlay.
+    def updated(self, records):
+        changed = {}
+        for match in records:
+            name = self.by_stage.get(match.stage)
+            if name is not None:
+                changed.setdefault(name, []).append(match)
+        if not changed:
+            return self
+        tables = {name: self.tables[name].updated(matches) for name, matches in changed.items()}
+        return Standings(Overlay(self.tables, tables), self.by_stage, self.by_team, self.by_key)
+
+
+# Snapshot builder hook for MatchStore; reuses the records of the `index`
+# view when there is one
+def build_standings(data, views=None):
+    index = views.get('index') if views else None
+    matches = index.matches.values() if index else iter_match_records(data, TeamTable())
+    return Standings.build(data, matches)
+
+
+# Snapshot updater hook for MatchStore
+def update_standings(standings, records, views=None):
+    return standings.updated(records)
@@ -0,0 +1,135 @@
+import re
+import unicodedata
+
+from rapidfuzz import fuzz, process
+
+from lru import LRUCache
+
+
+# Lowercase, strip accents and punctuation, collapse whitespace:
+# "Côte d'Ivoire " -> "cote d ivoire"
+def normalize_name(text):
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^\w]+', ' ', text).split())
+
+
+# Maps free-text team fragments to canonical team names. Built once per data
+# snapshot:
+#   - exact: normalized canonical names, aliases ("drc", "rsa") and French
+#     names ("maroc", "côte d'ivoire") -> canonical name, checked first
+#   - fuzzy: token_sort_ratio against canonical and French names for typos,
+#     memoized in a bounded LRU keyed on the normalized fragment
+class TeamResolver:
+    def __init__(self, teams, aliases=None, translations=None, cache_size=4096):
+        self.teams = list(teams)
+        by_lower = {team.lower(): team for team in self.teams}
+
+        self.exact = {}
+        for team in self.teams:
+            self.exact[normalize_name(team)] = team
+
+        # French names from the query translation table that point at a team
+        for fr_name, en_name in (translations or {}).items():
+            team = by_lower.get(en_name.lower())
+            if team:
+                self.exact.setdefault(normalize_name(fr_name), team)
+
+        # Fuzzy candidates exclude the short aliases, which would otherwise
+        # attract any two or three letter word
+        self._choices = list(self.exact)
+        self._choice_teams = [self.exact[key] for key in self._choices]
+
+        known = set(self.teams)
+        self.aliases = {}
+        for alias, team in (aliases or {}).items():
+            if team in known:
+                self.aliases[normalize_name(alias)] = team
+                self.exact.setdefault(normalize_name(alias), team)
+
+        self._mention_pattern = self._compile(self.exact)
+        self._cache = LRUCache(cache_size)
+
+    @staticmethod
+    def _compile(keys):
+        if not keys:
+            return None
+        ordered = sorted(keys, key=len, reverse=True)
+        return re.compile(r'\b(?:' + '|'.join(re.escape(k) for k in ordered) + r')\b')
+
+    @property
+    def cache(self):
+        return self._cache
+
+    # Best (team, score) for an already normalized fragment, ignoring cutoffs
+    def _score(self, key):
+        best = process.extractOne(key, self._choices, scorer=fuzz.token_sort_ratio)
+        return (self._choice_teams[best[2]], best[1]) if best else (None, 0)
+
+    def _fuzzy(self, key):
+        cached = self._cache.get(key)
+        if cached is None:
+            cached = self._score(key)
+            self._cache.put(key, cached)
+        return cached
+
+    # Canonical team for a fragment, or None if nothing scores above threshold
+    def resolve(self, fragment, threshold=65):
+        key = normalize_name(fragment)
+        if not key:
+            return None
+        team = self.exact.get(key)
+        if team:
+            return team
+        team, score = self._fuzzy(key)
+        return team if score > threshold else None
+
+    # Resolve several fragments at once. Exact and cached fragments are
+    # answered directly; the rest are scored in a single cdist call.
+    def resolve_many(self, fragments, threshold=65):
+        keys = [normalize_name(f) for f in fragments]
+        results = [None] * len(keys)
+        pending = {}
+        for i, key in enumerate(keys):
+            if not key:
+                continue
+            team = self.exact.get(key)
+            if team:
+                results[i] = (team, 100)
+                continue
+            cached = self._cache.get(key)
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.setdefault(key, []).append(i)
+
+        if pending and self._choices:
+            queries = list(pending)
+            if len(queries) == 1:
+                scored = [self._score(queries[0])]
+            else:
+                # cdist returns a numpy array (numpy is pinned in requirements.txt)
+                matrix = process.cdist(queries, self._choices, scorer=fuzz.token_sort_ratio, workers=1)
+                scored = []
+                for row in matrix:
+                    best = int(row.argmax())
+                    scored.append((self._choice_teams[best], float(row[best])))
+            for key, result in zip(queries, scored):
+                self._cache.put(key, result)
+                for i in pending[key]:
+                    results[i] = result
+
+        return [r[0] if r and r[0] and r[1] > threshold else None for r in results]
+
+    # Teams named verbatim in the text (canonical, French or alias form), in
+    # order of appearance. Longest names win, so "guinée équatoriale" is
+    # Equatorial Guinea rather than Guinea.
+    def find_mentions(self, text):
+        if not self._mention_pattern:
+            return []
+        teams = []
+        for found in self._mention_pattern.finditer(normalize_name(text)):
+            team = self.exact[found.group(0)]
+            if team not in teams:
+                teams.append(team)
+        return teams
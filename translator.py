@@ -0,0 +1,67 @@
+import re
+
+
+# One regex alternation over every key of `table`, longest key first so that
+# at any position the longest phrase wins ("joue contre" before "contre").
+# Keys only match as whole words.
+def compile_alternation(table, flags=0):
+    if not table:
+        return None
+    keys = sorted(table, key=len, reverse=True)
+    return re.compile(r'(?<!\w)(?:' + '|'.join(re.escape(k) for k in keys) + r')(?!\w)', flags)
+
+
+# French team name as it should appear in a response: "maroc" -> "Maroc",
+# "côte d'ivoire" -> "Côte d'Ivoire", "afrique du sud" -> "Afrique du Sud",
+# "rdc" -> "RDC"
+def display_name(name):
+    if len(name) <= 3:
+        return name.upper()
+    words = []
+    for word in name.split(' '):
+        if word in ('du', 'de', 'des', 'la', 'le'):
+            words.append(word)
+        elif "'" in word:
+            prefix, rest = word.split("'", 1)
+            words.append(prefix + "'" + rest[:1].upper() + rest[1:])
+        else:
+            words.append(word[:1].upper() + word[1:])
+    return ' '.join(words)
+
+
+# French <-> English translation tables compiled once at startup. Each query
+# or response is translated with a single regex pass instead of one
+# substitution per dictionary entry.
+class Translator:
+    def __init__(self, fr_to_en, en_to_fr_responses, team_names=()):
+        self.fr_to_en = {fr.lower(): en for fr, en in fr_to_en.items()}
+        self._query_pattern = compile_alternation(self.fr_to_en)
+
+        # English team name -> French display name, for the teams we know
+        teams = {team.lower() for team in team_names}
+        self.team_fr = {}
+        for fr, en in fr_to_en.items():
+            if en in teams and fr != en:
+                self.team_fr[en] = display_name(fr)
+
+        # Response phrases and team names share one case-insensitive pattern
+        self.response_map = {en.lower(): fr for en, fr in en_to_fr_responses.items()}
+        for en, fr in self.team_fr.items():
+            self.response_map.setdefault(en, fr)
+        self._response_pattern = compile_alternation(self.response_map, re.IGNORECASE)
+
+    # Function to translate French query to English for processing
+    def translate_query(self, query):
+        query_lower = query.lower()
+        if not self._query_pattern:
+            return query_lower
+        return self._query_pattern.sub(lambda m: self.fr_to_en[m.group(0)], query_lower)
+
+    # Function to translate English response to French
+    def translate_response(self, response):
+        if not self._response_pattern:
+            return response
+        return self._response_pattern.sub(lambda m: self.response_map[m.group(0).lower()], response)
+
+    def team_name(self, team):
+        return self.team_fr.get(team.lower(), team)
@@ -0,0 +1,128 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+from db_snapshot import write_atomic
+
+logger = logging.getLogger(__name__)
+
+
+# Append-only log of match updates, one JSON object per line:
+#
+#   {"base": "<digest>", "seq": 12}                      header
+#   {"seq": 13, "id": "GA-1", "set": {"score1": 2}}      one update
+#
+# The header names the data file the entries apply to (by content digest) and
+# the last sequence number already folded into it. Every process tails the
+# log, so an update written by one worker reaches all of them without the data
+# file being reloaded. Compaction writes the merged data file and then starts
+# a fresh log whose header points at it.
+#
+# Writers (and compaction) hold an exclusive flock on `<path>.lock`; readers
+# never lock, they only consume complete lines.
+class WriteAheadLog:
+    def __init__(self, path, fsync=True):
+        self.path = path
+        self.fsync = fsync
+        self.header = None
+        # Highest sequence number seen in the log
+        self.seq = 0
+        self._inode = None
+        self._offset = 0
+        self._mutex = threading.Lock()
+        self._lock_file = None
+        self._lock_pid = None
+
+    # Exclusive write access, across threads and processes
+    @contextmanager
+    def locked(self):
+        with self._mutex:
+            # flock is per open file, so a forked worker needs its own
+            if self._lock_pid != os.getpid():
+                self._lock_file = open(self.path + '.lock', 'a')
+                self._lock_pid = os.getpid()
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    # Start over from the top of the log on the next read_new()
+    def rewind(self):
+        self._inode = None
+        self._offset = 0
+        self.header = None
+
+    # Entries appended since the last call. A replaced log (after compaction)
+    # is read again from its start; entries are returned even if their
+    # sequence number was seen before, callers skip what they already applied.
+    def read_new(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        if st.st_ino != self._inode or st.st_size < self._offset:
+            self.rewind()
+            self._inode = st.st_ino
+        if st.st_size == self._offset:
+            return []
+
+        with open(self.path, 'rb') as file:
+            file.seek(self._offset)
+            chunk = file.read(st.st_size - self._offset)
+        # A writer may be halfway through a line; leave it for the next call
+        end = chunk.rfind(b'\n') + 1
+        self._offset += end
+
+        entries = []
+        for line in chunk[:end].splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                logger.warning("Skipping corrupt line in %s", self.path)
+                continue
+            if 'base' in entry:
+                self.header = entry
+            else:
+                entries.append(entry)
+            self.seq = max(self.seq, entry.get('seq', 0))
+        return entries
+
+    # Append updates ([(match_id, fields)], fields as JSON) for the data file
+    # with digest `base`, returning the new entries. Call with the lock held
+    # and after read_new(), so sequence numbers continue from the log's end.
+    def append(self, updates, base):
+        lines = []
+        if self.header is None or self.header['base'] != base:
+            # First write, or the log belongs to a data file that has since
+            # been replaced: start a fresh log for the current one
+            if self.header is not None:
+                logger.warning("Discarding %s: written for a different data file", self.path)
+            self.start(base, self.seq)
+        entries = []
+        for match_id, fields in updates:
+            self.seq += 1
+            entries.append({'seq': self.seq, 'id': match_id, 'set': fields})
+            lines.append(json.dumps(entries[-1], ensure_ascii=False, separators=(',', ':')) + '\n')
+
+        with open(self.path, 'ab') as file:
+            file.write(''.join(lines).encode('utf-8'))
+            file.flush()
+            if self.fsync:
+                os.fsync(file.fileno())
+            # Our own entries are applied by the caller, not read back
+            self._offset = file.tell()
+        return entries
+
+    # Replace the log with an empty one for data file `base`, which already
+    # contains every update up to `seq`
+    def start(self, base, seq):
+        self.header = {'base': base, 'seq': seq}
+        payload = (json.dumps(self.header) + '\n').encode('utf-8')
+        write_atomic(self.path, payload)
+        self._inode = os.stat(self.path).st_ino
+        self._offset = len(payload)
+        self.seq = max(self.seq, seq)